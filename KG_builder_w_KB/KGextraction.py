@@ -8,17 +8,27 @@ Knowledge Graph Extraction Script
 4. Compares embedding to KB to find matches and consolidate or create new entities (uuid)
 5. Passes named entities (and uuid) and text to LLM to discover relationships
 ----- END OF ARTICLE CHUNK -----
-6. Human-in-the-loop to verify relationships using prodigy
+6. Human-in-the-loop to verify relationships using prodigy, merged across articles into one
+   task per fact with its supporting evidence (see relationship_aggregator.py)
 7. NOT DONE Passes verified relationships to Neo4j to update a knowledge graph (include evidence and citation)
 
+Steps 2-5 run as a staged pipeline (see pipeline.py), e.g.:
+    python KGextraction.py --start 21 --end 22 --workers 4 --batch-size 8 --llm-workers 2
+Consolidated mentions and relationships are also saved as columnar tables in the run
+directory (see columnar.py), so step 5 can be rerun on its own, through the same run
+checkpoint (and resumable with --resume):
+    python KGextraction.py --relate-only --run-dir runs/default
+
 
 pip install openai python-dotenv spacy sentence-transformers prodigy neo4j numpy langchain langchain-openai
 '''
 
+import argparse
 import dotenv
 import os
 import json
-from typing import Dict, Any, List, Optional, Set
+import time
+from typing import Dict, Any, List, Optional, Set, Iterator, Tuple
 import spacy
 from spacy.tokens import Span
 from sentence_transformers import SentenceTransformer # for embedding entities (consolidation)
@@ -29,14 +39,22 @@ from consolidate_entities import consolidate_entities_with_kb
 from relationship_extractor import extract_relationships_block_by_block
 from entity_training import extract_entities_from_archive
 from entity_training import load_trained_model
-import re
-from bs4 import BeautifulSoup
+from functools import partial
+from text_cleaning import block_to_text, clean_text, clean_texts, is_valid_entity
+from kb_store import KBStore
+from archive_reader import parse_single_article, parse_archive, iter_archive
+from archive_index import ArchiveIndex
+from block_cache import BlockCache, BLOCK_CACHE_PATH
+from mention_records import MentionStore, Mention
+from checkpoint import RunCheckpoint, article_content_hash
+from incremental import ArticleIndex
+from pipeline import run_pipeline, run_relate
+from columnar import MentionSpool, iter_mention_parts, write_relationships
 
 
 
 from relationship_validator import save_relationships_for_prodigy
-
-import os
+from relationship_aggregator import aggregate_relationships
 
 # For sentence segmentation:
 nlp = spacy.load("en_core_web_sm")
@@ -53,60 +71,7 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 VALID_ENTITY_TYPES = ["PERSON", "ORG", "GPE", "LOC", "PRODUCT", "EVENT", "LAW", "NORP", "FAC"]
 
 
-def is_valid_entity(text: str) -> bool:
-    """Check if an entity text is valid"""
-    # Skip if text contains invalid characters or patterns
-    invalid_patterns = [
-        '/',  # URLs or file paths
-        '>',  # HTML tags
-        '<',  # HTML tags
-        'css_',  # CSS classes
-        'px',  # CSS units
-        '.com',  # URLs
-        'http',  # URLs
-        '"',  # Quotes from HTML
-        '-3rd-',  # Malformed text
-        '="',  # HTML attributes
-        '_',   # Underscores from markup
-        ']',  # Markdown/markup
-        '[',  # Markdown/markup
-    ]
-    
-    # Check for invalid patterns
-    if any(pattern in text for pattern in invalid_patterns):
-        return False
-        
-    # Check if it's mostly alphanumeric (allow spaces and some punctuation)
-    valid_chars = re.match(r'^[\w\s\'-,.]+$', text)
-    if not valid_chars:
-        return False
-        
-    # Ensure it's not just numbers or special characters
-    if re.match(r'^[\d\W]+$', text):
-        return False
-    
-    return True
-
-def clean_text(text: str) -> str:
-    """Clean text by removing HTML tags, URLs, and other markup"""
-    # Remove HTML tags
-    text = BeautifulSoup(text, "html.parser").get_text()
-    
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    text = re.sub(r'www\.\S+', '', text)
-    
-    # Remove HTML/CSS artifacts
-    text = re.sub(r'css_[a-zA-Z_]+="[^"]*"', '', text)
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Remove file paths and similar patterns
-    text = re.sub(r'\S+/\S+', '', text)
-    
-    # Clean up whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    return text.strip()
+# is_valid_entity / clean_text live in text_cleaning.py (precompiled patterns, plain-text fast path)
 
 ''' 
 ------------------------------------------------------------
@@ -114,37 +79,9 @@ def clean_text(text: str) -> str:
 ------------------------------------------------------------
 '''
 
-def parse_single_article(article: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Given one article dict (with keys like _id, headline, jsonBody, displayDate),
-    return a structured dictionary with:
-      - id
-      - date
-      - headline
-      - contentBlocks (list of strings)
-    """
-    # Extract basic fields
-    article_id = article.get("_id", None)
-    headline = article.get("headline", "")
-    
-    display_date = article.get("displayDate") or {}   # If None, default to {}
-    date_obj = display_date.get("$date", None)
-    
-    # Extract each block of text from jsonBody
-    json_body = article.get("jsonBody", [])
-    content_blocks = []
-    for block in json_body:
-        text = block.get("content", "")
-        if text:  # only append if there's actual text
-            content_blocks.append(text)
-    
-
-    return {
-        "id": article_id,
-        "date": date_obj,
-        "headline": headline,
-        "contentBlocks": content_blocks
-    }
+# parse_single_article / parse_archive / iter_archive live in archive_reader.py
+# (shared with entity_annotation.py), articles are streamed from disk one at a time
+
 
 ''' 
 ------------------------------------------------------------
@@ -191,6 +128,7 @@ def create_prodigy_tasks(articles: List[Dict[str, Any]], output_file: str = "blo
 
 # Now after labeling we can get the accepted entities only (human-in-the-loop)
 from prodigy.components.db import connect
+from prodigy_reader import accepted_record, iter_new_accepted_records, DEFAULT_BATCH_SIZE as ANNOTATION_BATCH_SIZE
 
 def get_accepted_entities_from_prodigy(dataset_name: str):
     """
@@ -199,21 +137,11 @@ def get_accepted_entities_from_prodigy(dataset_name: str):
       - text (the block)
       - meta (article_id, date, etc.)
       - spans (the accepted entity annotations)
+    Reads the whole dataset, see iter_new_accepted_records to read only new examples.
     """
     db = connect()  # Connect to the Prodigy database
     examples = db.get_dataset(dataset_name)  # Fetch dataset
-    
-    accepted_records = []
-    for eg in examples:
-        if eg.get("answer") == "accept":  # Only process accepted annotations
-            spans = eg.get("spans", [])
-            if spans:
-                accepted_records.append({
-                    "text": eg["text"],
-                    "meta": eg["meta"],
-                    "spans": spans
-                })
-    return accepted_records
+    return [record for record in map(accepted_record, examples) if record]
 
 ''' 
 ------------------------------------------------------------
@@ -221,12 +149,13 @@ def get_accepted_entities_from_prodigy(dataset_name: str):
 ------------------------------------------------------------
 '''
 
-def get_sentence_for_span(text: str, start: int, end: int) -> str:
+def get_sentence_for_span(text: str, start: int, end: int, doc=None) -> str:
     """
     Given a text block, plus the start/end char indices for an entity,
     find the sentence containing that span. Relies on spaCy's sentence segmentation.
+    Pass the block's doc to avoid re-parsing the block for every span.
     """
-    doc = nlp(text)
+    doc = doc if doc is not None else nlp(text)
     for sent in doc.sents:
         if sent.start_char <= start and sent.end_char >= end:
             return sent.text
@@ -236,55 +165,64 @@ def get_sentence_for_span(text: str, start: int, end: int) -> str:
 def embed_sentence(sentence: str) -> List[float]:
     return embedder.encode(sentence).tolist()
 
-def piecewise_extraction_to_records(accepted_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def piecewise_extraction_to_records(accepted_records: List[Dict[str, Any]], store: Optional[MentionStore] = None) -> List[Mention]:
     """
-    For each accepted record (block text + spans), produce this final structure for each entity:
+    For each accepted record (block text + spans), produce a Mention for each entity.
+    A Mention reads like the old dict record:
       {
         "article_id": ...
         "headline": ...
         "date": ...
-        "entity_label": ... # e.g. "PERSON"
+        "entity_type": ... # e.g. "PERSON"
         "entity_text": ... # e.g. "Bertrand Russell"
         "evidence": <the sentence containing that entity>,
-        "embedding": [...float...]
+        "embedding": float32 row of store.embeddings
         "block_text": ... # the original block text (just for context in relationship extraction)
       }
+    but the article fields, block text and evidence sentence are stored once in the
+    MentionStore, and each distinct evidence sentence is embedded once, in one batch.
+    The blocks are sentence-split in one nlp.pipe pass. Mentions come out in the order
+    of the records and their spans, one per span.
     """
-    final_data = []
-    for rec in accepted_records:
+    store = store if store is not None else MentionStore()
+    pending = []  # (article_ref, block_ref, span, evidence sentence)
+    docs = nlp.pipe(rec["text"] for rec in accepted_records)
+    for rec, doc in zip(accepted_records, docs):
         block_text = rec["text"]
         meta = rec["meta"]  # has article_id, date, headline, block_index
-        spans = rec["spans"]
 
-        article_id = meta.get("article_id")
-        headline = meta.get("headline", "")
-        date_str = meta.get("date", "")
+        article_ref = store.add_article(meta.get("article_id"), meta.get("headline", ""), meta.get("date", ""))
+        block_ref = store.add_block(block_text)
 
-        for span in spans:
-            start = span["start"]
-            end = span["end"]
-            entity_text = block_text[start:end]
-            entity_type = span["entity_type"]
+        for span in rec["spans"]:
             # find the sentence in which this entity occurs
-            evidence_sentence = get_sentence_for_span(block_text, start, end)
-
-            # compute embedding
-            embedding_vec = embed_sentence(evidence_sentence)
-
-            record = {
-                "article_id": article_id,
-                "headline": headline,
-                "date": date_str,
-                "entity_type": entity_type,
-                "entity_text": entity_text,
-                "evidence": evidence_sentence,
-                "embedding": embedding_vec, #embedding_vec
-                "block_text": block_text
-            }
-            final_data.append(record)
+            evidence_sentence = get_sentence_for_span(block_text, span["start"], span["end"], doc=doc)
+            pending.append((article_ref, block_ref, span, evidence_sentence))
+
+    # compute embeddings for all new evidence sentences at once
+    new_sentences = list(dict.fromkeys(
+        sentence for _, _, _, sentence in pending if not store.has_sentence(sentence)
+    ))
+    if new_sentences:
+        for sentence, vector in zip(new_sentences, embedder.encode(new_sentences)):
+            store.add_sentence(sentence, vector)
 
+    final_data = []
+    for article_ref, block_ref, span, evidence_sentence in pending:
+        entity_text = store.blocks[block_ref][span["start"]:span["end"]]
+        final_data.append(store.add_mention(article_ref, block_ref, span["entity_type"], entity_text, evidence_sentence, None))
     return final_data
 
+def consume_accepted_entities(dataset_name: str, store: Optional[MentionStore] = None,
+                              batch_size: int = ANNOTATION_BATCH_SIZE):
+    """
+    Yield lists of Mentions for the examples accepted in dataset_name since the last call
+    (also across runs, see prodigy_reader.py), one list per batch of examples.
+    """
+    store = store if store is not None else MentionStore()
+    for records in iter_new_accepted_records(dataset_name, batch_size=batch_size):
+        yield piecewise_extraction_to_records(records, store)
+
 ''' 
 ------------------------------------------------------------
 5. EXTRACT RELATIONSHIPS FROM TEXT
@@ -292,137 +230,287 @@ note: right now this is being done content block by content block
 ------------------------------------------------------------
 '''
 
-import time
+TRAINED_MODEL_DIR = "trained-models"
+_trained_model = None
+
+def get_trained_model():
+    """Load the trained NER model once per process."""
+    global _trained_model
+    if _trained_model is None:
+        _trained_model = load_trained_model(TRAINED_MODEL_DIR)
+    return _trained_model
+
+_block_cache = None
+
+def get_block_cache() -> BlockCache:
+    """Open the block cache once per process, picking up entries written by other workers."""
+    global _block_cache
+    if _block_cache is None:
+        _block_cache = BlockCache(BLOCK_CACHE_PATH)
+    else:
+        _block_cache.refresh()
+    return _block_cache
+
+
+def extract_valid_spans(doc) -> List[Dict[str, Any]]:
+    """Keep the entities of a NER doc that have a valid type and text."""
+    spans = []
+
+    # Only accept valid entities
+    for ent in doc.ents:
+        if (ent.label_ in VALID_ENTITY_TYPES and 
+            is_valid_entity(ent.text)):
+            
+            spans.append({
+                "start": ent.start_char,
+                "end": ent.end_char,
+                "text": ent.text,
+                "entity_type": ent.label_,
+            })
+            print(f"Accepted entity: {ent.text} ({ent.label_})")
+        else:
+            print(f"Rejected entity: {ent.text} ({ent.label_})")
+    return spans
+
+
+def analyze_articles(articles: List[Dict[str, Any]]) -> List[tuple]:
+    """
+    ANALYZE stage (CPU bound, runs in the pipeline's process pool):
+    clean every block of a batch of articles, run NER over them with nlp.pipe,
+    then compute evidence sentences and embeddings.
+    Blocks seen before (in this batch or in the block cache) are only analyzed once,
+    their cached mentions just get the article's metadata attached.
+    Returns a list of (article, final_data) pairs.
+    """
+    trained_model = get_trained_model()
+    model_version = f"{trained_model.meta.get('name')}-{trained_model.meta.get('version')}"
+    cache = get_block_cache()
+
+    # 1. Look up every distinct block in the cache
+    analyses = {}  # raw block -> {"text": cleaned text, "mentions": [...]}
+    uncached_blocks = []
+    blocks_per_article = [[block_to_text(block) for block in article["contentBlocks"]] for article in articles]
+    for blocks in blocks_per_article:
+        for block in blocks:
+            if block in analyses:
+                continue
+            analyses[block] = cache.get_analysis(block, model_version)
+            if analyses[block] is None:
+                uncached_blocks.append(block)
+
+    # 2. NER for new blocks only, then evidence sentences and embeddings for all of
+    #    their entities at once (one nlp.pipe pass and one embedding batch per batch of articles)
+    cleaned_blocks = clean_texts(uncached_blocks)
+    analyzed_blocks = []  # (block, cleaned text, spans)
+    for block, doc in zip(uncached_blocks, trained_model.pipe(cleaned_blocks)):
+        analyzed_blocks.append((block, doc.text, extract_valid_spans(doc)))
+    records = piecewise_extraction_to_records(
+        [{"text": text, "meta": {}, "spans": spans} for _, text, spans in analyzed_blocks if spans]
+    )
+    offset = 0
+    for block, text, spans in analyzed_blocks:
+        # one mention per span, in order
+        block_records = records[offset:offset + len(spans)]
+        offset += len(spans)
+        analyses[block] = cache.put_analysis(block, model_version, text, block_records)
+
+    # 3. Attach each article's metadata to its blocks' mentions (one shared store per batch)
+    store = MentionStore()
+    analyzed = []
+    for article, blocks in zip(articles, blocks_per_article):
+        article_ref = store.add_article(article["id"], article["headline"], article["date"], article_content_hash(article))
+        final_data = []
+        for block in blocks:
+            analysis = analyses[block]
+            block_ref = store.add_block(analysis["text"])
+            for mention in analysis["mentions"]:
+                final_data.append(store.add_mention(
+                    article_ref, block_ref, mention["entity_type"], mention["entity_text"],
+                    mention["evidence"], mention["embedding"]
+                ))
+        if not final_data:
+            print(f"[INFO] No entities found for article {article['id']}.")
+        analyzed.append((article, final_data))
+    print(f"[INFO] Block cache: {cache.hits} hits, {cache.misses} misses")
+    return analyzed
+
+
+def relate_article(article: Dict[str, Any], updated_data: List[Dict[str, Any]], model_name: str, delay: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    RELATE stage (network bound): extract relationships with the LLM and attach
+    article-level metadata. Waits `delay` seconds afterwards to stay under rate limits.
+    """
+    cache = get_block_cache()
+    # no LLM call is made when every block's relationships are cached
+    calls_llm = any(not cache.has_relationships(rec["block_text"], model_name) for rec in updated_data)
+    relationships = extract_relationships_block_by_block(updated_data, model_name=model_name, cache=cache)
+
+    for rel in relationships:
+        rel["article_id"] = article["id"]
+        rel["headline"] = article["headline"]
+        rel["date"] = article["date"]
+
+    if delay and calls_llm:
+        print(f"[INFO] Finished processing article {article['id']}. Waiting {delay} seconds before next LLM call...")
+        time.sleep(delay)
+    return relationships
 
 
-def process_article(article: Dict[str, Any], model_name: str) -> List[Dict[str, Any]]:
+def process_article(article: Dict[str, Any], model_name: str, kb: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
-    Process a single article:
+    Process a single article serially:
       1. Run entity extraction on each block.
       2. Compute evidence sentences and embeddings.
-      3. Consolidate entities with KB.
+      3. Consolidate entities with KB (updates kb in place).
       4. Extract relationships using the LLM.
          (Wait 10 seconds after each API call to avoid rate limits.)
     Returns the relationships extracted for this article.
+    Use run_pipeline (see main) to process many articles in parallel.
     """
-    article_relationships = []
-    accepted_records = []
-    
-    # Process each text block in the article
-    for block_index, block_text in enumerate(article["contentBlocks"]):
-        # Clean the text before processing
-        cleaned_text = clean_text(block_text)
-        
-        # use trained model to extract entities
-        trained_model = "trained-models"
-        use_trained_model = load_trained_model(trained_model)
-        doc = use_trained_model(cleaned_text)
-        spans = []
-        
-        # Only accept valid entities
-        for ent in doc.ents:
-            if (ent.label_ in VALID_ENTITY_TYPES and 
-                is_valid_entity(ent.text)):
-                
-                spans.append({
-                    "start": ent.start_char,
-                    "end": ent.end_char,
-                    "text": ent.text,
-                    "entity_type": ent.label_,
-                })
-                print(f"Accepted entity: {ent.text} ({ent.label_})")
-            else:
-                print(f"Rejected entity: {ent.text} ({ent.label_})")
-        
-        if spans:  # Only keep blocks with found entities
-            accepted_records.append({
-                "text": cleaned_text,
-                "meta": {
-                    "article_id": article["id"],
-                    "headline": article["headline"],
-                    "date": article["date"],
-                    "block_index": block_index,
-                                            
-                },
-                "spans": spans
-            })
-
-    if not accepted_records:
-        print(f"[INFO] No entities found for article {article['id']}.")
-        return article_relationships
-    print("accepted_records", accepted_records)
-    # Create final records with evidence and embeddings for each entity mention
-    final_data = piecewise_extraction_to_records(accepted_records)
-    print("After piecewise_extraction_to_records")
-    for entity in KB:
-        print("canonical_name", KB[entity]["canonical_name"])
-        print("aliases", KB[entity]["aliases"])
+    [(article, final_data)] = analyze_articles([article])
+    if not final_data:
+        return []
 
     # Consolidate entities with the KB (updates KB in place)
-    updated_data = consolidate_entities_with_kb(final_data, KB)
-    print("After consolidate_entities_with_kb")
-    for entity in KB:
-        print("canonical_name", KB[entity]["canonical_name"])
-        print("aliases", KB[entity]["aliases"])
-
-    # Group records by block_text for relationship extraction
-    # (Assuming extract_relationships_block_by_block groups internally)
-    relationships = extract_relationships_block_by_block(updated_data, model_name=model_name)
-
-    
-    # Add article-level metadata if needed
-    for rel in relationships:
-        rel["article_id"] = article["id"]
-        rel["headline"] = article["headline"]
-        rel["date"] = article["date"]
-    article_relationships.extend(relationships)
-    
-    # Wait 10 seconds after the API call (or after processing this article)
-    print(f"[INFO] Finished processing article {article['id']}. Waiting 10 seconds before next article...")
-    time.sleep(10)
-    
-    return article_relationships
+    updated_data = consolidate_entities_with_kb(final_data, kb)
 
+    return relate_article(article, updated_data, model_name=model_name, delay=10)
 
-def parse_archive(archive_path: str) -> List[Dict[str, Any]]:
+
+def saved_articles(mentions_dir: str) -> Iterator[Tuple[Dict[str, Any], List[Mention]]]:
     """
-    Given a path to a JSON file containing an array of articles,
-    parse each article with parse_single_article and return a list
-    of structured article dicts.
+    (article, consolidated mentions) of every article in the mentions saved by a previous run,
+    to rerun only the RELATE stage (no NER, embeddings or KB consolidation). The article only
+    has its id, headline, date and the content hash its mentions were found with.
     """
-    with open(archive_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    parsed_articles = [parse_single_article(article) for article in data]
-    return parsed_articles
-
-if __name__ == "__main__":
-    # parse the archive & optionally limit to a few articles for testing
-    sample_path = "filtered_articles.json" 
-    articles = parse_archive(sample_path)
-    articles = articles[21:22]  # limited to 2 articles for testing
+    for mentions in iter_mention_parts(mentions_dir):
+        by_article = defaultdict(list)
+        for mention in mentions:
+            by_article[mention["article_id"]].append(mention)
+        for article_id, updated_data in by_article.items():
+            first = updated_data[0]
+            article = {"id": article_id, "headline": first["headline"], "date": first["date"],
+                       "content_hash": first.get("content_hash")}
+            yield article, updated_data
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Extract entities and relationships from an article archive.")
+    parser.add_argument("--archive", default="filtered_articles.json", help="JSON array of articles")
+    parser.add_argument("--start", type=int, default=0, help="index of the first article to process")
+    parser.add_argument("--end", type=int, default=None, help="index after the last article to process")
+    parser.add_argument("--article-id", action="append", help="process only this article id (repeatable)")
+    parser.add_argument("--workers", type=int, default=2, help="processes for NER and embedding")
+    parser.add_argument("--batch-size", type=int, default=4, help="articles per NER/embedding batch")
+    parser.add_argument("--llm-workers", type=int, default=2, help="concurrent LLM relationship extractors")
+    parser.add_argument("--llm-delay", type=float, default=10.0, help="seconds each LLM worker waits after an article")
+    parser.add_argument("--queue-size", type=int, default=8, help="max items waiting between stages")
+    parser.add_argument("--model", default="o3-mini", help="LLM used for relationship extraction")
+    parser.add_argument("--kb", default="KB.json", help="knowledge base file shared by all workers")
+    parser.add_argument("--output", default="relationships.jsonl", help="Prodigy tasks file to write")
+    parser.add_argument("--run-dir", default="runs/default", help="directory for the run's manifest and outputs")
+    parser.add_argument("--resume", action="store_true", help="skip articles completed by a previous run in --run-dir")
+    parser.add_argument("--incremental", action="store_true", help="only process articles that are new or changed since earlier runs")
+    parser.add_argument("--index", default="processed_index.jsonl", help="article id -> content hash index used by --incremental")
+    parser.add_argument("--relate-only", action="store_true", help="only rerun relationship extraction on the mentions saved in --run-dir")
+    args = parser.parse_args(argv)
+
+    mentions_dir = os.path.join(args.run_dir, "mentions")
+    relationships_table = os.path.join(args.run_dir, "relationships.cols")
+    checkpoint = RunCheckpoint(args.run_dir, resume=args.resume)
+    relate = partial(relate_article, model_name=args.model, delay=args.llm_delay)
+    archive_index = None  # closed once the pipeline has read its articles
+
+    if args.relate_only:
+        # the saved mentions stay as they are: there is no spool and no archive index to update
+        saved = {}  # mentions of the article checkpoint.pending was last given
+
+        def articles_of_saved():
+            for article, mentions in saved_articles(mentions_dir):
+                saved.clear()
+                saved[article["id"]] = mentions
+                yield article
+
+        results = run_relate(
+            ((article, saved[article["id"]]) for article in checkpoint.pending(articles_of_saved())),
+            relate=relate,
+            llm_workers=args.llm_workers,
+            queue_size=args.queue_size,
+        )
+        spool = index = None
+    else:
+        # stream the archive, or seek straight to the requested articles through its byte-offset index
+        if args.article_id:
+            archive_index = ArchiveIndex(args.archive)
+            articles = archive_index.iter_ids(args.article_id)
+        elif args.start or args.end is not None:
+            archive_index = ArchiveIndex(args.archive)
+            articles = archive_index.iter_range(args.start, args.end)
+        else:
+            articles = iter_archive(args.archive)
+        index = ArticleIndex(args.index)
+        if args.incremental:
+            # only new/changed articles (record retracts the previous version of changed ones, see ArticleIndex.mark_processed)
+            articles = index.new_or_changed(articles)
+        kb_store = KBStore(args.kb)  # committed atomically after every article
+        spool = MentionSpool(mentions_dir, resume=args.resume)
+
+        def consolidate(final_data):
+            updated_data = kb_store.consolidate(final_data)
+            spool.add(updated_data)
+            return updated_data
+
+        results = run_pipeline(
+            checkpoint.pending(articles),
+            analyze_batch=analyze_articles,
+            consolidate=consolidate,
+            relate=relate,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            llm_workers=args.llm_workers,
+            queue_size=args.queue_size,
+        )
+
+    def record(article, article_rels):
+        content_hash = article_content_hash(article)
+        for rel in article_rels:
+            rel["content_hash"] = content_hash
+        checkpoint.record(article, article_rels)
+        if index is not None:
+            index.mark_processed(article)
+
+    # finished articles whose mentions are still buffered in the spool: recorded as done
+    # once their mentions are written, so a resumed run never skips an article without them
+    waiting = []
+    try:
+        for article, article_rels, error in results:
+            if error is not None:
+                print(f"[ERROR] Failed to process article {article['id']}: {error}")
+                continue
+            print(f"[INFO] Processed article {article['id']}: {len(article_rels)} relationships")
+            waiting.append((article, article_rels))
+            still_buffered = []
+            for finished in waiting:
+                if spool is not None and spool.holds(finished[0]["id"]):
+                    still_buffered.append(finished)
+                else:
+                    record(*finished)
+            waiting = still_buffered
+    finally:
+        if archive_index is not None:
+            archive_index.close()
+
+    if spool is not None:
+        spool.flush()
+    for finished in waiting:
+        record(*finished)
+
+    # save the relationships of this and any resumed run to a JSONL file for verification in prodigy,
+    # one task per fact (subject, relationship, object) with the evidence of all its mentions
+    all_relationships = list(checkpoint.relationships())
+    write_relationships(relationships_table, all_relationships)
+    save_relationships_for_prodigy(aggregate_relationships(all_relationships), output_file=args.output) # prints instructions for Prodigy
 
-    all_relationships = []
-    model_name = "o3-mini" 
-    # knowledge base (in memory)
-    KB = {}  # uuid -> {canonical_name, aliases, embeddings}
 
-    # process each article individually
-    for article in articles:
-        print(f"[INFO] Processing article: {article['id']}")
-        article_rels = process_article(article, model_name=model_name)
-        print("AFTER")
-        for entity_id, entity_data in KB.items():
-            print(f"ID: {entity_id}")
-            print(f"Canonical Name: {entity_data['canonical_name']}")
-            print(f"Aliases: {entity_data['aliases']}")
-            print("-" * 40)  # Separator for clarity
-        all_relationships.extend(article_rels)
-         #save the KB to a json file
-        with open("KB.json", "w", encoding="utf-8") as f:
-            json.dump(KB, f, indent=4)
-
-    # save the relationships to a JSONL file for verification in prodigy
-    save_relationships_for_prodigy(all_relationships, output_file="relationships.jsonl") # prints instructions for Prodigy
-
-    
-    
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+'''
+Byte-offset index for random access into article archives
+1. build_archive_index streams the archive once (archive_reader.iter_raw_articles) and
+   writes a compact sidecar file next to it (<archive>.idx) with, per article:
+   _id, byte offset, byte length and content hash (checkpoint.article_content_hash)
+2. ArchiveIndex mmaps the archive and decodes only the requested articles,
+   by position or by _id, so selecting a range for a worker or rerunning one
+   article costs O(articles touched) instead of parsing the whole file
+
+Sidecar layout (little endian):
+    header   magic "BBIDX001", archive size, archive mtime_ns, article count
+    records  count x (offset u64, length u32, sha1 digest 20 bytes)
+    ids      "\\n"-joined UTF-8 article ids
+The index is rebuilt automatically when the archive's size or mtime changes.
+'''
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Any, List, Iterator, Optional
+
+from archive_reader import iter_raw_articles, parse_single_article
+from checkpoint import article_content_hash
+
+INDEX_MAGIC = b"BBIDX001"
+_HEADER = struct.Struct("<8sQQQ")
+_RECORD = struct.Struct("<QI20s")
+
+
+def index_path_for(archive_path: str) -> str:
+    return archive_path + ".idx"
+
+
+def build_archive_index(archive_path: str, index_path: Optional[str] = None) -> str:
+    """Stream the archive once and write its sidecar index. Returns the index path."""
+    index_path = index_path or index_path_for(archive_path)
+    st = os.stat(archive_path)
+    records = bytearray()
+    ids = []
+    for offset, length, article in iter_raw_articles(archive_path):
+        parsed = parse_single_article(article)
+        records += _RECORD.pack(offset, length, bytes.fromhex(article_content_hash(parsed)))
+        ids.append(str(parsed["id"]))
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, st.st_size, st.st_mtime_ns, len(ids)))
+        f.write(records)
+        f.write("\n".join(ids).encode("utf-8"))
+    os.replace(tmp_path, index_path)
+    print(f"✅ Indexed {len(ids)} articles of {archive_path} into {index_path}")
+    return index_path
+
+
+class ArchiveIndex:
+    def __init__(self, archive_path: str, index_path: Optional[str] = None):
+        self.archive_path = archive_path
+        self.index_path = index_path or index_path_for(archive_path)
+        if not self._is_current():
+            build_archive_index(archive_path, self.index_path)
+
+        with open(self.index_path, "rb") as f:
+            data = f.read()
+        _, _, _, self.count = _HEADER.unpack_from(data, 0)
+        records_end = _HEADER.size + self.count * _RECORD.size
+        self._records = memoryview(data)[_HEADER.size:records_end]
+        self.ids: List[str] = data[records_end:].decode("utf-8").split("\n") if self.count else []
+        self._positions: Dict[str, int] = {article_id: i for i, article_id in enumerate(self.ids)}
+
+        self._file = open(archive_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def _is_current(self) -> bool:
+        """True if the sidecar exists and was built from the archive as it is now."""
+        if not os.path.exists(self.index_path):
+            return False
+        st = os.stat(self.archive_path)
+        with open(self.index_path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return False
+        magic, size, mtime_ns, _ = _HEADER.unpack(header)
+        return magic == INDEX_MAGIC and size == st.st_size and mtime_ns == st.st_mtime_ns
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def content_hash(self, i: int) -> str:
+        """Content hash of the i-th article, without decoding it."""
+        return _RECORD.unpack_from(self._records, i * _RECORD.size)[2].hex()
+
+    def raw_article(self, i: int) -> Dict[str, Any]:
+        """Decode only the i-th article of the archive."""
+        if not 0 <= i < self.count:
+            raise IndexError(f"Article index {i} out of range (archive has {self.count} articles)")
+        offset, length, _ = _RECORD.unpack_from(self._records, i * _RECORD.size)
+        return json.loads(self._mmap[offset:offset + length])
+
+    def article(self, i: int) -> Dict[str, Any]:
+        return parse_single_article(self.raw_article(i))
+
+    def article_by_id(self, article_id: str) -> Dict[str, Any]:
+        if article_id not in self._positions:
+            raise KeyError(f"Article {article_id} not in {self.archive_path}")
+        return self.article(self._positions[article_id])
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield parsed articles[start:end] without touching the rest of the archive."""
+        for i in range(*slice(start, end).indices(self.count)):
+            yield self.article(i)
+
+    def iter_ids(self, article_ids: List[str]) -> Iterator[Dict[str, Any]]:
+        for article_id in article_ids:
+            yield self.article_by_id(article_id)
+
+
+if __name__ == "__main__":
+    import sys
+    for path in sys.argv[1:] or ["filtered_articles.json"]:
+        build_archive_index(path)
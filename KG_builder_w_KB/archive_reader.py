@@ -0,0 +1,143 @@
+'''
+Streaming archive reader
+Archive exports are one big JSON array of articles. Instead of json.load-ing the
+whole file, the array is decoded one element at a time from a small rolling
+buffer, so memory stays constant and the first article is available immediately.
+
+- iter_raw_articles: yields (byte_offset, byte_length, raw article dict)
+- iter_archive:      yields parse_single_article results
+- parse_archive:     list of all parsed articles (small archives / random sampling)
+'''
+
+import json
+from typing import Dict, Any, List, Iterator, Tuple
+
+READ_CHUNK_SIZE = 1 << 20  # characters read from the archive at a time
+_WHITESPACE = " \t\r\n"
+
+
+def parse_single_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Given one article dict (with keys like _id, headline, jsonBody, displayDate),
+    return a structured dictionary with:
+      - id
+      - date
+      - headline
+      - contentBlocks (list of strings)
+    """
+    # Extract basic fields
+    article_id = article.get("_id", None)
+    headline = article.get("headline", "")
+
+    display_date = article.get("displayDate") or {}   # If None, default to {}
+    date_obj = display_date.get("$date", None)
+
+    # Extract each block of text from jsonBody
+    json_body = article.get("jsonBody", [])
+    content_blocks = []
+    for block in json_body:
+        text = block.get("content", "")
+        if text:  # only append if there's actual text
+            content_blocks.append(text)
+
+
+    return {
+        "id": article_id,
+        "date": date_obj,
+        "headline": headline,
+        "contentBlocks": content_blocks
+    }
+
+
+def iter_raw_articles(archive_path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """
+    Incrementally decode a JSON array of articles.
+    Yields (byte_offset, byte_length, article) for every element of the array,
+    where the byte range locates the element's JSON text in the file.
+    """
+    decoder = json.JSONDecoder()
+    # newline="" keeps "\r\n" as-is so character counts map back to bytes exactly
+    with open(archive_path, "r", encoding="utf-8", newline="") as f:
+        buffer = f.read(chunk_size)
+        pos = 0  # current position in buffer
+        pos_bytes = 0  # file byte offset of buffer[pos]
+        eof = not buffer
+        if buffer.startswith("\ufeff"):  # UTF-8 byte order mark
+            pos, pos_bytes = 1, 3
+
+        def advance(new_pos):
+            nonlocal pos, pos_bytes
+            pos_bytes += len(buffer[pos:new_pos].encode("utf-8"))
+            pos = new_pos
+
+        def read_more(size=chunk_size):
+            # drop the consumed part of the buffer and append the next chunk
+            nonlocal buffer, pos, eof
+            more = f.read(size)
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+
+        def next_token():
+            # skip whitespace, refilling the buffer as needed; returns "" at end of file
+            while True:
+                end = pos
+                while end < len(buffer) and buffer[end] in _WHITESPACE:
+                    end += 1
+                advance(end)
+                if pos < len(buffer) or eof:
+                    return buffer[pos] if pos < len(buffer) else ""
+                read_more()
+
+        if next_token() != "[":
+            raise ValueError(f"{archive_path} is not a JSON array of articles")
+        advance(pos + 1)
+
+        expect_element = True
+        while True:
+            token = next_token()
+            if token == "]":
+                return
+            if token == "":
+                raise ValueError(f"Unexpected end of file in {archive_path}")
+            if token == ",":
+                advance(pos + 1)
+                expect_element = True
+                continue
+            if not expect_element:
+                raise ValueError(f"Expected ',' or ']' at byte {pos_bytes} of {archive_path}")
+
+            read_size = chunk_size
+            while True:
+                try:
+                    article, end = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # element spans past the end of the buffer, read more (doubling so
+                    # a very large article is not re-decoded once per chunk)
+                    read_more(read_size)
+                    read_size *= 2
+
+            start_bytes = pos_bytes
+            advance(end)
+            if not isinstance(article, dict):
+                raise ValueError(f"Expected an article object at byte {start_bytes} of {archive_path}")
+            yield start_bytes, pos_bytes - start_bytes, article
+            expect_element = False
+
+
+def iter_archive(archive_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield parse_single_article results one at a time as the archive streams from disk."""
+    for _, _, article in iter_raw_articles(archive_path):
+        yield parse_single_article(article)
+
+
+def parse_archive(archive_path: str) -> List[Dict[str, Any]]:
+    """
+    Given a path to a JSON file containing an array of articles,
+    parse each article with parse_single_article and return a list
+    of structured article dicts.
+    """
+    return list(iter_archive(archive_path))
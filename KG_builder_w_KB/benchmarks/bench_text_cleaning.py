@@ -0,0 +1,73 @@
+'''
+Benchmark: per-block cost of text cleaning and entity validation
+Compares the original implementations (BeautifulSoup on every block, regexes
+compiled per call) with text_cleaning.py, and checks both give the same output.
+
+Run from KG_builder_w_KB:
+    python benchmarks/bench_text_cleaning.py [archive.json]
+'''
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from archive_reader import iter_archive
+from text_cleaning import block_to_text, clean_text, clean_texts, is_valid_entity
+
+
+def legacy_clean_text(text: str) -> str:
+    """Original KGextraction.clean_text"""
+    text = BeautifulSoup(text, "html.parser").get_text()
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'www\.\S+', '', text)
+    text = re.sub(r'css_[a-zA-Z_]+="[^"]*"', '', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\S+/\S+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_is_valid_entity(text: str) -> bool:
+    """Original KGextraction.is_valid_entity"""
+    invalid_patterns = ['/', '>', '<', 'css_', 'px', '.com', 'http', '"', '-3rd-', '="', '_', ']', '[']
+    if any(pattern in text for pattern in invalid_patterns):
+        return False
+    if not re.match(r'^[\w\s\'-,.]+$', text):
+        return False
+    if re.match(r'^[\d\W]+$', text):
+        return False
+    return True
+
+
+def per_item_us(fn, items, repeat=3) -> float:
+    best = min(timeit.repeat(lambda: [fn(item) for item in items], number=1, repeat=repeat))
+    return best / len(items) * 1e6
+
+
+def main():
+    archive_path = sys.argv[1] if len(sys.argv) > 1 else "filtered_articles.json"
+    blocks = [block_to_text(block) for article in iter_archive(archive_path) for block in article["contentBlocks"]]
+    markup = sum(1 for block in blocks if "<" in block or "&" in block)
+    candidates = [word for block in blocks[:2000] for word in block.split()] + ["Jacob Frey", "css_class", "12/3"]
+
+    mismatches = [block for block in blocks if clean_text(block) != legacy_clean_text(block)]
+    mismatches += [text for text in candidates if is_valid_entity(text) != legacy_is_valid_entity(text)]
+    print(f"{len(blocks)} blocks ({markup} with markup), {len(mismatches)} output mismatches")
+
+    legacy = per_item_us(legacy_clean_text, blocks)
+    fast = per_item_us(clean_text, blocks)
+    batch = min(timeit.repeat(lambda: clean_texts(blocks), number=1, repeat=3)) / len(blocks) * 1e6
+    print(f"clean_text       legacy {legacy:8.1f} us/block   fast {fast:8.1f} us/block   ({legacy / fast:.1f}x)")
+    print(f"clean_texts      batch  {batch:8.1f} us/block")
+
+    legacy = per_item_us(legacy_is_valid_entity, candidates)
+    fast = per_item_us(is_valid_entity, candidates)
+    print(f"is_valid_entity  legacy {legacy:8.2f} us/text    fast {fast:8.2f} us/text    ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+'''
+Block-level result cache
+Wire stories, corrections and boilerplate ("Staff writer ... contributed to this report")
+repeat across many articles. Each content block is hashed and the expensive results are
+cached under that hash, so a duplicate block in a later article skips NER, embeddings
+and the LLM call and only gets the new article's metadata re-attached.
+
+Two kinds of entries:
+    "analysis": cleaned text + entity mentions (span, type, evidence sentence, embedding)
+                keyed by the raw block text and the NER model
+    "llm":      the raw LLM relationships for a cleaned block, keyed by the block and the LLM
+
+Entries live in an append-only JSONL file. Only the key -> (offset, length) index is kept
+in memory, entries are read back from disk on a hit. Several processes can share the file:
+appends are single writes and refresh() picks up entries written by other workers.
+'''
+
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from mention_records import embedding_as_list
+
+BLOCK_CACHE_PATH = "block_cache.jsonl"
+
+
+def block_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class BlockCache:
+    def __init__(self, path: str = BLOCK_CACHE_PATH):
+        self.path = path
+        self._index: Dict[str, Tuple[int, int]] = {}  # cache key -> (offset, length)
+        self._indexed_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        """Index entries appended since the last refresh (also by other processes)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_bytes)
+            offset = self._indexed_bytes
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # entry still being written
+                try:
+                    key = json.loads(line)["key"]
+                except ValueError:
+                    key = None  # torn line from a crash, skip it
+                if key is not None:
+                    self._index[key] = (offset, len(line))
+                offset += len(line)
+            self._indexed_bytes = offset
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        location = self._index.get(key)
+        if location is None:
+            self.misses += 1
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(location[0])
+            entry = json.loads(f.read(location[1]))
+        self.hits += 1
+        return entry
+
+    def _put(self, entry: Dict[str, Any]):
+        data = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            # position after our own O_APPEND write, safe when other workers append too
+            offset = f.tell() - len(data)
+        self._index[entry["key"]] = (offset, len(data))
+
+    # ---- NER + evidence + embeddings ----
+
+    @staticmethod
+    def analysis_key(raw_block: str, model_version: str) -> str:
+        return f"analysis:{model_version}:{block_hash(raw_block)}"
+
+    def get_analysis(self, raw_block: str, model_version: str) -> Optional[Dict[str, Any]]:
+        """Return {"text": cleaned text, "mentions": [...]} for a block seen before, else None."""
+        return self._get(self.analysis_key(raw_block, model_version))
+
+    def put_analysis(self, raw_block: str, model_version: str, cleaned_text: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Cache the mention records of one block without their article metadata, return the entry."""
+        mentions = [
+            {
+                "entity_type": record["entity_type"],
+                "entity_text": record["entity_text"],
+                "evidence": record["evidence"],
+                "embedding": embedding_as_list(record["embedding"]),
+            }
+            for record in records
+        ]
+        entry = {"key": self.analysis_key(raw_block, model_version), "text": cleaned_text, "mentions": mentions}
+        self._put(entry)
+        return entry
+
+    # ---- raw LLM relationships ----
+
+    @staticmethod
+    def llm_key(block_text: str, model_name: str) -> str:
+        return f"llm:{model_name}:{block_hash(block_text)}"
+
+    def has_relationships(self, block_text: str, model_name: str) -> bool:
+        return self.llm_key(block_text, model_name) in self._index
+
+    def get_relationships(self, block_text: str, model_name: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._get(self.llm_key(block_text, model_name))
+        return entry["relationships"] if entry is not None else None
+
+    def put_relationships(self, block_text: str, model_name: str, relationships: List[Dict[str, Any]]):
+        self._put({"key": self.llm_key(block_text, model_name), "relationships": relationships})
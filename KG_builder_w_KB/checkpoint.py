@@ -0,0 +1,139 @@
+'''
+Checkpointing and resume for long archive runs
+1. Each finished article's relationships are appended to the run's output file,
+   flushed and fsynced BEFORE the article is recorded as done
+2. The manifest (one JSON line per event) records the article id, its content hash
+   and the byte range of its relationships in the output file
+3. On resume:
+    -> articles recorded as done with an unchanged content hash are skipped
+    -> bytes written after the last completed article (a crash mid-write) are truncated
+    -> articles that were started but never completed are processed again
+
+Run directory layout:
+    <run_dir>/manifest.jsonl            {"event": "started"|"done", "article_id", "content_hash", ...}
+    <run_dir>/relationships.raw.jsonl   one relationship per line, grouped by article
+
+append_durably is shared by the other append-only JSONL logs: incremental.ArticleIndex
+(incremental runs over new exports), graph_rows.ImportCheckpoint (resumable graph
+imports) and prodigy_reader.AnnotationCursor (incremental reads of Prodigy datasets).
+'''
+
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Iterable, Iterator
+
+MANIFEST_FILE = "manifest.jsonl"
+OUTPUT_FILE = "relationships.raw.jsonl"
+
+
+def article_content_hash(article: Dict[str, Any]) -> str:
+    """
+    Hash of a parsed article's headline and content blocks. An article rebuilt from saved
+    mentions (KGextraction --relate-only) has no content blocks and carries the hash instead.
+    """
+    if "content_hash" in article:
+        return article["content_hash"]
+    payload = json.dumps([article.get("headline", ""), article.get("contentBlocks", [])], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def append_durably(path: str, data: bytes) -> int:
+    """Append bytes to a file, fsync it and return the offset they were written at."""
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        # position after our own O_APPEND write, safe when another thread appends too
+        offset = f.tell() - len(data)
+    return offset
+
+
+class RunCheckpoint:
+    def __init__(self, run_dir: str = "runs/default", resume: bool = False):
+        self.run_dir = run_dir
+        self.manifest_path = os.path.join(run_dir, MANIFEST_FILE)
+        self.output_path = os.path.join(run_dir, OUTPUT_FILE)
+        self.done: Dict[str, Dict[str, Any]] = {}  # article_id -> latest "done" entry
+        self.in_flight: Dict[str, str] = {}  # article_id -> content hash, started but not done
+
+        os.makedirs(run_dir, exist_ok=True)
+        if resume:
+            self._load()
+        else:
+            for path in (self.manifest_path, self.output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _load(self):
+        """Replay the manifest and cut off anything written after the last good entry."""
+        good_manifest_bytes = 0
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a crash
+                    if not line.endswith(b"\n"):
+                        break
+                    good_manifest_bytes += len(line)
+                    if entry["event"] == "started":
+                        self.in_flight[entry["article_id"]] = entry["content_hash"]
+                    elif entry["event"] == "done":
+                        self.done[entry["article_id"]] = entry
+                        self.in_flight.pop(entry["article_id"], None)
+            os.truncate(self.manifest_path, good_manifest_bytes)
+
+        committed_end = max((e["offset"] + e["length"] for e in self.done.values()), default=0)
+        if os.path.exists(self.output_path) and os.path.getsize(self.output_path) > committed_end:
+            os.truncate(self.output_path, committed_end)
+
+        print(f"[INFO] Resuming: {len(self.done)} articles done, {len(self.in_flight)} in flight will be redone")
+
+    def is_done(self, article: Dict[str, Any]) -> bool:
+        entry = self.done.get(article["id"])
+        return entry is not None and entry["content_hash"] == article_content_hash(article)
+
+    def pending(self, articles: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the articles that still need processing, marking each as started."""
+        skipped = 0
+        for article in articles:
+            if self.is_done(article):
+                skipped += 1
+                continue
+            content_hash = article_content_hash(article)
+            self.in_flight[article["id"]] = content_hash
+            self._append_manifest({"event": "started", "article_id": article["id"], "content_hash": content_hash})
+            yield article
+        if skipped:
+            print(f"[INFO] Skipped {skipped} articles completed in a previous run")
+
+    def record(self, article: Dict[str, Any], relationships: List[Dict[str, Any]]):
+        """Durably store an article's relationships, then mark it done."""
+        data = "".join(json.dumps(rel, ensure_ascii=False) + "\n" for rel in relationships).encode("utf-8")
+        offset = append_durably(self.output_path, data)
+        entry = {
+            "event": "done",
+            "article_id": article["id"],
+            "content_hash": article_content_hash(article),
+            "offset": offset,
+            "length": len(data),
+            "count": len(relationships),
+        }
+        self._append_manifest(entry)
+        self.done[article["id"]] = entry
+        self.in_flight.pop(article["id"], None)
+
+    def _append_manifest(self, entry: Dict[str, Any]):
+        append_durably(self.manifest_path, (json.dumps(entry) + "\n").encode("utf-8"))
+
+    def relationships(self) -> Iterator[Dict[str, Any]]:
+        """Yield the relationships of every completed article (latest version of each)."""
+        if not self.done:
+            return
+        with open(self.output_path, "rb") as f:
+            for entry in sorted(self.done.values(), key=lambda e: e["offset"]):
+                f.seek(entry["offset"])
+                for line in f.read(entry["length"]).splitlines():
+                    yield json.loads(line)
@@ -0,0 +1,323 @@
+'''
+Columnar on-disk format for stage outputs (mentions and relationships)
+JSONL stage outputs carry every string again on every line and embeddings as text
+floats, so they are large and slow to reload. A columnar table is a directory:
+
+    <table>/schema.json          {"rows": n, "columns": {name: kind}, "arrays": [...]}
+    <table>/<name>.npy           numeric column (int32, int64, float32, ...)
+    <table>/<name>.codes.npy     string column: int32 code per row (-1 = None)
+    <table>/<name>.vocab.npy     string column: distinct values as one UTF-8 blob (uint8)
+    <table>/<name>.offsets.npy   string column: int64 start of each value in the blob (+ end)
+    <table>/<array>.npy          extra arrays, e.g. embeddings (float32, one row per evidence sentence)
+
+Strings are dictionary-encoded, and every .npy file is memory-mapped on load, so a
+stage reloads its inputs without parsing or copying them.
+
+- write_mentions / read_mentions: consolidated Mentions (mention_records) between
+  the CONSOLIDATE and RELATE stages, embeddings stored once per evidence sentence
+- write_relationships / read_relationships: relate stage output (before Prodigy)
+- MentionSpool: buffers a run's mentions and writes them as numbered parts
+
+Run:
+    python columnar.py to-prodigy runs/default/relationships.cols relationships.jsonl
+'''
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Set
+
+import numpy as np
+
+from mention_records import MentionStore, Mention, EMBEDDING_DIM
+
+SCHEMA_FILE = "schema.json"
+STRING = "str"
+
+MENTION_COLUMNS = ["article_id", "headline", "date", "content_hash", "block_text", "evidence",
+                   "entity_type", "entity_text", "kb_id", "canonical_name"]
+RELATIONSHIP_COLUMNS = ["article_id", "headline", "date", "content_hash", "block_text", "evidence",
+                        "subject_text", "subject_kb_id", "subject_type",
+                        "object_text", "object_kb_id", "object_type", "relationship"]
+
+
+def encode_strings(values: Iterable[Optional[str]]):
+    """Dictionary-encode strings: (int32 codes, uint8 UTF-8 blob, int64 offsets, vocab list)."""
+    refs: Dict[str, int] = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        value = str(value)
+        if value not in refs:
+            refs[value] = len(refs)
+        codes.append(refs[value])
+    vocab = list(refs)
+    encoded = [value.encode("utf-8") for value in vocab]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return np.asarray(codes, dtype=np.int32), blob, offsets, vocab
+
+
+class StringColumn:
+    """Dictionary-encoded string column, decoded lazily from the memory-mapped vocab."""
+
+    def __init__(self, codes: np.ndarray, blob: np.ndarray, offsets: np.ndarray):
+        self.codes = codes
+        self._blob = blob
+        self._offsets = offsets
+        self._vocab: Optional[List[str]] = None
+
+    @property
+    def vocab(self) -> List[str]:
+        if self._vocab is None:
+            data = self._blob.tobytes()
+            bounds = self._offsets.tolist()
+            self._vocab = [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+        return self._vocab
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        code = int(self.codes[i])
+        return None if code < 0 else self.vocab[code]
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        vocab = self.vocab
+        for code in self.codes.tolist():
+            yield None if code < 0 else vocab[code]
+
+
+def write_table(path: str, columns: Dict[str, Any], arrays: Optional[Dict[str, np.ndarray]] = None) -> str:
+    """
+    Write a columnar table to the directory `path` (replacing it atomically).
+    Columns that are numpy arrays are stored as-is, anything else as a string column.
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns of {path} have different lengths: {sorted(lengths)}")
+    tmp_path = path.rstrip("/") + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    schema = {"rows": lengths.pop() if lengths else 0, "columns": {}, "arrays": []}
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+            schema["columns"][name] = values.dtype.str
+        else:
+            codes, blob, offsets, _ = encode_strings(values)
+            np.save(os.path.join(tmp_path, f"{name}.codes.npy"), codes)
+            np.save(os.path.join(tmp_path, f"{name}.vocab.npy"), blob)
+            np.save(os.path.join(tmp_path, f"{name}.offsets.npy"), offsets)
+            schema["columns"][name] = STRING
+    for name, array in (arrays or {}).items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        schema["arrays"].append(name)
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ColumnTable:
+    """Read side of write_table, every column is memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), encoding="utf-8") as f:
+            self.schema = json.load(f)
+        self.rows: int = self.schema["rows"]
+        self._columns: Dict[str, Any] = {}
+
+    def _load(self, filename: str) -> np.ndarray:
+        try:
+            return np.load(os.path.join(self.path, filename), mmap_mode="r")
+        except ValueError:
+            # empty arrays cannot be memory-mapped
+            return np.load(os.path.join(self.path, filename))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.schema["columns"]
+
+    def __getitem__(self, name: str):
+        """A numeric column as an array, or a string column as a StringColumn."""
+        if name not in self._columns:
+            kind = self.schema["columns"].get(name)
+            if kind is None:
+                raise KeyError(f"No column {name!r} in {self.path}")
+            if kind == STRING:
+                self._columns[name] = StringColumn(
+                    self._load(f"{name}.codes.npy"), self._load(f"{name}.vocab.npy"), self._load(f"{name}.offsets.npy")
+                )
+            else:
+                self._columns[name] = self._load(f"{name}.npy")
+        return self._columns[name]
+
+    def array(self, name: str) -> np.ndarray:
+        if name not in self.schema["arrays"]:
+            raise KeyError(f"No array {name!r} in {self.path}")
+        return self._load(f"{name}.npy")
+
+    def iter_rows(self, names: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        names = names or list(self.schema["columns"])
+        columns = [iter(self[name]) if self.schema["columns"][name] == STRING else iter(self[name].tolist())
+                   for name in names]
+        for values in zip(*columns):
+            yield dict(zip(names, values))
+
+
+'''
+------------------------------------------------------------
+MENTIONS (CONSOLIDATE -> RELATE)
+------------------------------------------------------------
+'''
+
+def write_mentions(path: str, mentions: List[Mention]) -> str:
+    """
+    Write consolidated Mentions (from one or more MentionStores, or dict records).
+    The "evidence" column's vocab lines up with the rows of the embeddings array, so every
+    mention needs an evidence sentence (a None code would index no embedding row).
+    """
+    columns = {name: [mention[name] if name in mention else None for mention in mentions]
+               for name in MENTION_COLUMNS}
+    if None in columns["evidence"]:
+        missing = columns["evidence"].index(None)
+        raise ValueError(f"Mention {missing} of {path} has no evidence sentence to store its embedding with")
+    codes, blob, offsets, sentences = encode_strings(columns["evidence"])
+    dim = len(mentions[0]["embedding"]) if mentions else EMBEDDING_DIM
+    embeddings = np.zeros((len(sentences), dim), dtype=np.float32)
+    for code, mention in zip(codes.tolist(), mentions):
+        embeddings[code] = mention["embedding"]
+    return write_table(path, columns, arrays={"embeddings": embeddings})
+
+
+def read_mentions(path: str) -> List[Mention]:
+    """Load Mentions backed by one MentionStore whose embeddings are the memory-mapped array."""
+    table = ColumnTable(path)
+    evidence = table["evidence"]
+    store = MentionStore()
+    store.sentences = list(evidence.vocab)
+    store._sentence_refs = {sentence: i for i, sentence in enumerate(store.sentences)}
+    store._embeddings = table.array("embeddings")
+
+    article_ids, headlines, dates = table["article_id"], table["headline"], table["date"]
+    # parts written before mentions carried their article's content hash have no such column
+    content_hashes = table["content_hash"] if "content_hash" in table else [None] * len(table)
+    blocks = table["block_text"]
+    mentions = []
+    for i, row in enumerate(table.iter_rows(["entity_type", "entity_text", "kb_id", "canonical_name"])):
+        article_ref = store.add_article(article_ids[i], headlines[i], dates[i], content_hashes[i])
+        mention = Mention(store, article_ref, store.add_block(blocks[i]), int(evidence.codes[i]),
+                          row["entity_type"], row["entity_text"])
+        mention.kb_id = row["kb_id"]
+        mention.canonical_name = row["canonical_name"]
+        mentions.append(mention)
+    return mentions
+
+
+class MentionSpool:
+    """
+    Collect the consolidated mentions of a run and write them as numbered parts
+    (<dir>/part-00000, ...) every `flush_every` articles, so the RELATE stage can
+    be rerun from them without NER, embeddings or KB consolidation.
+    Mentions are buffered: an article must not be recorded as done (RunCheckpoint)
+    while holds(article_id), or a crash would lose mentions a resumed run does not redo.
+    add runs on the pipeline's consolidate thread, holds on the main thread.
+    """
+
+    def __init__(self, directory: str, flush_every: int = 32, resume: bool = False):
+        self.directory = directory
+        self.flush_every = flush_every
+        self._pending: List[Mention] = []
+        self._pending_articles: Set[str] = set()
+        self._lock = threading.Lock()
+        if not resume and os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok=True)
+        self._next_part = len(glob.glob(os.path.join(directory, "part-*[0-9]")))
+
+    def add(self, mentions: List[Mention]):
+        with self._lock:
+            self._pending.extend(mentions)
+            self._pending_articles.update(mention["article_id"] for mention in mentions)
+            if len(self._pending_articles) >= self.flush_every:
+                self._flush()
+
+    def holds(self, article_id: str) -> bool:
+        """Whether mentions of article_id are buffered, not written to a part yet."""
+        with self._lock:
+            return article_id in self._pending_articles
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            write_mentions(os.path.join(self.directory, f"part-{self._next_part:05d}"), self._pending)
+            self._next_part += 1
+        self._pending = []
+        self._pending_articles = set()
+
+
+def iter_mention_parts(directory: str) -> Iterator[List[Mention]]:
+    """
+    Yield the mentions of every part written by a MentionSpool, in order.
+    A resumed run redoes articles that were written to a part but not recorded as done,
+    so an article can be in several parts: only its mentions from the last one are yielded.
+    """
+    parts = sorted(glob.glob(os.path.join(directory, "part-*[0-9]")))
+    last_part = {}
+    for i, part in enumerate(parts):
+        for article_id in ColumnTable(part)["article_id"].vocab:
+            last_part[article_id] = i
+    for i, part in enumerate(parts):
+        yield [mention for mention in read_mentions(part) if last_part[mention["article_id"]] == i]
+
+
+'''
+------------------------------------------------------------
+RELATIONSHIPS (RELATE -> PRODIGY)
+------------------------------------------------------------
+'''
+
+def write_relationships(path: str, relationships: List[Dict[str, Any]]) -> str:
+    """Write relate-stage relationship records (see relationship_extractor)."""
+    columns = {name: [rel.get(name) for rel in relationships] for name in RELATIONSHIP_COLUMNS}
+    return write_table(path, columns)
+
+
+def read_relationships(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield relationship records as dicts, ready for save_relationships_for_prodigy."""
+    yield from ColumnTable(path).iter_rows(RELATIONSHIP_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert columnar stage outputs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_prodigy = subparsers.add_parser("to-prodigy", help="write Prodigy tasks from a relationships table")
+    to_prodigy.add_argument("table")
+    to_prodigy.add_argument("output", nargs="?", default="relationships.jsonl")
+    args = parser.parse_args(argv)
+
+    if args.command == "to-prodigy":
+        from relationship_validator import save_relationships_for_prodigy
+        save_relationships_for_prodigy(read_relationships(args.table), output_file=args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from typing import List, Dict, Any
 import uuid
 import numpy as np
 import difflib
+from mention_records import embedding_as_list
 
 ''' 
 ------------------------------------------------------------
@@ -16,6 +17,10 @@ SIMILARITY_THRESHOLD = 0.8  # Adjusted threshold for more precise matching
 TITLES_TO_REMOVE = ["mr.", "mrs.", "ms.", "dr.", "prof.", "hon.", "sir", "dame", "mx.", "mayor", "councilmember", "councilperson", "president", "governor", "senator", "representative", "judge", "attorney", "lawyer", "doctor", "professor", "prime minister"]
 SUFFIXES_TO_REMOVE = ["jr.", "sr.", "ii", "iii", "iv", "v"]
 
+# Namespace for deterministic KB ids: the same canonical name always maps to the same id,
+# so two workers that create the same entity concurrently agree on its id (see kb_store.py)
+KB_ID_NAMESPACE = uuid.UUID("6f1c2d0e-3b7a-4e5f-9a61-2c8d4b7e9f10")
+
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Compute cosine similarity between two vectors."""
     v1 = np.array(vec1)
@@ -39,11 +44,19 @@ def clean_canonical_name(name: str) -> str:
         return f"{first_name} {last_name}"
     return " ".join(filtered_parts)
 
+def kb_id_for(canonical_name: str) -> str:
+    """Deterministic KB id for a cleaned canonical name."""
+    return str(uuid.uuid5(KB_ID_NAMESPACE, canonical_name))
+
 def create_new_kb_entry(entity_text: str, embedding: List[float], kb: Dict[str, Any]) -> str:
     """Helper function to create a new KB entry with a cleaned canonical name."""
     canonical_name = clean_canonical_name(entity_text)
     if canonical_name != "":
-        new_id = str(uuid.uuid4())
+        new_id = kb_id_for(canonical_name)
+        if new_id in kb:
+            # Same canonical name already created (e.g. by another worker), reuse it
+            kb[new_id]["embeddings"].append(embedding)
+            return new_id
         kb[new_id] = {
             "canonical_name": canonical_name,
             "aliases": [canonical_name],  # Store in lowercase
@@ -77,12 +90,15 @@ def find_best_match(entity_text: str, embedding: List[float], kb: Dict[str, Any]
     return best_match_id, best_score
 
 def consolidate_entities_with_kb(final_data: List[Dict[str, Any]], kb: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Consolidate similar entities and update the knowledge base."""
+    """
+    Consolidate similar entities and update the knowledge base.
+    Records can be dicts or mention_records.Mention objects.
+    """
     updated_data = []
     
     for record in final_data:
         entity_text = record["entity_text"].lower()  # Normalize to lowercase
-        embedding = record["embedding"]
+        embedding = embedding_as_list(record["embedding"])  # KB is stored as JSON
         print("entity_text", entity_text)
         
         #Find best matching entity in KB
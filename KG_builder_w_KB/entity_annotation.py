@@ -17,53 +17,11 @@ import random
 import spacy
 import subprocess
 import freeport
+from archive_reader import parse_single_article, parse_archive
 
 
 TRAINING_SIZE = 10 # number of article paragraphs to use for training
 TRAINING_EPOCHS = 20 # number of epochs to train the model
-def parse_single_article(article: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Given one article dict (with keys _id, headline, jsonBody, displayDate),
-    return a structured dictionary with:
-      - id
-      - date
-      - headline
-      - contentBlocks (list of strings)
-    """
-    # extract basic fields
-    article_id = article.get("_id", None)
-    headline = article.get("headline", "")
-    
-    display_date = article.get("displayDate") or {}  
-    date_obj = display_date.get("$date", None)
-    
-    # Extract each block of text
-    json_body = article.get("jsonBody", [])
-    content_blocks = []
-    for block in json_body:
-        text = block.get("content", "")
-        if text:  # only append if there is actually some text
-            content_blocks.append(text)
-    
-
-    return {
-        "id": article_id,
-        "date": date_obj,
-        "headline": headline,
-        "contentBlocks": content_blocks
-    }
-
-def parse_archive(archive_path: str) -> List[Dict[str, Any]]:
-    """
-    Given a path to a JSON file containing an array of articles,
-    parse each article with parse_single_article and return a list
-    of structured article dicts.
-    """
-    with open(archive_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    parsed_articles = [parse_single_article(article) for article in data]
-    return parsed_articles
-  
 
 def extract_for_annotation(articles: List[Dict[str, Any]], output_file: str = "initial_entity_validation_group.jsonl"):
     """
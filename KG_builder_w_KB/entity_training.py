@@ -1,19 +1,33 @@
 '''
 Entity extraction TRAINING using prodigy
+1) train_model: trains an NER model on an annotated Prodigy dataset
+2) extract_entities_from_archive: runs the trained model over the whole archive
+    -> the model is loaded once (get_model) and blocks are processed with nlp.pipe
+    -> records are streamed into rotated JSONL shards (<root>.00000.jsonl, ...), a shard
+       only holds whole articles and is renamed into place when it is complete
+    -> a manifest (<output>.manifest.jsonl) lists completed shards and how many
+       articles they cover, so an interrupted run resumes after the last complete shard
+       (extraction_shards.ExtractionShardWriter)
+
+    python entity_training.py extract --archive filtered_articles.json --model trained-models --resume
 '''
 import prodigy
 import signal
 import os
 from prodigy.components.loaders import JSONL
 from config import ENTITY_TYPES #, RELATIONSHIP_TYPES
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Iterator
+import argparse
 import json
 import random
 import spacy
 import subprocess
-from entity_annotation import parse_archive
+from archive_reader import iter_archive
+from extraction_shards import ExtractionShardWriter, EXTRACTION_SHARD_SIZE
+from text_cleaning import block_to_text
 
 TRAINING_EPOCHS = 20 # number of epochs to train the model
+EXTRACTION_BATCH_SIZE = 64 # blocks per nlp.pipe batch
 
 def train_model(dataset: str, base_model: str, output_dir: str):
     """
@@ -53,78 +67,101 @@ def load_trained_model(model_path: str):
         print(f"Error loading model: {e}")
         raise
 
-def extract_entities_from_archive(nlp_model, articles: List[Dict[str, Any]], output_file: str = "extracted_entities.jsonl"):
+_models = {}
+
+def get_model(model_path: str):
+    """Load the trained model at model_path once per process."""
+    if model_path not in _models:
+        _models[model_path] = load_trained_model(model_path)
+    return _models[model_path]
+
+def _blocks(articles: Iterable[Dict[str, Any]]) -> Iterator[tuple]:
+    """(text, context) per block for nlp.pipe(as_tuples=True); articles without blocks still get one entry."""
+    for article in articles:
+        blocks = [block_to_text(block) for block in article["contentBlocks"]] or [""]
+        for i, text in enumerate(blocks):
+            yield text, (article, i, i == len(blocks) - 1)
+
+
+def block_entities(doc) -> List[Dict[str, Any]]:
+    entities = []
+    for ent in doc.ents:
+        if ent.label_ in ENTITY_TYPES:
+            entities.append({
+                "text": ent.text,
+                "label": ent.label_,
+                "start": ent.start_char,
+                "end": ent.end_char,
+                "kb_id": None  # Will be filled in during entity consolidation
+            })
+    return entities
+
+
+def extract_entities_from_archive(nlp_model, articles: Iterable[Dict[str, Any]], output_file: str = "extracted_entities.jsonl",
+                                  shard_size: int = EXTRACTION_SHARD_SIZE, batch_size: int = EXTRACTION_BATCH_SIZE,
+                                  resume: bool = False) -> Dict[str, int]:
     """
-    Extract entities from all articles using the trained model.
+    Extract entities from all articles using the trained model (a loaded model or its directory),
+    streaming the records into shards of output_file (see extraction_shards). With resume,
+    articles covered by the shards in the manifest are skipped; otherwise earlier shards are removed.
+    Returns counts of the records, articles and shards written by this call.
     """
-    extracted_data = []
-    
-    for article in articles:
-        article_id = article["id"]
-        headline = article["headline"]
-        date_str = article["date"]
-        
-        # Process each content block
-        for block in article["contentBlocks"]:
-            #load trained model
-            use_trained_model = load_trained_model(nlp_model)
-            # Process the text with our trained model
-            
-            doc = use_trained_model(block)
-            
-            # Extract entities
-            entities = []
-            for ent in doc.ents:
-                if ent.label_ in ENTITY_TYPES:
-                    entity_data = {
-                        "text": ent.text,
-                        "label": ent.label_,
-                        "start": ent.start_char,
-                        "end": ent.end_char,
-                        "kb_id": None  # Will be filled in during entity consolidation
-                    }
-                    entities.append(entity_data)
-            
+    nlp = get_model(nlp_model) if isinstance(nlp_model, str) else nlp_model
+    with ExtractionShardWriter(output_file, shard_size, resume=resume) as writer:
+        blocks = _blocks(writer.pending(articles))
+        for doc, (article, block_index, last_block) in nlp.pipe(blocks, as_tuples=True, batch_size=batch_size):
+            entities = block_entities(doc)
             if entities:
                 # Store the extracted entities with metadata
-                record = {
-                    "text": block,
+                writer.write({
+                    "text": doc.text,
                     "entities": entities,
                     "meta": {
-                        "article_id": article_id,
-                        "headline": headline,
-                        "date": date_str,
-                        "entity_type": ent.label_
+                        "article_id": article["id"],
+                        "headline": article["headline"],
+                        "date": article["date"],
+                        "block_index": block_index,
+                        "entity_types": sorted({entity["label"] for entity in entities})
                     }
-                }
-                extracted_data.append(record)
-
-                
-    
-    # Save to JSONL file
-    with open(output_file, "w", encoding="utf-8") as f:
-        for record in extracted_data:
-            f.write(json.dumps(record) + "\n")
-    
-    print(f"\n✅ Extracted entities saved to {output_file}")
-    return extracted_data
+                })
+            if last_block:
+                writer.end_article(article["id"])
 
-if __name__ == "__main__":
-    dataset = "my_dataset"
-    base_model = "en_core_web_sm"
-    output_dir = "./trained-models"
-    
+    stats = writer.stats
+    print(f"\n✅ Extracted entities from {stats['articles']} articles saved to {stats['shards']} shards of {output_file}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the NER model, or extract entities from the archive with it.")
+    subparsers = parser.add_subparsers(dest="command")
+    train = subparsers.add_parser("train", help="train a model on a Prodigy dataset (the default)")
+    train.add_argument("--dataset", default="my_dataset")
+    train.add_argument("--base-model", default="en_core_web_sm")
+    train.add_argument("--output-dir", default="./trained-models")
+    extract = subparsers.add_parser("extract", help="extract entities from every article in the archive")
+    extract.add_argument("--archive", default="filtered_articles.json")
+    extract.add_argument("--model", default="./trained-models", help="directory of the trained model")
+    extract.add_argument("--output", default="extracted_entities.jsonl")
+    extract.add_argument("--shard-size", type=int, default=EXTRACTION_SHARD_SIZE)
+    extract.add_argument("--batch-size", type=int, default=EXTRACTION_BATCH_SIZE)
+    extract.add_argument("--resume", action="store_true", help="continue after the last complete shard")
+    args = parser.parse_args(argv)
+
+    if args.command == "extract":
+        print("\nExtracting entities from all articles...")
+        extract_entities_from_archive(args.model, iter_archive(args.archive), args.output,
+                                      shard_size=args.shard_size, batch_size=args.batch_size, resume=args.resume)
+        return
+
+    dataset = getattr(args, "dataset", "my_dataset")
+    output_dir = getattr(args, "output_dir", "./trained-models")
     print("\nTraining model...")
-    train_model(dataset, base_model, output_dir)
-    
+    train_model(dataset, getattr(args, "base_model", "en_core_web_sm"), output_dir)
+
     print("\nLoading trained model...")
-    nlp_model = load_trained_model(output_dir)
-    
-    #print("\nLoading articles from archive...")
-    #articles = parse_archive("filtered_articles.json")
-    
-    #print("\nExtracting entities from all articles...")
-    #extracted_data = extract_entities_from_archive(nlp_model, articles)
-    
-    #print(f"\nProcessed {len(articles)} articles")
-    #print(f"Extracted data saved to extracted_entities.jsonl")
+    get_model(output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+'''
+Resumable sharded output for entity extraction over the archive (entity_training.py extract)
+Records are written to rotated JSONL shards of output_file (<root>.00000.jsonl, ...):
+    -> a shard only holds whole articles, it is closed after the article that takes it
+       to shard_size records, written as <shard>.tmp and renamed into place when complete
+    -> a manifest (<output>.manifest.jsonl) lists completed shards, fsynced after the rename:
+       {"shard", "records", "articles", "last_article_id"}
+    -> resuming skips the articles the manifest covers, and checks that the archive still
+       has each shard's last article at the same position before trusting the count
+
+    with ExtractionShardWriter("extracted_entities.jsonl", resume=True) as writer:
+        for article in writer.pending(iter_archive("filtered_articles.json")):
+            for record in records_of(article):
+                writer.write(record)
+            writer.end_article(article["id"])
+'''
+
+import json
+import os
+from typing import Dict, Any, List, Iterable, Iterator
+
+from pipeline import shard_path, shard_paths
+
+EXTRACTION_SHARD_SIZE = 10000  # records per output shard, rounded up to whole articles
+
+
+def manifest_path_for(output_file: str) -> str:
+    return output_file + ".manifest.jsonl"
+
+
+def read_manifest(output_file: str) -> List[Dict[str, Any]]:
+    """Completed shards, in order: {"shard", "records", "articles", "last_article_id"}"""
+    entries = []
+    path = manifest_path_for(output_file)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line from a crash
+    return entries
+
+
+class ExtractionShardWriter:
+    def __init__(self, output_file: str, shard_size: int = EXTRACTION_SHARD_SIZE, resume: bool = False):
+        """
+        With resume, shards in the manifest are kept and pending() skips their articles;
+        otherwise the manifest and earlier shards are removed.
+        """
+        self.output_file = output_file
+        self.shard_size = shard_size
+        self.manifest_path = manifest_path_for(output_file)
+        self.completed = read_manifest(output_file) if resume else []
+        if not resume and os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+        # shards of a previous run that are not in the manifest (all of them unless resuming)
+        completed_names = {os.path.basename(entry["shard"]) for entry in self.completed}
+        for path in shard_paths(output_file):
+            if os.path.basename(path) not in completed_names:
+                os.remove(path)
+
+        self.stats = {"records": 0, "articles": 0, "shards": 0}
+        self._index = len(self.completed)
+        self._file = None
+        self._records = 0
+        self._articles = 0
+        self._last_article_id = None
+        self._ended = (0, 0)  # (bytes, records) of the shard after its last whole article
+
+    def pending(self, articles: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        The articles after those covered by completed shards. Raises ValueError if a
+        completed shard's last article is not where the manifest puts it (the archive
+        changed since, so skipping by count would skip the wrong articles).
+        """
+        articles = iter(articles)
+        skip = sum(entry["articles"] for entry in self.completed)
+        if skip:
+            print(f"[INFO] Resuming after {skip} articles in {len(self.completed)} shards "
+                  f"(last article {self.completed[-1]['last_article_id']})")
+        position = 0
+        for entry in self.completed:
+            article = None
+            for _ in range(entry["articles"]):
+                article = next(articles, None)
+                if article is None:
+                    raise ValueError(f"Archive ends before the {skip} articles of {self.manifest_path}, not resuming")
+                position += 1
+            if article["id"] != entry["last_article_id"]:
+                raise ValueError(f"Article {position} of the archive is {article['id']}, not {entry['last_article_id']} "
+                                 f"as in {self.manifest_path}: the archive changed, rerun without resume")
+        yield from articles
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(shard_path(self.output_file, self._index) + ".tmp", "wb")
+            self._records = self._articles = 0
+            self._ended = (0, 0)
+
+    def write(self, record: Dict[str, Any]):
+        self._open()
+        self._file.write((json.dumps(record) + "\n").encode("utf-8"))
+        self._records += 1
+        self.stats["records"] += 1
+
+    def end_article(self, article_id: str):
+        """All records of article_id are written; closes the shard once it is full."""
+        self._open()
+        self._articles += 1
+        self.stats["articles"] += 1
+        self._last_article_id = article_id
+        self._ended = (self._file.tell(), self._records)
+        if self._records >= self.shard_size:
+            self._finish()
+
+    def _finish(self):
+        path = shard_path(self.output_file, self._index)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(path + ".tmp", path)
+        entry = {"shard": path, "records": self._records, "articles": self._articles, "last_article_id": self._last_article_id}
+        with open(self.manifest_path, "a", encoding="utf-8") as manifest:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        self.completed.append(entry)
+        self._index += 1
+        self.stats["shards"] += 1
+        print(f"[INFO] Wrote {self._records} records from {self._articles} articles to {path}")
+
+    def close(self):
+        """Complete the last shard. Records of an article that was not ended are dropped."""
+        if self._file is None:
+            return
+        if self._articles:
+            size, records = self._ended
+            self.stats["records"] -= self._records - records
+            self._file.truncate(size)
+            self._records = records
+            self._finish()
+        else:
+            self._file.close()
+            self._file = None
+            os.remove(shard_path(self.output_file, self._index) + ".tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
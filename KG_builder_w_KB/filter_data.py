@@ -1,5 +1,25 @@
+'''
+Filter an archive export down to articles about local Minneapolis politics
+- An article is kept if "minneapolis" appears in both its headline and body,
+  no crime keyword appears in the body (whole phrase match) and at least one
+  local political keyword appears in the headline or body
+- All keywords are compiled into a single pattern and each article is scanned once
+- Articles are streamed in (archive_reader) and out, and scanned in parallel batches
+- Prints how many articles matched each keyword
+
+Run:
+    python filter_data.py BackgroundBuddy.json filtered_articles.json --workers 8
+'''
+
+import argparse
 import json
 import re
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, Any, List, Tuple, Set
+
+from archive_reader import iter_raw_articles
+from pipeline import batched
 
 # Keywords related to local politics (you can expand this list)
 local_political_keywords = [
@@ -13,72 +33,151 @@ crime_keywords = [
     "restraining order", "charges", "shooter", "killed", "charged"
 ]
 
-# Read the JSON file
-json_file_path = 'BackgroundBuddy.json'
-filtered_docs = []
+LOCATION_KEYWORD = "minneapolis"
+
 
-def is_relevant_local_article(article):
+def compile_keyword_matcher(keywords: List[str]) -> re.Pattern:
     """
-    Filters articles to check if they are related to Minneapolis politics using a broader set of keywords.
+    One alternation over every keyword (longest first) inside a lookahead,
+    so a single finditer pass reports keywords that start at every position,
+    including overlapping ones.
     """
-    # Check the headline for local Minneapolis politics keywords
-    headline = article.get('headline', '').lower()
+    alternation = "|".join(re.escape(keyword) for keyword in sorted(set(keywords), key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))")
+
+
+_CRIME = {keyword.lower() for keyword in crime_keywords}
+_POLITICAL = {keyword.lower() for keyword in local_political_keywords}
+_ALL_KEYWORDS = sorted(_CRIME | _POLITICAL | {LOCATION_KEYWORD})
+KEYWORD_PATTERN = compile_keyword_matcher(_ALL_KEYWORDS)
+# keywords that are a prefix of a longer keyword: the lookahead only reports the longest one
+_PREFIXES = {
+    keyword: [other for other in _ALL_KEYWORDS if other != keyword and keyword.startswith(other)]
+    for keyword in _ALL_KEYWORDS
+}
 
-    # Check the body content for local Minneapolis politics keywords
-    body_content = ''
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _body_text(article: Dict[str, Any]) -> str:
+    parts = []
     for entry in article.get('jsonBody', []):
         content = entry.get('content', '')
-        
-        # Debugging to check if the content is a list or a string
-        if isinstance(content, str):  # If the content is a string, process it normally
-            body_content += content.lower() + ' '
-        elif isinstance(content, list):  # If the content is a list, print debugging information
-            body_content += ' '.join(str(item) for item in content).lower() + ' '
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.append(' '.join(str(item) for item in content))
         else:
             print(f"Unexpected type for 'content' in article with headline: {article.get('headline', 'No headline')}")
             print(f"Content: {content}")
-    
-
-    # Check if "minneapolis" is mentioned at least once
-    if 'minneapolis' not in body_content or 'minneapolis' not in headline:
-        return False  # Exclude articles that do not mention Minneapolis
-    
-    # Debugging: Check crime keyword matching
-    for keyword in crime_keywords:
-        # Test for exact phrase match of crime-related keywords
-        pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-        if re.search(pattern, body_content):
-            print(f"Crime keyword '{keyword}' found in article: {article.get('headline')}")
-            return False  # Exclude crime-related articles
-        
-# If any local-related keyword appears in the headline, it's considered relevant
-    if any(keyword.lower() in body_content or keyword.lower() in headline for keyword in local_political_keywords):
-        return True
-    
+    return ' '.join(parts)
+
+
+def scan_article(article: Dict[str, Any]) -> Tuple[bool, Set[str]]:
+    """
+    Scan the headline and body of an article once.
+    Returns (is relevant, set of keywords found).
     """
-    # Count how many political keywords are found in the content
-    political_keyword_count = sum(1 for keyword in local_political_keywords if re.search(r'\b' + re.escape(keyword) + r'\b', body_content))
-    
-    # Only include articles with at least 2 political keywords
-    if political_keyword_count >= 2:
-        return True  # Include articles with at least two local political keywords
+    headline = (article.get('headline') or '').lower()
+    text = headline + "\0" + _body_text(article).lower()
+    body_start = len(headline) + 1
+
+    found = set()
+    in_headline = set()
+    in_body = set()
+    crime_found = False
+    for match in KEYWORD_PATTERN.finditer(text):
+        start = match.start()
+        for keyword in [match.group(1)] + _PREFIXES[match.group(1)]:
+            end = start + len(keyword)
+            if keyword in _CRIME:
+                # crime keywords only count in the body, as whole words/phrases
+                if start < body_start:
+                    continue
+                if (start > 0 and _is_word_char(text[start - 1])) or (end < len(text) and _is_word_char(text[end])):
+                    continue
+                crime_found = True
+            found.add(keyword)
+            (in_headline if start < body_start else in_body).add(keyword)
+
+    # "minneapolis" must be mentioned in both the headline and the body
+    relevant = (
+        LOCATION_KEYWORD in in_headline
+        and LOCATION_KEYWORD in in_body
+        and not crime_found
+        and bool(found & _POLITICAL)
+    )
+    return relevant, found
+
+
+def is_relevant_local_article(article: Dict[str, Any]) -> bool:
     """
+    Filters articles to check if they are related to Minneapolis politics using a broader set of keywords.
+    """
+    return scan_article(article)[0]
+
+
+def _scan_batch(articles: List[Dict[str, Any]]) -> Tuple[List[str], Counter]:
+    """Worker: scan a batch, return the relevant articles as JSON text and keyword counts."""
+    kept = []
+    hits = Counter({"(scanned)": len(articles)})
+    for article in articles:
+        relevant, found = scan_article(article)
+        hits.update(found)
+        if relevant:
+            hits["(kept)"] += 1
+            kept.append(json.dumps(article, ensure_ascii=False, indent=4))
+    return kept, hits
+
+
+def filter_archive(input_path: str, output_path: str, workers: int = 1, batch_size: int = 256) -> Counter:
+    """
+    Stream articles from input_path and write the relevant ones to output_path
+    as a JSON array (same layout as json.dump(..., indent=4)).
+    Returns the number of articles per keyword, plus "(scanned)" and "(kept)" totals.
+    """
+    articles = (article for _, _, article in iter_raw_articles(input_path))
+    batches = batched(articles, batch_size)
+    hits = Counter()
+
+    pool = Pool(workers) if workers > 1 else None
+    results = pool.imap(_scan_batch, batches) if pool else map(_scan_batch, batches)
+    try:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            first = True
+            for kept, batch_hits in results:
+                hits.update(batch_hits)
+                for article_json in kept:
+                    f.write("\n" if first else ",\n")
+                    f.write("    " + article_json.replace("\n", "\n    "))
+                    first = False
+            f.write("]" if first else "\n]")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return hits
 
-    return False
 
-# Read the file and filter the articles
-with open(json_file_path, 'r', encoding='utf-8') as f:
-    data = json.load(f)  # Load the JSON data
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep only local Minneapolis politics articles from an archive export.")
+    parser.add_argument("input", nargs="?", default="BackgroundBuddy.json", help="JSON array of articles")
+    parser.add_argument("output", nargs="?", default="filtered_articles.json", help="where to write the kept articles")
+    parser.add_argument("--workers", type=int, default=1, help="processes scanning articles")
+    parser.add_argument("--batch-size", type=int, default=256, help="articles per worker batch")
+    args = parser.parse_args(argv)
 
-    # Iterate through each article and filter based on relevance
-    for article in data:
-        if is_relevant_local_article(article):
-            filtered_docs.append(article)
+    hits = filter_archive(args.input, args.output, workers=args.workers, batch_size=args.batch_size)
 
-# Save the filtered articles to a new JSON file (keeping the same structure)
-filtered_json_path = 'filtered_articles.json'
+    print(f"Kept {hits.pop('(kept)', 0)} of {hits.pop('(scanned)', 0)} articles")
+    print("Articles per keyword:")
+    for keyword in _ALL_KEYWORDS:
+        print(f"  {keyword:<20} {hits.get(keyword, 0)}")
+    print(f"Filtered articles saved to {args.output}")
 
-with open(filtered_json_path, 'w', encoding='utf-8') as f:
-    json.dump(filtered_docs, f, ensure_ascii=False, indent=4)
 
-print(f"Filtered articles saved to {filtered_json_path}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+'''
+Gazetteer entity spotting from KB names and aliases
+Links entity mentions in arbitrary text to KB ids without running the spaCy model:
+1. Every canonical name and alias in the KB (kb_names.KBNames, no embeddings) is
+   compiled into one Aho-Corasick automaton (case-insensitive)
+2. annotate() scans the text once, in time linear in the text length plus matches,
+   and keeps the longest non-overlapping matches that start and end on word boundaries
+3. Gazetteer.refresh() rebuilds the automaton when KB.json changes; the new automaton
+   is swapped in with a single assignment, so concurrent lookups see the old or the
+   new one, never a half-built one
+
+Run as a small local service for the browser extension:
+    python gazetteer.py --port 3002
+    curl -X POST localhost:3002/annotate -d '{"text": "Mayor Frey vetoed it."}'
+'''
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple
+
+from kb_names import KBNames
+from kb_store import KB_PATH
+
+MIN_ALIAS_LENGTH = 2
+
+
+def _lower(text: str) -> str:
+    """Lowercase without changing the length, so offsets map back to the input."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class Automaton:
+    """Aho-Corasick automaton over lowercased patterns, each with a payload."""
+
+    def __init__(self, patterns: Dict[str, Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]  # (pattern length, payload) ending at each state
+
+        for pattern, payload in patterns.items():
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((len(pattern), payload))
+
+        # breadth-first failure links, each state also inherits the outputs of its failure state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def iter_matches(self, text: str):
+        """Yield (start, end, payload) for every pattern occurrence in text (already lowercased)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+def longest_non_overlapping(matches: List[Tuple[int, int, Any]]) -> List[Tuple[int, int, Any]]:
+    """Leftmost-longest selection: earliest start first, longest match at a start wins."""
+    selected = []
+    last_end = 0
+    for start, end, payload in sorted(matches, key=lambda m: (m[0], -m[1])):
+        if start >= last_end:
+            selected.append((start, end, payload))
+            last_end = end
+    return selected
+
+
+class Gazetteer:
+    def __init__(self, kb_path: str = KB_PATH):
+        self.kb_names = KBNames(kb_path)
+        self._lock = threading.Lock()  # one rebuild at a time, lookups never wait
+        self.automaton = self._build()
+
+    def _build(self) -> Automaton:
+        patterns: Dict[str, Dict[str, Any]] = {}
+        for kb_id, entry in self.kb_names.items():
+            for name in [entry["canonical_name"]] + list(entry.get("aliases") or []):
+                key = _lower(name.strip()) if name else ""
+                if len(key) < MIN_ALIAS_LENGTH:
+                    continue
+                payload = patterns.setdefault(key, {"kb_ids": [], "canonical_names": []})
+                if kb_id not in payload["kb_ids"]:
+                    payload["kb_ids"].append(kb_id)
+                    payload["canonical_names"].append(entry["canonical_name"])
+        return Automaton(patterns)
+
+    def refresh(self) -> bool:
+        """Rebuild from the KB if it changed. Returns True if a new automaton was swapped in."""
+        with self._lock:
+            if not self.kb_names.refresh():
+                return False
+            self.automaton = self._build()  # atomic swap
+            return True
+
+    def annotate(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Longest non-overlapping KB name/alias matches on word boundaries:
+        [{"start", "end", "text", "kb_ids", "canonical_names"}, ...]
+        kb_ids has more than one id when an alias is shared by several entries.
+        """
+        automaton = self.automaton  # the lookup keeps using this one even if a reload swaps it
+        matches = [
+            (start, end, payload)
+            for start, end, payload in automaton.iter_matches(_lower(text))
+            if (start == 0 or not _is_word_char(text[start - 1])) and (end == len(text) or not _is_word_char(text[end]))
+        ]
+        return [
+            {"start": start, "end": end, "text": text[start:end], **payload}
+            for start, end, payload in longest_non_overlapping(matches)
+        ]
+
+
+def serve(gazetteer: Gazetteer, host: str = "localhost", port: int = 3002, reload_interval: float = 5.0):
+    """POST /annotate {"text": ...} -> {"entities": [...]}, reloading the KB when it changes."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Access-Control-Allow-Origin", "*")  # called from the browser extension
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Content-Type")
+            self.end_headers()
+
+        def do_POST(self):
+            if self.path != "/annotate":
+                return self._send(404, {"error": f"Unknown path {self.path}"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                text = request["text"]
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {"error": 'Expected a JSON body {"text": ...}'})
+            self._send(200, {"entities": gazetteer.annotate(text)})
+
+        def log_message(self, format, *args):
+            pass  # one line per request is too noisy for the editor overlay
+
+    def reload_loop():
+        while True:
+            time.sleep(reload_interval)
+            if gazetteer.refresh():
+                print(f"✅ Reloaded gazetteer ({len(gazetteer.automaton)} states)")
+
+    threading.Thread(target=reload_loop, daemon=True).start()
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"✅ Gazetteer with {len(gazetteer.automaton)} states serving on http://{host}:{port}/annotate")
+    server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spot KB entities in text by name/alias.")
+    parser.add_argument("--kb", default=KB_PATH)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3002)
+    parser.add_argument("--text", help="annotate this text and exit instead of serving")
+    args = parser.parse_args(argv)
+
+    gazetteer = Gazetteer(args.kb)
+    if args.text is not None:
+        print(json.dumps(gazetteer.annotate(args.text), indent=2))
+        return
+    serve(gazetteer, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
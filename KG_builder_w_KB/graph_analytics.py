@@ -0,0 +1,301 @@
+'''
+In-process graph analytics over a CSR snapshot of the knowledge graph
+Answers "how is X connected to Y", "who are X's most frequent co-actors" and
+"who is central" without round trips to Neo4j.
+
+1. RelationshipGraph.from_jsonl loads validated_relationships.jsonl (graph_rows, same
+   accepted/retracted rules as the Neo4j import) plus the KB's names and aliases
+2. Entities become node indices 0..n-1; every accepted annotation is one edge with
+   typed columns: src, dst, relationship (dictionary code), date (datetime64[D]) and
+   article (dictionary code)
+3. Adjacency is kept in compressed sparse row form (indptr/indices/edge ids), once
+   for outgoing, once for incoming edges, so traversals are numpy slices
+
+Queries: k_hop, shortest_path, co_actors, time_window (a new graph over the same
+nodes), degree ranking and pagerank.
+
+Run:
+    python graph_analytics.py path "Jacob Frey" "Third Precinct"
+    python graph_analytics.py coactors "Jacob Frey"
+    python graph_analytics.py pagerank --since 2023-01-01
+'''
+
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from graph_rows import relationship_type, read_relationship_rows
+from kb_names import KBNames
+from kb_store import KB_PATH
+
+DIRECTIONS = ("out", "in", "both")
+
+
+def _to_day(date: Optional[str]) -> np.datetime64:
+    if not date:
+        return np.datetime64("NaT", "D")
+    try:
+        return np.datetime64(str(date)[:10], "D")
+    except ValueError:
+        return np.datetime64("NaT", "D")
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR over n rows: (indptr, values sorted by key, edge id of each entry)."""
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, values[order], order.astype(np.int64)
+
+
+class RelationshipGraph:
+    def __init__(self, ids: List[str], names: List[str], aliases: Dict[str, int],
+                 src: np.ndarray, dst: np.ndarray, relationship: np.ndarray, date: np.ndarray,
+                 article: np.ndarray, relationship_vocab: List[str], article_vocab: List[str]):
+        self.ids = ids
+        self.names = names
+        self._index = {kb_id: i for i, kb_id in enumerate(ids)}
+        self._aliases = aliases  # lowercased name/alias -> node
+        # typed edge columns
+        self.src = src
+        self.dst = dst
+        self.relationship = relationship
+        self.date = date
+        self.article = article
+        self.relationship_vocab = relationship_vocab
+        self.article_vocab = article_vocab
+        n = len(ids)
+        self.out_indptr, self.out_indices, self.out_edges = _csr(src, dst, n)
+        self.in_indptr, self.in_indices, self.in_edges = _csr(dst, src, n)
+
+    @classmethod
+    def from_jsonl(cls, file_path: str = "validated_relationships.jsonl", kb_path: str = KB_PATH,
+                   retractions_path: str = "retractions.jsonl") -> "RelationshipGraph":
+        kb_names = KBNames(kb_path)
+        ids: List[str] = [kb_id for kb_id, _ in kb_names.items()]
+        index = {kb_id: i for i, kb_id in enumerate(ids)}
+        names = [entry["canonical_name"] for _, entry in kb_names.items()]
+        relationship_codes: Dict[str, int] = {}
+        article_codes: Dict[str, int] = {}
+        src, dst, rel, dates, articles = [], [], [], [], []
+        seen = set()
+
+        def node(kb_id, name):
+            if kb_id not in index:
+                index[kb_id] = len(ids)
+                ids.append(kb_id)
+                names.append(name or "")
+            elif name:
+                names[index[kb_id]] = name  # last annotation wins, like the graph
+            return index[kb_id]
+
+        for row in read_relationship_rows(file_path, kb_names, retractions_path):
+            if row["annotation_hash"] in seen:
+                continue  # the same annotation exported twice
+            seen.add(row["annotation_hash"])
+            src.append(node(row["subject_id"], row["subject_text"]))
+            dst.append(node(row["object_id"], row["object_text"]))
+            rel.append(relationship_codes.setdefault(relationship_type(row["relationship"]), len(relationship_codes)))
+            dates.append(_to_day(row["date"]))
+            articles.append(article_codes.setdefault(str(row["article_id"]), len(article_codes)))
+
+        aliases: Dict[str, int] = {}
+        for kb_id, entry in kb_names.items():
+            for alias in entry.get("aliases") or []:
+                aliases.setdefault(alias.lower(), index[kb_id])
+        for i, name in enumerate(names):
+            if name:
+                aliases[name.lower()] = i
+
+        return cls(
+            ids, names, aliases,
+            np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64),
+            np.asarray(rel, dtype=np.int32), np.asarray(dates, dtype="datetime64[D]"),
+            np.asarray(articles, dtype=np.int32), list(relationship_codes), list(article_codes),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src)
+
+    def node(self, key: str) -> int:
+        """Node index of a kb_id, name or alias (case-insensitive)."""
+        if key in self._index:
+            return self._index[key]
+        if key.lower() in self._aliases:
+            return self._aliases[key.lower()]
+        raise KeyError(f"Unknown entity: {key}")
+
+    def _adjacent(self, nodes: np.ndarray, direction: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(from node, to node, edge id) for every edge touching `nodes` in the given direction."""
+        parts = []
+        csrs = {"out": [(self.out_indptr, self.out_indices, self.out_edges)],
+                "in": [(self.in_indptr, self.in_indices, self.in_edges)]}
+        csrs["both"] = csrs["out"] + csrs["in"]
+        for indptr, indices, edges in csrs[direction]:
+            starts, ends = indptr[nodes], indptr[nodes + 1]
+            counts = ends - starts
+            if not counts.sum():
+                continue
+            # positions of every neighbor entry of every node, without a Python loop
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            parts.append((np.repeat(nodes, counts), indices[offsets], edges[offsets]))
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+    def k_hop(self, key: str, k: int = 2, direction: str = "both") -> Dict[str, int]:
+        """Entities within k hops: {kb_id: hops}, the start entity at 0."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        start = self.node(key)
+        hops = np.full(len(self), -1, dtype=np.int64)
+        hops[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        for hop in range(1, k + 1):
+            _, neighbors, _ = self._adjacent(frontier, direction)
+            frontier = np.unique(neighbors[hops[neighbors] < 0])
+            if not len(frontier):
+                break
+            hops[frontier] = hop
+        return {self.ids[i]: int(hops[i]) for i in np.flatnonzero(hops >= 0)}
+
+    def shortest_path(self, source: str, target: str, max_hops: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fewest-hop connection between two entities, ignoring edge direction.
+        Returns the edges along the path as dicts (empty list if not connected).
+        """
+        start, goal = self.node(source), self.node(target)
+        if start == goal:
+            return []
+        parent_edge = np.full(len(self), -1, dtype=np.int64)
+        visited = np.zeros(len(self), dtype=bool)
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int64)
+        hop = 0
+        while len(frontier) and not visited[goal] and (max_hops is None or hop < max_hops):
+            _, neighbors, edges = self._adjacent(frontier, "both")
+            new = ~visited[neighbors]
+            neighbors, edges = neighbors[new], edges[new]
+            neighbors, first = np.unique(neighbors, return_index=True)
+            visited[neighbors] = True
+            parent_edge[neighbors] = edges[first]
+            frontier = neighbors
+            hop += 1
+        if not visited[goal]:
+            return []
+
+        path = []
+        current = goal
+        while current != start:
+            edge = int(parent_edge[current])
+            path.append(self.edge(edge))
+            current = int(self.src[edge]) if int(self.dst[edge]) == current else int(self.dst[edge])
+        return path[::-1]
+
+    def edge(self, edge: int) -> Dict[str, Any]:
+        date = self.date[edge]
+        return {
+            "subject_id": self.ids[self.src[edge]],
+            "subject": self.names[self.src[edge]],
+            "relationship": self.relationship_vocab[self.relationship[edge]],
+            "object_id": self.ids[self.dst[edge]],
+            "object": self.names[self.dst[edge]],
+            "date": None if np.isnat(date) else str(date),
+            "article_id": self.article_vocab[self.article[edge]],
+        }
+
+    def co_actors(self, key: str, top: int = 10) -> List[Tuple[str, int]]:
+        """Entities sharing the most relationships (either direction) with an entity."""
+        node = self.node(key)
+        _, neighbors, _ = self._adjacent(np.array([node], dtype=np.int64), "both")
+        neighbors = neighbors[neighbors != node]
+        counts = np.bincount(neighbors, minlength=len(self))
+        ranked = np.argsort(-counts, kind="stable")[:top]
+        return [(self.names[i] or self.ids[i], int(counts[i])) for i in ranked if counts[i] > 0]
+
+    def time_window(self, start: Optional[str] = None, end: Optional[str] = None) -> "RelationshipGraph":
+        """Graph over the same entities with only the edges dated in [start, end] (inclusive)."""
+        mask = ~np.isnat(self.date)
+        if start:
+            mask &= self.date >= np.datetime64(start, "D")
+        if end:
+            mask &= self.date <= np.datetime64(end, "D")
+        return self.edge_subgraph(mask)
+
+    def edge_subgraph(self, mask: np.ndarray) -> "RelationshipGraph":
+        """Graph over the same entities with only the edges where mask is True."""
+        return RelationshipGraph(self.ids, self.names, self._aliases, self.src[mask], self.dst[mask],
+                                 self.relationship[mask], self.date[mask], self.article[mask],
+                                 self.relationship_vocab, self.article_vocab)
+
+    def degree(self, direction: str = "both") -> np.ndarray:
+        out_degree = np.diff(self.out_indptr)
+        in_degree = np.diff(self.in_indptr)
+        return {"out": out_degree, "in": in_degree, "both": out_degree + in_degree}[direction]
+
+    def pagerank(self, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+        """PageRank by power iteration over the (multi)edges, dangling mass spread uniformly."""
+        n = len(self)
+        if n == 0:
+            return np.zeros(0)
+        out_degree = np.diff(self.out_indptr).astype(np.float64)
+        dangling = out_degree == 0
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            share = np.where(dangling, 0.0, rank / np.maximum(out_degree, 1.0))
+            new_rank = np.bincount(self.dst, weights=share[self.src], minlength=n)
+            new_rank = damping * (new_rank + rank[dangling].sum() / n) + (1.0 - damping) / n
+            if np.abs(new_rank - rank).sum() < tol:
+                rank = new_rank
+                break
+            rank = new_rank
+        return rank
+
+    def ranking(self, scores: np.ndarray, top: int = 10) -> List[Tuple[str, float]]:
+        order = np.argsort(-scores, kind="stable")[:top]
+        return [(self.names[i] or self.ids[i], float(scores[i])) for i in order]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the knowledge graph without a database.")
+    parser.add_argument("command", choices=["path", "khop", "coactors", "degree", "pagerank"])
+    parser.add_argument("entities", nargs="*", help="kb_ids, names or aliases")
+    parser.add_argument("--relationships", default="validated_relationships.jsonl")
+    parser.add_argument("--kb", default=KB_PATH)
+    parser.add_argument("--since", help="only edges dated on or after this day (YYYY-MM-DD)")
+    parser.add_argument("--until", help="only edges dated on or before this day (YYYY-MM-DD)")
+    parser.add_argument("-k", type=int, default=2, help="hops for khop")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    graph = RelationshipGraph.from_jsonl(args.relationships, kb_path=args.kb)
+    if args.since or args.until:
+        graph = graph.time_window(args.since, args.until)
+    print(f"Graph: {len(graph)} entities, {graph.edge_count} relationships")
+
+    if args.command == "path":
+        path = graph.shortest_path(args.entities[0], args.entities[1])
+        if not path:
+            print("Not connected")
+        for edge in path:
+            print(f"  {edge['subject']} -[{edge['relationship']}]-> {edge['object']} ({edge['date']}, article {edge['article_id']})")
+    elif args.command == "khop":
+        for kb_id, hops in sorted(graph.k_hop(args.entities[0], args.k).items(), key=lambda item: item[1]):
+            print(f"  {hops}  {graph.names[graph.node(kb_id)]}")
+    elif args.command == "coactors":
+        for name, count in graph.co_actors(args.entities[0], args.top):
+            print(f"  {count:>4}  {name}")
+    else:
+        scores = graph.degree() if args.command == "degree" else graph.pagerank()
+        for name, score in graph.ranking(scores, args.top):
+            print(f"  {score:.4f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
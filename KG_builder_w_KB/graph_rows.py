@@ -0,0 +1,261 @@
+'''
+Rows of validated relationships, shared by the graph writers and exporters
+(neo4j_updater.Neo4jHandler, neo4j_bulk_export)
+- read_relationship_rows turns a Prodigy export (prodigy db-out) into one flat row
+  per accepted relationship, without the support of retracted article versions
+  (an annotation only supported by retracted versions is skipped).
+  Rows carry the annotation's hash and byte range for ImportCheckpoint,
+  and the mention counts, evidence list and per-article support of aggregated facts
+  (relationship_aggregator.support_of reads them, merge_support merges them into an edge)
+- read_supported_edges finds the edges a set of articles supports, so retractions
+  can reach them through the indexed endpoint ids instead of scanning every relationship
+- entity_label / relationship_type sanitize entity types and relationship names
+  into Neo4j labels and relationship types
+- ImportCheckpoint remembers which rows a graph writer already applied, so imports
+  (neo4j_updater) and snapshot updates (graph_snapshot) resume and skip re-exported rows
+'''
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Any, List, Iterator, Iterable, Set, Tuple
+
+from checkpoint import append_durably
+from incremental import load_retractions
+from kb_names import KBNames
+from relationship_aggregator import support_of, retract_support
+
+
+def entity_label(entity_type) -> str:
+    """Ensure entity_type is valid for Neo4j (no spaces, alphanumeric)"""
+    return entity_type.replace(" ", "_").upper() if entity_type else "UNKNOWN"
+
+
+def relationship_type(relationship: str) -> str:
+    """Format relationship type - must be alphanumeric with underscores"""
+    sanitized_rel = re.sub(r"\s+", "_", relationship.upper())
+    sanitized_rel = re.sub(r"[^a-zA-Z0-9_]", "", sanitized_rel)
+    return sanitized_rel or "RELATED_TO"
+
+
+def supporting_article_ids(meta: Dict[str, Any]) -> Set[str]:
+    """Ids of the articles an annotation's relationship is supported by (one, or several for a fact)."""
+    items = (meta.get("article_support") or []) + (meta.get("supporting_evidence") or []) + [meta]
+    return {item.get("article_id") for item in items if item.get("article_id")}
+
+
+def read_supported_edges(file_path: str, article_ids: Iterable[str]) -> Set[Tuple[str, str, str, str, str]]:
+    """
+    (subject label, subject id, relationship type, object label, object id) of every
+    relationship in a Prodigy JSONL export that one of article_ids supports, any version.
+    """
+    article_ids = set(article_ids)
+    edges = set()
+    with open(file_path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            meta = data.get("meta", {})
+            if data.get("answer", "accept") != "accept" or not supporting_article_ids(meta) & article_ids:
+                continue
+            if not all([meta.get("subject_kb_id"), meta.get("object_kb_id"), meta.get("relationship")]):
+                continue
+            edges.add((entity_label(meta.get("subject_type")), meta["subject_kb_id"], relationship_type(meta["relationship"]),
+                       entity_label(meta.get("object_type")), meta["object_kb_id"]))
+    return edges
+
+
+def read_relationship_rows(file_path: str, kb_names: KBNames, retractions_path: str = "retractions.jsonl",
+                           start_offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one relationship row per importable line of a Prodigy JSONL export,
+    starting at byte start_offset. Rejected and ignored annotations are skipped.
+    """
+    # article_id -> current content hash for articles that changed since they were first extracted
+    retractions = load_retractions(retractions_path)
+    # pick up KB changes since the last import, at most once per import
+    kb_names.refresh()
+    with open(file_path, "rb") as f:
+        f.seek(start_offset)
+        line_end = start_offset
+        for line in f:
+            line_start, line_end = line_end, line_end + len(line)
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            meta = data.get("meta", {})
+
+            # Only accepted annotations go into the graph (plain task files have no answer)
+            if data.get("answer", "accept") != "accept":
+                continue
+
+            subject_id = meta.get("subject_kb_id")
+            object_id = meta.get("object_kb_id")
+            relationship = meta.get("relationship")
+
+            # Extract entity texts from spans
+            subject_text = None
+            object_text = None
+            for span in data.get("spans", []):
+                if span["label"] == "SUBJECT":
+                    subject_text = data["text"][span["start"]:span["end"]]
+                elif span["label"] == "OBJECT":
+                    object_text = data["text"][span["start"]:span["end"]]
+
+            # Fallback to KB if spans don't provide the text
+            if not subject_text:
+                subject_text = kb_names.canonical_name(subject_id)
+            if not object_text:
+                object_text = kb_names.canonical_name(object_id)
+
+            # Verify we have all required data
+            if not all([subject_id, object_id, relationship]):
+                print(f"Missing required fields in relationship", data)
+                continue
+
+            row = {
+                "subject_id": subject_id,
+                "subject_text": subject_text,
+                "subject_type": meta.get("subject_type"),
+                "object_id": object_id,
+                "object_text": object_text,
+                "object_type": meta.get("object_type"),
+                "relationship": relationship,
+                "evidence": data["text"],
+                "article_id": meta.get("article_id"),
+                "headline": meta.get("headline"),
+                "date": meta.get("date"),
+                "content_hash": meta.get("content_hash"),
+                # support of facts merged across articles (relationship_aggregator), one mention otherwise
+                "mention_count": meta.get("mention_count", 1),
+                "article_count": meta.get("article_count", 1),
+                "supporting_evidence": meta.get("supporting_evidence"),
+                "article_support": meta.get("article_support"),
+                "annotation_hash": annotation_hash(line),
+                "line_start": line_start,
+                "line_end": line_end
+            }
+
+            # Drop the support of older, retracted article versions, skip the annotation if none is left
+            if retractions and supporting_article_ids(meta) & retractions.keys():
+                support = retract_support(support_of(row), retractions)
+                if not support["articles"]:
+                    continue
+                row["article_support"] = [{"article_id": article_id, **article} for article_id, article in support["articles"].items()]
+                row["supporting_evidence"] = support["evidence"]
+                row["mention_count"] = sum(article["mentions"] for article in support["articles"].values())
+                row["article_count"] = len(support["articles"])
+            yield row
+
+
+'''
+------------------------------------------------------------
+RESUMABLE GRAPH IMPORTS
+------------------------------------------------------------
+'''
+
+IMPORT_STATE_FILE = "import_state.jsonl"
+
+
+def annotation_hash(line: bytes) -> str:
+    """Hash of one exported annotation (its JSONL line, without the line ending)."""
+    return hashlib.sha1(line.rstrip(b"\r\n")).hexdigest()
+
+
+class ImportCheckpoint:
+    """
+    Which annotations have been written to the graph, kept as an append-only JSONL log.
+    Each line is one committed batch:
+        {"file", "offset", "anchor_start", "anchor_hash", "hashes": [...]}
+    - hashes: annotation_hash of every row the batch applied, re-exported rows
+      (e.g. a new `prodigy db-out` appended to the same file) are skipped by hash
+    - offset: end of the batch's last line, the next import of the file starts there
+    - anchor_start/anchor_hash: start and hash of that last line, to check that the
+      file was only appended to (otherwise it is re-read from the start, and the
+      hashes still keep rows from being applied twice)
+    A row that could not be applied (see record's unwritten) holds the offset before it
+    for the rest of the run, so the next import reads it again; batches after it only
+    record their hashes.
+    Applied retractions (see load_retractions) are logged in the same file:
+        {"retracted": {article_id: content_hash}}
+    so each article version is retracted from the graph once, not on every import.
+    """
+
+    def __init__(self, path: str = IMPORT_STATE_FILE):
+        self.path = path
+        self.applied: Set[str] = set()
+        self.positions: Dict[str, Dict[str, Any]] = {}  # file -> last batch entry
+        self.retracted: Dict[str, str] = {}  # article_id -> content hash its retraction was applied for
+        self.held: Set[str] = set()  # files whose offset stopped at an unwritten row in this run
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    if "retracted" in entry:
+                        self.retracted.update(entry["retracted"])
+                        continue
+                    self.applied.update(entry["hashes"])
+                    if "offset" in entry:
+                        self.positions[entry["file"]] = entry
+
+    def resume_offset(self, file_path: str) -> int:
+        """Byte offset to continue importing file_path from (0 if it was not only appended to)."""
+        entry = self.positions.get(os.path.abspath(file_path))
+        if entry is None:
+            return 0
+        try:
+            with open(file_path, "rb") as f:
+                f.seek(entry["anchor_start"])
+                anchor = f.read(entry["offset"] - entry["anchor_start"])
+        except OSError:
+            return 0
+        if annotation_hash(anchor) != entry["anchor_hash"]:
+            print(f"[INFO] {file_path} was rewritten since the last import, re-reading it (applied rows are skipped)")
+            return 0
+        return entry["offset"]
+
+    def is_applied(self, row: Dict[str, Any]) -> bool:
+        return row["annotation_hash"] in self.applied
+
+    def record(self, file_path: str, rows: List[Dict[str, Any]], unwritten: Iterable[Dict[str, Any]] = ()):
+        """
+        Durably record a batch of rows (from graph_rows.read_relationship_rows, in file order)
+        as applied, except the unwritten ones. The offset only moves past the rows before
+        the first unwritten one.
+        """
+        if not rows:
+            return
+        path = os.path.abspath(file_path)
+        unwritten = {row["annotation_hash"] for row in unwritten}
+        complete = []
+        for row in rows:
+            if path in self.held or row["annotation_hash"] in unwritten:
+                self.held.add(path)
+                break
+            complete.append(row)
+        entry = {"file": path, "hashes": [row["annotation_hash"] for row in rows if row["annotation_hash"] not in unwritten]}
+        if complete:
+            last = complete[-1]
+            entry.update({"offset": last["line_end"], "anchor_start": last["line_start"], "anchor_hash": last["annotation_hash"]})
+        if not entry["hashes"] and not complete:
+            return
+        append_durably(self.path, (json.dumps(entry) + "\n").encode("utf-8"))
+        self.applied.update(entry["hashes"])
+        if complete:
+            self.positions[path] = entry
+
+    def pending_retractions(self, retractions: Dict[str, str]) -> Dict[str, str]:
+        """The retractions (article_id -> current content hash) not applied yet."""
+        return {article_id: content_hash for article_id, content_hash in retractions.items()
+                if self.retracted.get(article_id) != content_hash}
+
+    def record_retractions(self, retractions: Dict[str, str]):
+        if not retractions:
+            return
+        append_durably(self.path, (json.dumps({"retracted": retractions}) + "\n").encode("utf-8"))
+        self.retracted.update(retractions)
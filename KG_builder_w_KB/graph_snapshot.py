@@ -0,0 +1,200 @@
+'''
+Per-entity neighborhood snapshot for the browser extension
+Instead of the extension's server scanning the graph on every request, the
+neighborhood of every entity is materialized into one static JSON document:
+
+    {
+      "entities": {
+        kb_id: {
+          "name": ..., "type": ..., "aliases": [...],
+          "relationships": [
+            {"direction": "out"|"in", "relationship": ..., "target": <other entity's name>,
+             "target_id": ..., "evidence": ..., "articleID": ..., "articleName": ..., "date": ...,
+             "mention_count": ..., "article_count": ..., "support": {"articles": ..., "evidence": [...]}}
+          ]
+        }
+      },
+      "aliases": {lowercased name or alias: [kb_id, ...]}
+    }
+
+so looking up an entity (by kb_id or any alias) is a single dict access.
+The snapshot holds the same relationships the importer writes to Neo4j (graph_rows):
+one per (subject, type, object), the support of all its accepted annotations merged
+(relationship_aggregator.merge_support) and shown through its best evidence,
+the support of retracted article versions dropped. It is updated incrementally: like the importer, a checkpoint
+(graph_rows.ImportCheckpoint) remembers which annotations are already in it, so
+after an import only the new lines of validated_relationships.jsonl are read.
+
+Run (also run by neo4j_updater.py after each import):
+    python graph_snapshot.py validated_relationships.jsonl
+'''
+
+import argparse
+import json
+import os
+from typing import Dict, Any, List, Tuple
+
+from graph_rows import ImportCheckpoint, entity_label, relationship_type, read_relationship_rows
+from incremental import load_retractions
+from kb_names import KBNames
+from relationship_aggregator import support_of, merge_support, retract_support, support_properties
+from kb_store import KB_PATH
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_PATH = os.path.join(BASE_DIR, "..", "browser_extension", "data", "graph_snapshot.json")
+
+
+def state_path_for(snapshot_path: str) -> str:
+    return snapshot_path + ".state.jsonl"
+
+
+def load_snapshot(snapshot_path: str = SNAPSHOT_PATH) -> Dict[str, Any]:
+    if not os.path.exists(snapshot_path):
+        return {"entities": {}, "aliases": {}}
+    with open(snapshot_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _edge_key(edge: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (edge["direction"], edge["relationship"], edge["target_id"])
+
+
+def _entity(entities: Dict[str, Any], kb_id: str, name: str, entity_type: str, kb_names: KBNames) -> Dict[str, Any]:
+    entry = entities.setdefault(kb_id, {"name": name, "type": entity_type, "aliases": [], "relationships": {}})
+    if name:
+        entry["name"] = name  # last annotation wins, like the importer's SET n.name
+    entry["type"] = entry["type"] or entity_type
+    entry["aliases"] = (kb_names.get(kb_id) or {}).get("aliases") or entry["aliases"]
+    return entry
+
+
+def _index_edges(snapshot: Dict[str, Any]):
+    """Key each entity's relationships by _edge_key while rows are applied (_finalize turns them back into lists)."""
+    for entry in snapshot["entities"].values():
+        entry["relationships"] = {_edge_key(edge): edge for edge in entry["relationships"]}
+
+
+def apply_rows(snapshot: Dict[str, Any], rows: List[Dict[str, Any]], kb_names: KBNames) -> int:
+    """
+    Add relationship rows (graph_rows.read_relationship_rows) to a snapshot indexed by _index_edges,
+    so each row costs one lookup per endpoint however many relationships the entity has.
+    Returns rows applied.
+    """
+    entities = snapshot["entities"]
+    for row in rows:
+        subject = _entity(entities, row["subject_id"], row["subject_text"], entity_label(row["subject_type"]), kb_names)
+        obj = _entity(entities, row["object_id"], row["object_text"], entity_label(row["object_type"]), kb_names)
+        support = support_of(row)
+        for entry, direction, other_id in ((subject, "out", row["object_id"]), (obj, "in", row["subject_id"])):
+            edge = {"direction": direction, "target_id": other_id, "relationship": relationship_type(row["relationship"])}
+            # one relationship per (subject, type, object), later annotations merge into it
+            earlier = entry["relationships"].pop(_edge_key(edge), None)
+            merged = support
+            if earlier is not None and "support" in earlier:
+                merged = merge_support(earlier["support"], support, row["subject_text"] or "", row["object_text"] or "")
+            entry["relationships"][_edge_key(edge)] = _with_support(edge, merged)
+    return len(rows)
+
+
+def _with_support(edge: Dict[str, Any], support: Dict[str, Any]) -> Dict[str, Any]:
+    properties = support_properties(support)
+    return {
+        **edge,
+        "evidence": properties["evidence"],
+        "articleID": properties["article_id"],
+        "articleName": properties["headline"],
+        "date": properties["date"],
+        "content_hash": properties["content_hash"],
+        "mention_count": properties["mention_count"],
+        "article_count": properties["article_count"],
+        "support": support,
+    }
+
+
+def drop_retracted(snapshot: Dict[str, Any], retractions: Dict[str, str]) -> int:
+    """
+    Remove the support of older versions of changed articles (see Neo4jHandler.retract_article_relationships):
+    relationships only those versions supported are dropped, the others keep their remaining support.
+    """
+    dropped = 0
+    for entry in snapshot["entities"].values():
+        kept = {}
+        for key, edge in entry["relationships"].items():
+            if "support" not in edge:  # written before support was tracked
+                if edge["articleID"] not in retractions or (edge.get("content_hash") or "") == retractions[edge["articleID"]]:
+                    kept[key] = edge
+                continue
+            support = retract_support(edge["support"], retractions)
+            if support["articles"]:
+                kept[key] = _with_support(edge, support) if support != edge["support"] else edge
+        dropped += len(entry["relationships"]) - len(kept)
+        entry["relationships"] = kept
+    return dropped
+
+
+def _finalize(snapshot: Dict[str, Any]):
+    """Turn the indexed relationships back into lists, resolve neighbor names and rebuild the alias index."""
+    entities = snapshot["entities"]
+    aliases: Dict[str, List[str]] = {}
+    for entry in entities.values():
+        entry["relationships"] = list(entry["relationships"].values())
+    for kb_id, entry in entities.items():
+        for edge in entry["relationships"]:
+            edge["target"] = entities.get(edge["target_id"], {}).get("name", "")
+        for alias in [entry["name"]] + entry["aliases"]:
+            if alias:
+                ids = aliases.setdefault(alias.lower(), [])
+                if kb_id not in ids:
+                    ids.append(kb_id)
+    snapshot["aliases"] = aliases
+
+
+def update_snapshot(relationships_path: str = "validated_relationships.jsonl", snapshot_path: str = SNAPSHOT_PATH,
+                    kb_path: str = KB_PATH, retractions_path: str = "retractions.jsonl", rebuild: bool = False) -> Dict[str, int]:
+    """
+    Bring the snapshot up to date with relationships_path, reading only lines added since
+    the last update (everything if rebuild). The file is replaced atomically.
+    """
+    state_path = state_path_for(snapshot_path)
+    if rebuild:
+        for path in (snapshot_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    snapshot = load_snapshot(snapshot_path)
+    _index_edges(snapshot)
+    checkpoint = ImportCheckpoint(state_path)
+    kb_names = KBNames(kb_path)
+    rows = list(read_relationship_rows(relationships_path, kb_names, retractions_path,
+                                       start_offset=checkpoint.resume_offset(relationships_path)))
+    new_rows = [row for row in rows if not checkpoint.is_applied(row)]
+    applied = apply_rows(snapshot, new_rows, kb_names)
+    dropped = drop_retracted(snapshot, load_retractions(retractions_path))
+    _finalize(snapshot)
+
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, snapshot_path)
+    # the snapshot is durable, now mark its rows as applied
+    checkpoint.record(relationships_path, rows)
+
+    stats = {"applied": applied, "retracted": dropped, "entities": len(snapshot["entities"])}
+    print(f"✅ Snapshot {snapshot_path}: {applied} new relationships, {dropped} retracted, {stats['entities']} entities")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the per-entity neighborhood snapshot served to the browser extension.")
+    parser.add_argument("relationships", nargs="?", default="validated_relationships.jsonl")
+    parser.add_argument("--output", default=SNAPSHOT_PATH)
+    parser.add_argument("--kb", default=KB_PATH)
+    parser.add_argument("--retractions", default="retractions.jsonl")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the previous snapshot and start over")
+    args = parser.parse_args(argv)
+    update_snapshot(args.relationships, args.output, kb_path=args.kb, retractions_path=args.retractions, rebuild=args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
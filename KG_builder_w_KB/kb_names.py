@@ -0,0 +1,122 @@
+'''
+Name lookups into the KB without its embeddings
+Consumers like the Neo4j updater only need kb_id -> canonical name / aliases / type,
+but KB.json is dominated by embedding vectors.
+1. KBNames loads lazily, on the first lookup
+2. The names are kept in a small sidecar file (<KB>.names.json) tagged with the
+   KB's mtime and size, so later runs skip parsing KB.json entirely
+3. refresh() re-checks the KB's mtime and size and reloads if it changed
+'''
+
+import json
+import os
+from typing import Dict, Any, Optional, Tuple
+
+from kb_store import KB_PATH
+
+_ZERO = 0.0
+
+
+def _skip_float(_text: str) -> float:
+    # embeddings are dropped anyway, don't allocate a float object per value
+    return _ZERO
+
+
+def names_path_for(kb_path: str) -> str:
+    return kb_path + ".names.json"
+
+
+class KBNames:
+    def __init__(self, path: str = KB_PATH):
+        self.path = path
+        self.names_path = names_path_for(path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._version: Optional[Tuple[int, int]] = None
+        self._loaded = False
+
+    def _file_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self) -> bool:
+        """Reload if KB.json changed since it was loaded. Returns True if it (re)loaded."""
+        if self._loaded and self._file_version() == self._version:
+            return False
+        self._load()
+        return True
+
+    def _load(self):
+        version = self._file_version()
+        self._loaded = True
+        self._version = version
+        if version is None:
+            print(f"Warning: {self.path} not found")
+            self._entries = {}
+            return
+
+        entries = self._read_sidecar(version)
+        if entries is None:
+            entries = self._read_kb()
+            self._write_sidecar(version, entries)
+        self._entries = entries
+
+    def _read_sidecar(self, version: Tuple[int, int]) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            with open(self.names_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return data["entries"] if data.get("version") == list(version) else None
+
+    def _read_kb(self) -> Dict[str, Dict[str, Any]]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            kb = json.load(f, parse_float=_skip_float)
+        return {
+            kb_id: {
+                "canonical_name": info.get("canonical_name", ""),
+                "aliases": info.get("aliases", []),
+                "entity_type": info.get("entity_type"),
+            }
+            for kb_id, info in kb.items()
+        }
+
+    def _write_sidecar(self, version: Tuple[int, int], entries: Dict[str, Dict[str, Any]]):
+        tmp_path = self.names_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": list(version), "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.names_path)
+        except OSError as e:
+            print(f"Warning: could not write {self.names_path}: {e}")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._load()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._entries)
+
+    def __contains__(self, kb_id: str) -> bool:
+        self._ensure_loaded()
+        return kb_id in self._entries
+
+    def get(self, kb_id: str) -> Optional[Dict[str, Any]]:
+        """{"canonical_name", "aliases", "entity_type"} of a KB entry, or None."""
+        self._ensure_loaded()
+        return self._entries.get(kb_id)
+
+    def items(self):
+        self._ensure_loaded()
+        return self._entries.items()
+
+    def canonical_name(self, kb_id: str) -> str:
+        """Get entity's canonical name from KB using its ID"""
+        entry = self.get(kb_id) if kb_id else None
+        if entry is not None:
+            return entry["canonical_name"]
+        print(f"❌ Entity not found in KB: {kb_id}")
+        return ''
@@ -0,0 +1,176 @@
+'''
+Shared KB access for parallel article workers
+1. Each worker consolidates against its own snapshot of KB.json (no lock held,
+   so consolidation can run on every core at once)
+2. The changes are committed back under an exclusive file lock
+    -> if another worker wrote the KB since our snapshot, the file is re-read
+    -> our new entries / aliases / embeddings are merged on top of it
+3. KB.json is replaced atomically, readers never see a half-written file
+
+Conflict resolution is deterministic:
+    - new KB ids are derived from the canonical name (consolidate_entities.kb_id_for),
+      so two workers creating the same entity at the same time get the same id
+      and their aliases and embeddings are unioned
+    - a new entry that matches an entry another worker committed first is folded
+      into that entry, and the records pointing at it are re-mapped
+'''
+
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple, Optional
+
+from consolidate_entities import (
+    consolidate_entities_with_kb,
+    find_best_match,
+    SIMILARITY_THRESHOLD,
+)
+
+KB_PATH = "KB.json"
+
+
+def _copy_kb(kb: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy the KB structure. Embedding vectors are shared, they are never mutated."""
+    return {
+        kb_id: {**info, "aliases": list(info["aliases"]), "embeddings": list(info["embeddings"])}
+        for kb_id, info in kb.items()
+    }
+
+
+def _entry_counts(kb: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+    """Number of aliases and embeddings per entry, used to find what a worker added."""
+    return {kb_id: (len(info["aliases"]), len(info["embeddings"])) for kb_id, info in kb.items()}
+
+
+class KBStore:
+    def __init__(self, path: str = KB_PATH):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._kb: Dict[str, Any] = {}
+        self._version = None  # (mtime_ns, size, inode) of the file we last read or wrote
+        self._loaded = False
+
+    def _file_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self):
+        """Re-read the KB file if it changed since we last saw it."""
+        version = self._file_version()
+        if self._loaded and version == self._version:
+            return
+        if version is None:
+            self._kb = {}
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._kb = json.load(f)
+        self._version = version
+        self._loaded = True
+
+    def _write(self, kb: Dict[str, Any]):
+        """Write the KB to a temp file and atomically swap it in."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".KB.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(kb, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._kb = kb
+        self._version = self._file_version()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a private copy of the current KB that the caller may mutate."""
+        self._refresh()
+        return _copy_kb(self._kb)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the KB lock, yield the latest KB for in-place updates and write it back on exit.
+        Use this for single-writer updates, use consolidate() for parallel workers.
+        """
+        with self._locked():
+            self._refresh()
+            kb = _copy_kb(self._kb)
+            yield kb
+            self._write(kb)
+
+    def commit(self, local_kb: Dict[str, Any], base_counts: Dict[str, Tuple[int, int]]) -> Dict[str, str]:
+        """
+        Merge what a worker added to its snapshot (local_kb) into the shared KB.
+        base_counts are the _entry_counts of the snapshot before the worker touched it.
+        Returns a {local_id: committed_id} map for new entries folded into existing ones.
+        """
+        remap = {}
+        with self._locked():
+            self._refresh()
+            merged = _copy_kb(self._kb)
+
+            # 1. Extend entries that existed in our snapshot
+            for kb_id, (n_aliases, n_embeddings) in base_counts.items():
+                if kb_id not in local_kb or kb_id not in merged:
+                    continue
+                _merge_entry(merged[kb_id], local_kb[kb_id]["aliases"][n_aliases:], local_kb[kb_id]["embeddings"][n_embeddings:])
+
+            # 2. Add new entries, in sorted id order so the outcome does not depend on dict order
+            for kb_id in sorted(set(local_kb) - set(base_counts)):
+                entry = local_kb[kb_id]
+                if kb_id in merged:
+                    # Another worker created the same canonical name: union them
+                    _merge_entry(merged[kb_id], entry["aliases"], entry["embeddings"])
+                    continue
+                match_id, score = find_best_match(entry["canonical_name"], None, merged)
+                if match_id is not None and score >= SIMILARITY_THRESHOLD:
+                    # Matches an entry committed by another worker since our snapshot
+                    _merge_entry(merged[match_id], entry["aliases"], entry["embeddings"])
+                    remap[kb_id] = match_id
+                else:
+                    merged[kb_id] = entry
+
+            self._write(merged)
+        return remap
+
+    def consolidate(self, final_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process-safe version of consolidate_entities_with_kb:
+        consolidate against a snapshot, then commit and re-map folded ids.
+        """
+        local_kb = self.snapshot()
+        base_counts = _entry_counts(local_kb)
+        updated_data = consolidate_entities_with_kb(final_data, local_kb)
+        remap = self.commit(local_kb, base_counts)
+        if remap:
+            for record in updated_data:
+                committed_id = remap.get(record.get("kb_id"))
+                if committed_id:
+                    record["kb_id"] = committed_id
+                    record["canonical_name"] = self._kb[committed_id]["canonical_name"]
+        return updated_data
+
+
+def _merge_entry(target: Dict[str, Any], aliases: List[str], embeddings: List[Any]):
+    """Union aliases (keeping first-seen order) and append embeddings."""
+    for alias in aliases:
+        if alias not in target["aliases"]:
+            target["aliases"].append(alias)
+    target["embeddings"].extend(embeddings)
@@ -0,0 +1,173 @@
+'''
+Compact mention records passed between pipeline stages
+A long article has many mentions per block. As plain dicts, every mention carried its
+own copy of the block text, headline and evidence sentence plus a 384-element list of
+Python floats. Here:
+    - MentionStore keeps each article, block text and evidence sentence once, and all
+      embeddings as rows of one float32 matrix (one row per distinct evidence sentence)
+    - Mention (__slots__) only holds ids into the store plus its own entity fields
+
+Mention supports the dict-style access the rest of the pipeline uses
+(record["entity_text"], record["kb_id"] = ..., .get, .items), so consolidate_entities,
+kb_store and relationship_extractor accept Mentions and plain dict records alike.
+'''
+
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+import numpy as np
+
+EMBEDDING_DIM = 384  # sentence-transformers/all-MiniLM-L6-v2
+
+
+class MentionStore:
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.articles: List[Dict[str, Any]] = []  # {"article_id", "headline", "date", "content_hash"}
+        self.blocks: List[str] = []
+        self.sentences: List[str] = []
+        self._article_refs: Dict[Any, int] = {}
+        self._block_refs: Dict[str, int] = {}
+        self._sentence_refs: Dict[str, int] = {}
+        self._embeddings = np.zeros((0, dim), dtype=np.float32)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """float32 matrix, row i is the embedding of sentences[i]."""
+        return self._embeddings[:len(self.sentences)]
+
+    def add_article(self, article_id, headline: str = "", date: Optional[str] = None,
+                    content_hash: Optional[str] = None) -> int:
+        if article_id not in self._article_refs:
+            self._article_refs[article_id] = len(self.articles)
+            self.articles.append({"article_id": article_id, "headline": headline, "date": date, "content_hash": content_hash})
+        return self._article_refs[article_id]
+
+    def add_block(self, text: str) -> int:
+        if text not in self._block_refs:
+            self._block_refs[text] = len(self.blocks)
+            self.blocks.append(text)
+        return self._block_refs[text]
+
+    def has_sentence(self, sentence: str) -> bool:
+        return sentence in self._sentence_refs
+
+    def add_sentence(self, sentence: str, embedding) -> int:
+        """Store an evidence sentence and its embedding once, return its row."""
+        if sentence in self._sentence_refs:
+            return self._sentence_refs[sentence]
+        row = len(self.sentences)
+        if row == len(self._embeddings):
+            # grow geometrically so appends stay amortized O(1)
+            grown = np.zeros((max(16, 2 * row), self._embeddings.shape[1]), dtype=np.float32)
+            grown[:row] = self._embeddings[:row]
+            self._embeddings = grown
+        self._embeddings[row] = embedding
+        self.sentences.append(sentence)
+        self._sentence_refs[sentence] = row
+        return row
+
+    def add_mention(self, article_ref: int, block_ref: int, entity_type: str, entity_text: str,
+                    evidence: str, embedding) -> "Mention":
+        return Mention(self, article_ref, block_ref, self.add_sentence(evidence, embedding), entity_type, entity_text)
+
+    def __getstate__(self):
+        # only ship the used rows of the embedding matrix between processes
+        state = self.__dict__.copy()
+        state["_embeddings"] = self.embeddings.copy()
+        return state
+
+
+class Mention:
+    __slots__ = ("store", "article_ref", "block_ref", "sentence_ref", "entity_type", "entity_text",
+                 "kb_id", "canonical_name")
+
+    # fields readable with record[key], in the order of the old dict records
+    FIELDS = ("article_id", "headline", "date", "entity_type", "entity_text", "evidence", "embedding",
+              "block_text", "kb_id", "canonical_name", "content_hash")
+    _WRITABLE = ("entity_type", "entity_text", "kb_id", "canonical_name")
+
+    def __init__(self, store: MentionStore, article_ref: int, block_ref: int, sentence_ref: int,
+                 entity_type: str, entity_text: str):
+        self.store = store
+        self.article_ref = article_ref
+        self.block_ref = block_ref
+        self.sentence_ref = sentence_ref
+        self.entity_type = entity_type
+        self.entity_text = entity_text
+        self.kb_id = None
+        self.canonical_name = None
+
+    @property
+    def article_id(self):
+        return self.store.articles[self.article_ref]["article_id"]
+
+    @property
+    def headline(self) -> str:
+        return self.store.articles[self.article_ref]["headline"]
+
+    @property
+    def date(self):
+        return self.store.articles[self.article_ref]["date"]
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        """checkpoint.article_content_hash of the article version the mention was found in."""
+        return self.store.articles[self.article_ref]["content_hash"]
+
+    @property
+    def block_text(self) -> str:
+        return self.store.blocks[self.block_ref]
+
+    @property
+    def evidence(self) -> str:
+        return self.store.sentences[self.sentence_ref]
+
+    @property
+    def embedding(self) -> np.ndarray:
+        """float32 row view into the store's embedding matrix (no copy)."""
+        return self.store.embeddings[self.sentence_ref]
+
+    # ---- dict-style access for existing consumers ----
+
+    def _present_fields(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if key in ("kb_id", "canonical_name", "content_hash") and getattr(self, key) is None:
+                continue  # not consolidated yet, or not from an archive article
+            yield key
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self._WRITABLE:
+            raise KeyError(f"Mention field {key!r} is read-only")
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._present_fields()
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self else default
+
+    def keys(self) -> List[str]:
+        return list(self._present_fields())
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, getattr(self, key)) for key in self._present_fields()]
+
+    def to_dict(self, include_embedding: bool = True) -> Dict[str, Any]:
+        """Plain dict record (embedding as a list of floats), e.g. for JSON output."""
+        record = dict(self.items())
+        if include_embedding:
+            record["embedding"] = self.embedding.tolist()
+        else:
+            del record["embedding"]
+        return record
+
+    def __repr__(self) -> str:
+        return f"Mention({self.entity_text!r}, {self.entity_type}, article={self.article_id}, kb_id={self.kb_id})"
+
+
+def embedding_as_list(embedding) -> List[float]:
+    """KB entries are JSON, so store embeddings as plain float lists."""
+    return embedding.tolist() if hasattr(embedding, "tolist") else embedding
@@ -0,0 +1,221 @@
+'''
+Offline bulk export for `neo4j-admin database import`
+For initial loads and full rebuilds: instead of writing the graph row by row through
+Neo4jHandler, turn the KB and validated_relationships.jsonl into the header + data
+CSV files neo4j-admin imports directly.
+
+    <out_dir>/nodes.header.csv           :ID(Entity),id,name,aliases:string[],:LABEL
+    <out_dir>/nodes.csv
+    <out_dir>/relationships.header.csv   :START_ID(Entity),:END_ID(Entity),:TYPE,evidence,...
+    <out_dir>/relationships.csv
+
+The graph is the same one Neo4jHandler.import_relationships_from_jsonl builds:
+    - a node per (label, kb_id), labels from the relationship's subject/object type
+      plus :Entity, name from the last annotation (KB canonical name as fallback),
+      aliases from the KB
+    - a relationship per (subject node, type, object node), its support merged over
+      all its annotations (relationship_aggregator.merge_support), like the handler's
+      merge on write, confidence the highest one
+The JSONL file is streamed twice (merge the support per relationship, then write
+the relationship at its last annotation), so only node rows and the support of each
+relationship (capped at MAX_EVIDENCE evidence sentences) are held in memory.
+verify_import_files checks the files without a database.
+
+Run:
+    python neo4j_bulk_export.py validated_relationships.jsonl --kb KB.json --out-dir import
+    neo4j-admin database import full --nodes=import/nodes.header.csv,import/nodes.csv \\
+        --relationships=import/relationships.header.csv,import/relationships.csv \\
+        --array-delimiter=";" neo4j
+'''
+
+import argparse
+import csv
+import os
+from typing import Dict, Any, List, Tuple
+
+from graph_rows import entity_label, relationship_type, read_relationship_rows
+from relationship_aggregator import support_of, merge_support, support_properties
+from kb_names import KBNames
+from kb_store import KB_PATH
+
+ID_SPACE = "Entity"
+ENTITY_LABEL = "Entity"  # shared label, see Neo4jHandler.ensure_schema
+ARRAY_DELIMITER = ";"
+
+NODE_HEADER = [f":ID({ID_SPACE})", "id", "name", "aliases:string[]", ":LABEL"]
+RELATIONSHIP_PROPERTIES = ["evidence", "article_id", "headline", "date", "confidence:float",
+                           "subject_type", "object_type", "content_hash",
+                           "mention_count:int", "article_count:int", "evidence_sentences:string[]",
+                           "evidence_article_ids:string[]", "evidence_headlines:string[]",
+                           "evidence_dates:string[]", "evidence_content_hashes:string[]",
+                           "support_article_ids:string[]", "support_content_hashes:string[]",
+                           "support_mentions:int[]"]
+RELATIONSHIP_HEADER = [f":START_ID({ID_SPACE})", f":END_ID({ID_SPACE})", ":TYPE"] + RELATIONSHIP_PROPERTIES
+
+NODES_FILE = "nodes.csv"
+RELATIONSHIPS_FILE = "relationships.csv"
+
+
+def node_key(label: str, kb_id: str) -> str:
+    """Import id of a node: the handler MERGEs on (label, id), so both are part of the key."""
+    return f"{label}:{kb_id}"
+
+
+def header_path(data_path: str) -> str:
+    root, ext = os.path.splitext(data_path)
+    return f"{root}.header{ext}"
+
+
+def _write_header(data_path: str, header: List[str]):
+    with open(header_path(data_path), "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(header)
+
+
+def _array(values: List[str]) -> str:
+    # neo4j-admin has no escape for the array delimiter inside values
+    return ARRAY_DELIMITER.join(value.replace(ARRAY_DELIMITER, ",") for value in values)
+
+
+def export_for_admin_import(relationships_path: str, out_dir: str = "import", kb_path: str = KB_PATH,
+                            retractions_path: str = "retractions.jsonl") -> Dict[str, int]:
+    """Write node and relationship CSVs for neo4j-admin. Returns row counts."""
+    os.makedirs(out_dir, exist_ok=True)
+    kb_names = KBNames(kb_path)
+
+    # pass 1: merged support and last annotation per relationship key, node names (last one wins)
+    last_row: Dict[Tuple[str, str, str], int] = {}
+    supports: Dict[Tuple[str, str, str], Tuple[Dict[str, Any], float]] = {}  # key -> (support, confidence)
+    nodes: Dict[str, Tuple[str, str, str]] = {}  # node key -> (label, kb_id, name)
+    for i, row in enumerate(read_relationship_rows(relationships_path, kb_names, retractions_path)):
+        keys = []
+        for role in ("subject", "object"):
+            label = entity_label(row[f"{role}_type"])
+            key = node_key(label, row[f"{role}_id"])
+            if row[f"{role}_text"] or key not in nodes:
+                nodes[key] = (label, row[f"{role}_id"], row[f"{role}_text"])
+            keys.append(key)
+        key = (keys[0], relationship_type(row["relationship"]), keys[1])
+        support, confidence = support_of(row), row.get("confidence") or 0.0
+        if key in supports:
+            support = merge_support(supports[key][0], support, row["subject_text"] or "", row["object_text"] or "")
+            confidence = max(supports[key][1], confidence)
+        supports[key] = (support, confidence)
+        last_row[key] = i
+
+    nodes_path = os.path.join(out_dir, NODES_FILE)
+    _write_header(nodes_path, NODE_HEADER)
+    written_nodes = 0
+    with open(nodes_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for key, (label, kb_id, name) in nodes.items():
+            if not name:
+                continue  # the handler skips entities with an empty name
+            entry = kb_names.get(kb_id) or {}
+            writer.writerow([key, kb_id, name, _array(entry.get("aliases") or []), f"{label};{ENTITY_LABEL}"])
+            written_nodes += 1
+
+    # pass 2: stream the rows again, writing each relationship at its last annotation
+    relationships_csv = os.path.join(out_dir, RELATIONSHIPS_FILE)
+    _write_header(relationships_csv, RELATIONSHIP_HEADER)
+    written_relationships = 0
+    with open(relationships_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for i, row in enumerate(read_relationship_rows(relationships_path, kb_names, retractions_path)):
+            start = node_key(entity_label(row["subject_type"]), row["subject_id"])
+            end = node_key(entity_label(row["object_type"]), row["object_id"])
+            rel_type = relationship_type(row["relationship"])
+            if last_row.get((start, rel_type, end)) != i:
+                continue  # written once, at its last annotation
+            if not nodes[start][2] or not nodes[end][2]:
+                continue  # endpoint was skipped, the handler's MATCH would not find it
+            support, confidence = supports[(start, rel_type, end)]
+            properties = support_properties(support)
+            writer.writerow([
+                start, end, rel_type, properties["evidence"], properties["article_id"], properties["headline"],
+                properties["date"], confidence, row["subject_type"], row["object_type"], properties["content_hash"],
+                properties["mention_count"], properties["article_count"],
+                *(_array(properties[name]) for name in ("evidence_sentences", "evidence_article_ids", "evidence_headlines",
+                                                         "evidence_dates", "evidence_content_hashes",
+                                                         "support_article_ids", "support_content_hashes")),
+                _array([str(mentions) for mentions in properties["support_mentions"]])
+            ])
+            written_relationships += 1
+
+    print(f"✅ Wrote {written_nodes} nodes to {nodes_path} and {written_relationships} relationships to {relationships_csv}")
+    return {"nodes": written_nodes, "relationships": written_relationships}
+
+
+def verify_import_files(out_dir: str = "import") -> Dict[str, int]:
+    """
+    Check the exported files the way neo4j-admin would, without a database:
+    headers, column counts, unique node ids, relationship endpoints and types.
+    Raises ValueError on the first problem, returns row counts.
+    """
+    def read(data_path, expected_header):
+        with open(header_path(data_path), encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f))
+        if header != expected_header:
+            raise ValueError(f"Unexpected header in {header_path(data_path)}: {header}")
+        with open(data_path, encoding="utf-8", newline="") as f:
+            for line_number, values in enumerate(csv.reader(f), start=1):
+                if len(values) != len(header):
+                    raise ValueError(f"{data_path}:{line_number} has {len(values)} columns, expected {len(header)}")
+                yield line_number, values
+
+    node_ids = set()
+    nodes_path = os.path.join(out_dir, NODES_FILE)
+    for line_number, (node_id, kb_id, name, _, labels) in read(nodes_path, NODE_HEADER):
+        if node_id in node_ids:
+            raise ValueError(f"{nodes_path}:{line_number} duplicate node id {node_id}")
+        if not kb_id or not name or ENTITY_LABEL not in labels.split(ARRAY_DELIMITER):
+            raise ValueError(f"{nodes_path}:{line_number} missing id, name or :{ENTITY_LABEL} label")
+        node_ids.add(node_id)
+
+    relationship_keys = set()
+    relationships_csv = os.path.join(out_dir, RELATIONSHIPS_FILE)
+    for line_number, values in read(relationships_csv, RELATIONSHIP_HEADER):
+        start, end, rel_type = values[:3]
+        for endpoint in (start, end):
+            if endpoint not in node_ids:
+                raise ValueError(f"{relationships_csv}:{line_number} refers to unknown node {endpoint}")
+        if not rel_type or relationship_type(rel_type) != rel_type:
+            raise ValueError(f"{relationships_csv}:{line_number} invalid relationship type {rel_type!r}")
+        if (start, rel_type, end) in relationship_keys:
+            raise ValueError(f"{relationships_csv}:{line_number} duplicate relationship {start} -[{rel_type}]-> {end}")
+        float(values[3 + RELATIONSHIP_PROPERTIES.index("confidence:float")] or 0.0)
+        for count in ("mention_count:int", "article_count:int"):
+            int(values[3 + RELATIONSHIP_PROPERTIES.index(count)])
+        relationship_keys.add((start, rel_type, end))
+
+    print(f"✅ {out_dir}: {len(node_ids)} nodes, {len(relationship_keys)} relationships, all endpoints resolved")
+    return {"nodes": len(node_ids), "relationships": len(relationship_keys)}
+
+
+def admin_import_command(out_dir: str = "import", database: str = "neo4j") -> str:
+    nodes_path = os.path.join(out_dir, NODES_FILE)
+    relationships_csv = os.path.join(out_dir, RELATIONSHIPS_FILE)
+    return (
+        f"neo4j-admin database import full "
+        f"--nodes={header_path(nodes_path)},{nodes_path} "
+        f"--relationships={header_path(relationships_csv)},{relationships_csv} "
+        f"--array-delimiter=\"{ARRAY_DELIMITER}\" --overwrite-destination {database}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the graph as CSV files for neo4j-admin database import.")
+    parser.add_argument("relationships", nargs="?", default="validated_relationships.jsonl")
+    parser.add_argument("--kb", default=KB_PATH)
+    parser.add_argument("--retractions", default="retractions.jsonl")
+    parser.add_argument("--out-dir", default="import")
+    parser.add_argument("--database", default="neo4j")
+    args = parser.parse_args(argv)
+
+    export_for_admin_import(args.relationships, args.out_dir, kb_path=args.kb, retractions_path=args.retractions)
+    verify_import_files(args.out_dir)
+    print("Import with the database stopped, then start it and run Neo4jHandler.ensure_schema():\n")
+    print(admin_import_command(args.out_dir, args.database))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 import os
 import dotenv
 import json
-import re
 from neo4j import GraphDatabase
-from typing import Dict
+from collections import defaultdict
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Set, Tuple
+from incremental import load_retractions
+from graph_rows import (entity_label, relationship_type, read_relationship_rows, read_supported_edges,
+                        ImportCheckpoint, IMPORT_STATE_FILE)
+from relationship_aggregator import support_of, merge_support, retract_support, support_properties, support_from_properties
+from pipeline import batched
+from config import ENTITY_TYPES
+from kb_names import KBNames
+from kb_store import KB_PATH
+from graph_snapshot import update_snapshot
 
 
 # Load environment variables from multiple possible locations
@@ -26,8 +35,34 @@ elif os.path.exists('.env'):
 ------------------------------------------------------------
 '''
 
+# rows written per UNWIND transaction by the batch methods
+DEFAULT_BATCH_SIZE = 5000
+
+# every entity node also gets this label, for type-independent lookups
+ENTITY_LABEL = "Entity"
+ENTITY_NAME_INDEX = "entity_names"
+
+# one-time data migrations, run in order by ensure_schema; the number applied is kept
+# on a (:SchemaVersion {name: SCHEMA_NAME}) node so each one runs once per database
+SCHEMA_NAME = "kg_builder"
+MIGRATIONS = [
+    # 1: the shared :Entity label on nodes written before it existed
+    f"MATCH (n) WHERE n.id IS NOT NULL AND NOT n:{ENTITY_LABEL} "
+    f"CALL {{ WITH n SET n:{ENTITY_LABEL} }} IN TRANSACTIONS OF 10000 ROWS",
+]
+
+
+def edge_key(rel: Dict[str, Any]) -> Tuple[str, str, str, str, str]:
+    """(subject label, relationship type, object label, subject id, object id): the edge a relationship is written to."""
+    return (entity_label(rel.get("subject_type")), relationship_type(rel["relationship"]), entity_label(rel.get("object_type")),
+            rel["subject_id"], rel["object_id"])
+
+
 class Neo4jHandler:
-    def __init__(self, uri, user, password):
+    def __init__(self, uri, user, password, batch_size: int = DEFAULT_BATCH_SIZE, kb_path: str = KB_PATH):
+        self.batch_size = batch_size
+        self.kb_names = KBNames(kb_path)  # names only, loaded on first use
+        self._schema_ready = False
         try:
             self.driver = GraphDatabase.driver(uri, auth=(user, password))
             print("✅ Connected to Neo4j")
@@ -51,18 +86,62 @@ class Neo4jHandler:
         """Close the Neo4j connection."""
         self.driver.close()
 
+    def ensure_schema(self):
+        """
+        Create the constraints and indexes graph writes rely on (idempotent):
+          - id uniqueness constraint per entity label in config.ENTITY_TYPES (+ UNKNOWN),
+            so MERGE/MATCH on (label, id) use an index instead of a label scan
+          - an id index on the shared :Entity label
+          - a full-text index on entity names and aliases
+        and runs the MIGRATIONS this database has not had yet (see migrate).
+        """
+        labels = sorted({entity_label(entity_type) for entity_type in ENTITY_TYPES} | {"UNKNOWN"})
+        statements = [
+            f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS FOR (n:`{label}`) REQUIRE n.id IS UNIQUE"
+            for label in labels
+        ]
+        statements.append(f"CREATE INDEX entity_id IF NOT EXISTS FOR (n:{ENTITY_LABEL}) ON (n.id)")
+        statements.append(
+            f"CREATE FULLTEXT INDEX {ENTITY_NAME_INDEX} IF NOT EXISTS FOR (n:{ENTITY_LABEL}) ON EACH [n.name, n.aliases]"
+        )
+        with self.driver.session() as session:
+            for statement in statements:
+                session.run(statement).consume()
+            # wait for the new indexes to come online before writing
+            session.run("CALL db.awaitIndexes(300)").consume()
+        self.migrate()
+        self._schema_ready = True
+        print(f"✅ Schema ready: {len(labels)} id constraints, :{ENTITY_LABEL}(id) index, {ENTITY_NAME_INDEX} full-text index")
+
+    def migrate(self):
+        """
+        Run the MIGRATIONS not applied to this database yet, recording each one on the
+        :SchemaVersion node when it finishes, so full-graph rewrites run once instead
+        of on every import. A migration interrupted before it is recorded runs again,
+        so each one must be safe to repeat.
+        """
+        with self.driver.session() as session:
+            record = session.run("MATCH (s:SchemaVersion {name: $name}) RETURN s.version AS version",
+                                 {"name": SCHEMA_NAME}).single()
+            version = record["version"] if record else 0
+            for number, statement in enumerate(MIGRATIONS[version:], start=version + 1):
+                print(f"[INFO] Running schema migration {number}")
+                # CALL ... IN TRANSACTIONS needs an auto-commit transaction, so session.run
+                session.run(statement).consume()
+                session.run("MERGE (s:SchemaVersion {name: $name}) SET s.version = $version",
+                            {"name": SCHEMA_NAME, "version": number}).consume()
+
     def add_entity(self, entity_id, entity_name, entity_type="Unknown"):
         """Create or update an entity in Neo4j using its type as the label."""
         if not entity_name:
             print(f"⚠️ Skipping entity with empty name (ID: {entity_id})")
             return
             
-        # Ensure entity_type is valid for Neo4j (no spaces, alphanumeric)
-        label = entity_type.replace(" ", "_").upper() if entity_type else "UNKNOWN"
-        
+        label = entity_label(entity_type)
+
         query = """
         MERGE (n:`%s` {id: $id})
-        SET n.name = $name
+        SET n:Entity, n.name = $name
         """ % label
         
         try:
@@ -73,166 +152,354 @@ class Neo4jHandler:
             print(f"❌ Error adding entity {entity_name}: {str(e)}")
 
     def add_relationship(self, subject_id, subject_name, relationship, object_id, object_name, evidence, metadata):
-        """Create a relationship between entities in Neo4j."""
+        """Create a relationship between entities in Neo4j, or add this mention's support to it."""
         if not relationship:
             print(f"⚠️ Skipping relationship with empty type between {subject_name} and {object_name}")
             return
-            
-        # Format relationship type - must be alphanumeric with underscores
-        sanitized_rel = re.sub(r"\s+", "_", relationship.upper())  
-        sanitized_rel = re.sub(r"[^a-zA-Z0-9_]", "", sanitized_rel)
-        
-        if not sanitized_rel:
-            sanitized_rel = "RELATED_TO"  
+        rel = {**metadata, "subject_id": subject_id, "subject_text": subject_name, "object_id": object_id,
+               "object_text": object_name, "relationship": relationship, "evidence": evidence}
+        if self.add_relationships_batch([rel]):
+            print(f"✅ Added relationship: {subject_name} -[{relationship}]-> {object_name}")
 
-        # Get the entity types from metadata
-        subject_type = metadata.get("subject_type", "UNKNOWN").replace(" ", "_").upper()
-        object_type = metadata.get("object_type", "UNKNOWN").replace(" ", "_").upper()
+    def _write_batches(self, query: str, rows: List[Dict[str, Any]]) -> int:
+        """Run an UNWIND $rows query in managed write transactions of batch_size rows."""
+        written = 0
+        with self.driver.session() as session:
+            for chunk in batched(rows, self.batch_size):
+                session.execute_write(lambda tx: tx.run(query, rows=chunk).consume())
+                written += len(chunk)
+        return written
 
-        query = f"""
-        MATCH (a:`{subject_type}` {{id: $subject_id}})
-        MATCH (b:`{object_type}` {{id: $object_id}})
+    def add_entities_batch(self, entities: Iterable[Dict[str, Any]], raise_errors: bool = False) -> int:
+        """
+        Bulk version of add_entity. Each entity is {"id", "name", "type"} plus
+        optional "aliases" (list of names, indexed by the full-text index).
+        Entities are grouped by label and each group is written with one
+        UNWIND query per batch_size rows. Returns the number of entities written.
+        Failed labels are reported and skipped, unless raise_errors is set.
+        """
+        by_label = defaultdict(dict)  # label -> id -> row (last name wins, as with add_entity)
+        for entity in entities:
+            if not entity.get("name"):
+                print(f"⚠️ Skipping entity with empty name (ID: {entity.get('id')})")
+                continue
+            by_label[entity_label(entity.get("type"))][entity["id"]] = {
+                "id": entity["id"], "name": entity["name"], "aliases": entity.get("aliases")
+            }
+
+        written = 0
+        for label, rows in by_label.items():
+            query = """
+            UNWIND $rows AS row
+            MERGE (n:`%s` {id: row.id})
+            SET n:Entity, n.name = row.name, n.aliases = coalesce(row.aliases, n.aliases)
+            """ % label
+            try:
+                written += self._write_batches(query, list(rows.values()))
+            except Exception as e:
+                print(f"❌ Error adding {label} entities: {str(e)}")
+                if raise_errors:
+                    raise
+        print(f"✅ Added/Updated {written} entities")
+        return written
+
+    def _merge_relationships(self, subject_label: str, sanitized_rel: str, object_label: str,
+                             rows: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+        """
+        Write rows of one (subject label, type, object label) group, batch_size per transaction,
+        and return the (subject_id, object_id) of the edges written (a row whose endpoint
+        MATCH finds no node writes nothing).
+        Each transaction reads the support the edges already hold, merges the rows' support
+        into it (relationship_aggregator.merge_support) and writes the result back, so
+        mention counts add up across imports and evidence is re-ranked instead of replaced.
+        """
+        match = f"""
+        UNWIND $rows AS row
+        MATCH (a:`{subject_label}` {{id: row.subject_id}})-[r:{sanitized_rel}]->(b:`{object_label}` {{id: row.object_id}})
+        RETURN row.subject_id AS subject_id, row.object_id AS object_id, properties(r) AS properties
+        """
+        write = f"""
+        UNWIND $rows AS row
+        MATCH (a:`{subject_label}` {{id: row.subject_id}})
+        MATCH (b:`{object_label}` {{id: row.object_id}})
         MERGE (a)-[r:{sanitized_rel}]->(b)
-        SET r.evidence = $evidence,
-            r.article_id = $article_id,
-            r.headline = $headline,
-            r.date = $date,
-            r.confidence = $confidence,
-            r.subject_type = $subject_type,
-            r.object_type = $object_type
+        SET r += row.properties
+        RETURN row.subject_id AS subject_id, row.object_id AS object_id
+        """
+
+        def merge_chunk(tx, chunk):
+            existing = {
+                (record["subject_id"], record["object_id"]): record["properties"]
+                for record in tx.run(match, rows=[{"subject_id": row["subject_id"], "object_id": row["object_id"]} for row in chunk])
+            }
+            merged = []
+            for row in chunk:
+                old = existing.get((row["subject_id"], row["object_id"]))
+                support = row["support"]
+                if old is not None:
+                    support = merge_support(support_from_properties(old), support, row["subject_text"], row["object_text"])
+                properties = {**row["properties"], **support_properties(support)}
+                if old is not None:
+                    properties["confidence"] = max(old.get("confidence") or 0.0, properties["confidence"])
+                merged.append({"subject_id": row["subject_id"], "object_id": row["object_id"], "properties": properties})
+            return {(record["subject_id"], record["object_id"]) for record in tx.run(write, rows=merged)}
+
+        written = set()
+        with self.driver.session() as session:
+            for chunk in batched(rows, self.batch_size):
+                written |= session.execute_write(merge_chunk, chunk)
+        return written
+
+    def add_relationships_batch(self, relationships: Iterable[Dict[str, Any]], raise_errors: bool = False) -> int:
+        """Bulk version of add_relationship, see write_relationships. Returns the number of edges written."""
+        return len(self.write_relationships(relationships, raise_errors=raise_errors))
+
+    def write_relationships(self, relationships: Iterable[Dict[str, Any]],
+                            raise_errors: bool = False) -> Set[Tuple[str, str, str, str, str]]:
+        """
+        Bulk version of add_relationship. Each relationship is a dict with
+        subject_id, object_id, relationship, subject_type, object_type, evidence
+        and the metadata fields (article_id, headline, date, confidence, content_hash),
+        plus mention_count, article_count, supporting_evidence and article_support for
+        aggregated facts. Relationships are grouped by (subject label, type, object label),
+        since labels and types cannot be query parameters; rows for the same edge are merged
+        first, then merged into the edge (see _merge_relationships). Returns the edge_key of
+        every edge written. Failed groups are reported and skipped, unless raise_errors is set.
         """
+        groups = defaultdict(dict)  # (labels, type) -> (subject_id, object_id) -> row
+        for rel in relationships:
+            if not rel.get("relationship"):
+                print(f"⚠️ Skipping relationship with empty type between {rel.get('subject_id')} and {rel.get('object_id')}")
+                continue
+            subject_label, sanitized_rel, object_label, *endpoints = edge_key(rel)
+            key, endpoints = (subject_label, sanitized_rel, object_label), tuple(endpoints)
+            row = {
+                "subject_id": rel["subject_id"],
+                "object_id": rel["object_id"],
+                "subject_text": rel.get("subject_text") or "",
+                "object_text": rel.get("object_text") or "",
+                "support": support_of(rel),
+                "properties": {
+                    "confidence": rel.get("confidence") or 0.0,
+                    "subject_type": rel.get("subject_type"),
+                    "object_type": rel.get("object_type"),
+                },
+            }
+            earlier = groups[key].get(endpoints)
+            if earlier is not None:
+                row["support"] = merge_support(earlier["support"], row["support"], row["subject_text"], row["object_text"])
+                row["properties"]["confidence"] = max(earlier["properties"]["confidence"], row["properties"]["confidence"])
+            groups[key][endpoints] = row
+
+        written = set()
+        for (subject_label, sanitized_rel, object_label), rows in groups.items():
+            try:
+                endpoints = self._merge_relationships(subject_label, sanitized_rel, object_label, list(rows.values()))
+                written.update((subject_label, sanitized_rel, object_label, *pair) for pair in endpoints)
+            except Exception as e:
+                print(f"❌ Error adding {subject_label} -[{sanitized_rel}]-> {object_label} relationships: {str(e)}")
+                if raise_errors:
+                    raise
+        print(f"✅ Added {len(written)} relationships")
+        return written
+
+    def retract_article_relationships(self, retractions: Dict[str, str], file_path="validated_relationships.jsonl",
+                                      checkpoint_path=IMPORT_STATE_FILE):
+        """
+        Remove the support of older versions of changed articles from the relationships.
+        retractions maps article_id -> current content hash (see incremental.ArticleIndex).
+        Each relationship such an article supported loses that article's mentions and
+        evidence (relationship_aggregator.retract_support); it is deleted only when no
+        article is left supporting it. Support of the current version is kept.
+        The edges are found through the annotations of file_path (graph_rows.read_supported_edges)
+        and matched on their endpoints' indexed ids, not by scanning every relationship.
+        Applied retractions are recorded in the import checkpoint, so they run once.
+        """
+        checkpoint = ImportCheckpoint(checkpoint_path)
+        pending = checkpoint.pending_retractions(retractions)
+        if not pending:
+            return
+
+        groups = defaultdict(list)
+        counts = {"deleted": 0, "updated": 0}
         try:
+            for subject_label, subject_id, sanitized_rel, object_label, object_id in read_supported_edges(file_path, pending):
+                groups[(subject_label, sanitized_rel, object_label)].append({"subject_id": subject_id, "object_id": object_id})
             with self.driver.session() as session:
-                session.run(query, {
-                    "subject_id": subject_id,
-                    "object_id": object_id,
-                    "evidence": evidence,
-                    "article_id": metadata.get("article_id"),
-                    "headline": metadata.get("headline"),
-                    "date": metadata.get("date"),
-                    "confidence": metadata.get("confidence", 0.0),
-                    "subject_type": metadata.get("subject_type"),
-                    "object_type": metadata.get("object_type")
-                })
-                print(f"✅ Added relationship: {subject_name} -[{relationship}]-> {object_name}")
+                for (subject_label, sanitized_rel, object_label), rows in groups.items():
+                    match = f"""
+                    UNWIND $rows AS row
+                    MATCH (a:`{subject_label}` {{id: row.subject_id}})-[r:{sanitized_rel}]->(b:`{object_label}` {{id: row.object_id}})
+                    """
+
+                    def retract_chunk(tx, chunk):
+                        deleted, updated = [], []
+                        for record in tx.run(match + "RETURN row AS row, properties(r) AS properties", rows=chunk):
+                            support = support_from_properties(record["properties"])
+                            kept = retract_support(support, pending)
+                            if kept == support:
+                                continue
+                            if not kept["articles"]:
+                                deleted.append(record["row"])
+                            else:
+                                updated.append({**record["row"], "properties": support_properties(kept)})
+                        tx.run(match + "DELETE r", rows=deleted).consume()
+                        tx.run(match + "SET r += row.properties", rows=updated).consume()
+                        return len(deleted), len(updated)
+
+                    for chunk in batched(rows, self.batch_size):
+                        deleted, updated = session.execute_write(retract_chunk, chunk)
+                        counts["deleted"] += deleted
+                        counts["updated"] += updated
         except Exception as e:
-            print(f"❌ Error adding relationship: {str(e)}")
+            print(f"❌ Error retracting relationships: {str(e)}")
+            return
+        checkpoint.record_retractions(pending)
+        print(f"✅ Retracted {len(pending)} changed articles: {counts['deleted']} relationships deleted, "
+              f"{counts['updated']} keep support from other articles")
 
-    def export_relationships_to_json(self, output_file="output.json"):
-        """Pull relationships from Neo4j and save them as a JSON file."""
-        query = """
-        MATCH (a:Entity)-[r]->(b:Entity)
-        RETURN 
-            a.name AS subject_text, 
-            a.type AS subject_type,
-            type(r) AS relationship, 
-            b.name AS object_text, 
-            b.type AS object_type,
+    def iter_relationships(self, page_size: int = 1000, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                           relationship_types: Optional[List[str]] = None,
+                           article_ids: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every relationship between entity nodes, page by page. Pages use keyset
+        pagination on the subject's id, which the :Entity(id) index serves in order
+        (WHERE a.id > last id seen ORDER BY a.id): a page is the outgoing relationships
+        of the next page_size subject nodes, each page in its own read transaction, so
+        every page costs the same however far into the graph it is, memory stays
+        bounded by page_size nodes' relationships and nothing is skipped or repeated.
+        Optional filters: date range (inclusive, compared as ISO strings),
+        relationship types and article ids.
+        """
+        conditions = []
+        params: Dict[str, Any] = {"limit": page_size}
+        if date_from:
+            conditions.append("r.date >= $date_from")
+            params["date_from"] = date_from
+        if date_to:
+            conditions.append("r.date <= $date_to")
+            params["date_to"] = date_to
+        if relationship_types:
+            conditions.append("type(r) IN $types")
+            params["types"] = [relationship_type(rel) for rel in relationship_types]
+        if article_ids:
+            conditions.append("r.article_id IN $article_ids")
+            params["article_ids"] = [str(article_id) for article_id in article_ids]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # a subject without (matching) relationships still returns one row, r null,
+        # so the page's last subject id is known
+        query = f"""
+        MATCH (a:{ENTITY_LABEL})
+        WHERE a.id > $after
+        WITH a ORDER BY a.id LIMIT $limit
+        OPTIONAL MATCH (a)-[r]->(b:{ENTITY_LABEL})
+        {where}
+        RETURN
+            a.id AS page_key,
+            elementId(r) AS rel_id,
+            a.id AS subject_id,
+            a.name AS subject_text,
+            [label IN labels(a) WHERE label <> '{ENTITY_LABEL}'][0] AS subject_type,
+            type(r) AS relationship,
+            b.id AS object_id,
+            b.name AS object_text,
+            [label IN labels(b) WHERE label <> '{ENTITY_LABEL}'][0] AS object_type,
             r.evidence AS evidence,
             r.article_id AS article_id,
             r.headline AS headline,
             r.date AS date,
             r.confidence AS confidence,
-            r.subject_type AS subject_type,
-            r.object_type AS object_type
-
+            r.content_hash AS content_hash
         """
+        after = ""  # entity ids are strings, all greater than ""
+        with self.driver.session() as session:
+            while True:
+                page = session.execute_read(lambda tx: [record.data() for record in tx.run(query, {**params, "after": after})])
+                if not page:
+                    return
+                after = max(record.pop("page_key") for record in page)
+                yield from (record for record in page if record["rel_id"] is not None)
 
+    def export_relationships(self, output_file: str = "output.jsonl", page_size: int = 1000, **filters) -> int:
+        """
+        Stream relationships (see iter_relationships for the filters) to a file as they
+        are read: JSON lines for .jsonl files, otherwise a JSON array written element by
+        element. Returns the number of relationships written.
+        """
+        as_array = not output_file.endswith(".jsonl")
+        count = 0
         try:
-            with self.driver.session() as session:
-                results = session.run(query)
-                data = [record.data() for record in results]
-
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4)
-                
-                print(f"✅ Relationships successfully exported to {output_file}")
-
+            with open(output_file, "w", encoding="utf-8") as f:
+                if as_array:
+                    f.write("[")
+                for record in self.iter_relationships(page_size=page_size, **filters):
+                    if as_array:
+                        f.write(",\n" if count else "\n")
+                        f.write("    " + json.dumps(record, ensure_ascii=False, indent=4).replace("\n", "\n    "))
+                    else:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    count += 1
+                if as_array:
+                    f.write("\n]" if count else "]")
+            print(f"✅ {count} relationships successfully exported to {output_file}")
         except Exception as e:
             print(f"❌ Error exporting relationships: {str(e)}")
+        return count
 
-    def import_relationships_from_jsonl(self, file_path="validated_relationships.jsonl"):
-        """Read relationships from JSONL and store them in Neo4j with proper entity types."""
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    data = json.loads(line)
-                    meta = data.get("meta", {})
-
-                    subject_id = meta.get("subject_kb_id")
-                    object_id = meta.get("object_kb_id")
-                    relationship = meta.get("relationship")
-                    article_id = meta.get("article_id")
-                    headline = meta.get("headline")
-                    date = meta.get("date")
-                    subject_type = meta.get("subject_type")
-                    object_type = meta.get("object_type")
-                    
-                    # Load KB
-                    KB = load_kb()
-                    
-                    # Extract entity texts from spans
-                    subject_text = None
-                    object_text = None
-                    for span in data.get("spans", []):
-                        if span["label"] == "SUBJECT":
-                            subject_text = data["text"][span["start"]:span["end"]]
-                        elif span["label"] == "OBJECT":
-                            object_text = data["text"][span["start"]:span["end"]]
-
-                    # Fallback to KB if spans don't provide the text
-                    if not subject_text:
-                        subject_text = get_entity_name_from_kb(subject_id, KB)
-                    if not object_text:
-                        object_text = get_entity_name_from_kb(object_id, KB)
-
-                    # Verify we have all required data
-                    if not all([subject_id, object_id, relationship]):
-                        print(f"Missing required fields in relationship", data)
-                        continue
-
-                    # Add entities and relationship to Neo4j
-                    self.add_entity(subject_id, subject_text, subject_type)
-                    self.add_entity(object_id, object_text, object_type)
-
-                    metadata = {
-                        "article_id": article_id,
-                        "headline": headline,
-                        "date": date,
-                        "subject_type": subject_type,
-                        "object_type": object_type
-                    }
-                    
-                    self.add_relationship(
-                        subject_id, 
-                        subject_text, 
-                        relationship, 
-                        object_id, 
-                        object_text, 
-                        data["text"], 
-                        metadata
-                    )
-                    
-                    print(f"✅ Processed relationship: {subject_text} -[{relationship}]-> {object_text}")
+    def export_relationships_to_json(self, output_file="output.json", **filters):
+        """Pull relationships from Neo4j and save them as a JSON file (streamed, see export_relationships)."""
+        return self.export_relationships(output_file, **filters)
+
+    def import_relationships_from_jsonl(self, file_path="validated_relationships.jsonl", retractions_path="retractions.jsonl",
+                                       checkpoint_path=IMPORT_STATE_FILE) -> int:
+        """
+        Read accepted relationships from JSONL and store them in Neo4j with proper entity types.
+        Rows are written batch_size relationships at a time with add_entities_batch and
+        write_relationships (entities first, so the relationship MATCHes find them).
+
+        Idempotent and resumable: after each committed batch the hashes of the annotations
+        actually written and the file offset are recorded (graph_rows.ImportCheckpoint).
+        A rerun continues after the last committed line and skips annotations already applied,
+        so importing a file that new `prodigy db-out` exports were appended to only writes
+        the new annotations. Rows whose endpoints were not found are not recorded as applied,
+        and the recorded offset stays before the first of them, so the next import retries them.
+        Returns the number of relationships written.
+        """
+        if not self._schema_ready:
+            self.ensure_schema()
+        checkpoint = ImportCheckpoint(checkpoint_path)
+        start_offset = checkpoint.resume_offset(file_path)
+        if start_offset:
+            print(f"[INFO] Resuming import of {file_path} at byte {start_offset}")
 
+        imported = skipped = not_written = 0
+        rows = read_relationship_rows(file_path, self.kb_names, retractions_path, start_offset=start_offset)
+        try:
+            for batch in batched(rows, self.batch_size):
+                new_rows = [row for row in batch if not checkpoint.is_applied(row)]
+                skipped += len(batch) - len(new_rows)
+                entities = []
+                for row in new_rows:
+                    for role in ("subject", "object"):
+                        kb_id = row[f"{role}_id"]
+                        entities.append({
+                            "id": kb_id, "name": row[f"{role}_text"], "type": row[f"{role}_type"],
+                            "aliases": (self.kb_names.get(kb_id) or {}).get("aliases")
+                        })
+                self.add_entities_batch(entities, raise_errors=True)
+                written = self.write_relationships(new_rows, raise_errors=True)
+                # only now is the batch in the graph; rows whose endpoints were not found
+                # (e.g. an entity without a name) were not written, the next import reads them again
+                written_rows = [row for row in new_rows if edge_key(row) in written]
+                checkpoint.record(file_path, batch, unwritten=[row for row in new_rows if edge_key(row) not in written])
+                imported += len(written_rows)
+                not_written += len(new_rows) - len(written_rows)
         except Exception as e:
-            print(f"❌ Error reading JSONL file {file_path}: {str(e)}")
-
-def load_kb() -> Dict:
-     """Load the knowledge base from KB.json"""
-     try:
-         with open("KB.json", 'r', encoding='utf-8') as f:
-             return json.load(f)
-     except FileNotFoundError:
-         print("Warning: KB.json not found")
-         return {}
- 
-def get_entity_name_from_kb(kb_id: str, KB: Dict) -> str:
-     """Get entity's canonical name from KB using its ID"""
-     if kb_id and kb_id in KB:
-         return KB[kb_id].get('canonical_name', '')
-     print(f"❌ Entity not found in KB: {kb_id}")
-     return ''
+            print(f"❌ Error importing {file_path}, rerun to resume after the last committed batch: {str(e)}")
+        print(f"✅ Imported {imported} new relationships from {file_path} ({skipped} already applied, "
+              f"{not_written} without both entities in the graph)")
+        return imported
 
 if __name__ == "__main__":
     try:
@@ -245,19 +512,29 @@ if __name__ == "__main__":
             raise ValueError("Missing Neo4j credentials in environment variables")
 
         # Initialize Neo4j handler
-        handler = Neo4jHandler(neo4j_uri, neo4j_user, neo4j_password)
+        handler = Neo4jHandler(neo4j_uri, neo4j_user, neo4j_password,
+                               batch_size=int(os.getenv("NEO4J_BATCH_SIZE", DEFAULT_BATCH_SIZE)))
 
         # Test connection
         if not handler.test_connection():
             raise ValueError("Failed to connect to Neo4j database")
 
+        # Constraints and indexes for the MERGE/MATCH lookups below
+        handler.ensure_schema()
+
+        # Remove relationships of articles that changed since they were imported
+        handler.retract_article_relationships(load_retractions("retractions.jsonl"), "validated_relationships.jsonl")
+
         # Import relationships from JSONL
         print("\n📥 Importing relationships from validated_relationships.jsonl...")
         handler.import_relationships_from_jsonl("validated_relationships.jsonl")
 
+        # Refresh the browser extension's per-entity snapshot with the new relationships
+        update_snapshot("validated_relationships.jsonl")
+
         # Export relationships to JSON file
-        #print("\n📤 Exporting relationships to output.json...")
-        #handler.export_relationships_to_json("output.json")
+        #print("\n📤 Exporting relationships to output.jsonl...")
+        #handler.export_relationships("output.jsonl", date_from="2023-01-01", relationship_types=["VETOED"])
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -0,0 +1,195 @@
+'''
+Staged producer/consumer pipeline for knowledge graph extraction
+
+  articles --> [1. ANALYZE]  --> [2. CONSOLIDATE] --> [3. RELATE]  --> results
+               process pool      single KB writer     LLM threads
+               NER, sentences,   KBStore              relationship
+               embeddings                             extraction
+
+- Stages are connected by bounded queues, so a slow stage applies back-pressure
+  instead of buffering the whole archive in memory
+- Each stage has its own worker count, so CPU-bound NER/embedding work overlaps
+  with network-bound LLM calls
+- The stage functions are passed in (see KGextraction.main), this module only
+  handles the plumbing
+- run_relate runs the RELATE stage alone, over mentions consolidated by an earlier run
+- shard_path / shard_paths name the numbered shards a stage writes its output to
+  (relationships.jsonl -> relationships.00000.jsonl, ...), see prodigy_tasks and extraction_shards
+'''
+
+import os
+import queue
+import re
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Any, List, Iterable, Iterator, Callable, Tuple, Optional
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+Article = Dict[str, Any]
+Records = List[Dict[str, Any]]
+# (article, relationships, error) -- relationships is None if the article failed
+PipelineResult = Tuple[Article, Optional[List[Dict[str, Any]]], Optional[BaseException]]
+
+
+def batched(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to batch_size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def shard_path(output_file: str, index: int) -> str:
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.{index:05d}{ext}"
+
+
+def shard_paths(output_file: str) -> List[str]:
+    """Existing shards of output_file, in order."""
+    root, ext = os.path.splitext(output_file)
+    directory = os.path.dirname(root) or "."
+    pattern = re.compile(re.escape(os.path.basename(root)) + r"\.(\d{5})" + re.escape(ext) + "$")
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if pattern.match(name))
+    return [os.path.join(os.path.dirname(root), name) for name in names]
+
+
+def run_pipeline(
+    articles: Iterable[Article],
+    analyze_batch: Callable[[List[Article]], List[Tuple[Article, Records]]],
+    consolidate: Callable[[Records], Records],
+    relate: Callable[[Article, Records], List[Dict[str, Any]]],
+    workers: int = 2,
+    batch_size: int = 4,
+    llm_workers: int = 2,
+    queue_size: int = 8,
+) -> Iterator[PipelineResult]:
+    """
+    Run articles through the three stages and yield (article, relationships, error)
+    as each article finishes. Results come back in completion order, not input order.
+
+    analyze_batch must be a picklable module-level function, it runs in worker processes.
+    consolidate runs on a single thread, relate on llm_workers threads.
+    """
+    analyzed_q = queue.Queue(maxsize=queue_size)  # (batch, future)
+    consolidated_q = queue.Queue(maxsize=queue_size)  # (article, records)
+    results_q = queue.Queue(maxsize=queue_size)  # PipelineResult
+    feeder_errors = []
+
+    # spawn so each worker loads its own models instead of inheriting forked model state
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def feed():
+        try:
+            for batch in batched(articles, batch_size):
+                analyzed_q.put((batch, pool.submit(analyze_batch, batch)))
+        except BaseException as e:
+            feeder_errors.append(e)
+        finally:
+            analyzed_q.put(_DONE)
+
+    def consolidate_stage():
+        while True:
+            item = analyzed_q.get()
+            if item is _DONE:
+                break
+            batch, future = item
+            try:
+                analyzed = future.result()
+            except BaseException as e:
+                for article in batch:
+                    results_q.put((article, None, e))
+                continue
+            for article, records in analyzed:
+                if not records:
+                    results_q.put((article, [], None))
+                    continue
+                try:
+                    consolidated_q.put((article, consolidate(records)))
+                except BaseException as e:
+                    results_q.put((article, None, e))
+        for _ in range(llm_workers):
+            consolidated_q.put(_DONE)
+
+    threads = [threading.Thread(target=feed, daemon=True), threading.Thread(target=consolidate_stage, daemon=True)]
+    threads += [threading.Thread(target=_relate_stage, args=(consolidated_q, results_q, relate), daemon=True)
+                for _ in range(llm_workers)]
+    for t in threads:
+        t.start()
+
+    try:
+        yield from _results(results_q, llm_workers)
+        for t in threads:
+            t.join()
+        if feeder_errors:
+            raise feeder_errors[0]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_relate(
+    consolidated: Iterable[Tuple[Article, Records]],
+    relate: Callable[[Article, Records], List[Dict[str, Any]]],
+    llm_workers: int = 2,
+    queue_size: int = 8,
+) -> Iterator[PipelineResult]:
+    """
+    Only the RELATE stage of run_pipeline, over (article, records) that are already
+    consolidated (e.g. the mentions a previous run saved), on llm_workers threads.
+    """
+    consolidated_q = queue.Queue(maxsize=queue_size)
+    results_q = queue.Queue(maxsize=queue_size)
+    feeder_errors = []
+
+    def feed():
+        try:
+            for item in consolidated:
+                consolidated_q.put(item)
+        except BaseException as e:
+            feeder_errors.append(e)
+        finally:
+            for _ in range(llm_workers):
+                consolidated_q.put(_DONE)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=_relate_stage, args=(consolidated_q, results_q, relate), daemon=True)
+                for _ in range(llm_workers)]
+    for t in threads:
+        t.start()
+
+    yield from _results(results_q, llm_workers)
+    for t in threads:
+        t.join()
+    if feeder_errors:
+        raise feeder_errors[0]
+
+
+def _relate_stage(consolidated_q: queue.Queue, results_q: queue.Queue, relate: Callable):
+    """One RELATE worker: relate (article, records) until _DONE, then pass _DONE on."""
+    while True:
+        item = consolidated_q.get()
+        if item is _DONE:
+            break
+        article, records = item
+        try:
+            results_q.put((article, relate(article, records), None))
+        except BaseException as e:
+            results_q.put((article, None, e))
+    results_q.put(_DONE)
+
+
+def _results(results_q: queue.Queue, llm_workers: int) -> Iterator[PipelineResult]:
+    """Yield results until every RELATE worker has finished."""
+    finished_workers = 0
+    while finished_workers < llm_workers:
+        item = results_q.get()
+        if item is _DONE:
+            finished_workers += 1
+            continue
+        yield item
@@ -0,0 +1,111 @@
+'''
+Incremental reads of accepted annotations from a Prodigy dataset
+Instead of loading the whole dataset (db.get_dataset) on every human-in-the-loop cycle:
+1. the dataset's examples are read in the order they were added, batch_size at a time,
+   starting after the position of the last consumed batch (AnnotationCursor,
+   annotation_state.jsonl), see DatasetExamples
+2. each batch is yielded as records ready for KGextraction.piecewise_extraction_to_records
+3. a batch is recorded as consumed when the caller asks for the next one, so a batch
+   that was being processed when a run stopped is read again by the next run
+
+    for records in iter_new_accepted_records("ner_dataset"):
+        mentions = piecewise_extraction_to_records(records, store)
+'''
+
+import json
+import os
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+
+from checkpoint import append_durably
+
+DEFAULT_BATCH_SIZE = 1000
+ANNOTATION_STATE_FILE = "annotation_state.jsonl"
+
+
+class AnnotationCursor:
+    """
+    How far into each Prodigy dataset examples have been consumed, kept as an append-only
+    JSONL log shared by all datasets. Each line is one committed batch:
+        {"dataset", "position"}
+    position is the link id of the batch's last example (the order examples were added to
+    the dataset); the latest line of a dataset wins. Accepted and rejected examples are both
+    consumed, so neither is fetched again.
+    """
+
+    def __init__(self, dataset: str, path: str = ANNOTATION_STATE_FILE):
+        self.dataset = dataset
+        self.path = path
+        self.position = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    if entry.get("dataset") == dataset and "position" in entry:
+                        self.position = entry["position"]
+
+    def record(self, position: int):
+        if position <= self.position:
+            return
+        entry = {"dataset": self.dataset, "position": position}
+        append_durably(self.path, (json.dumps(entry) + "\n").encode("utf-8"))
+        self.position = position
+
+
+def accepted_record(eg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    {"text", "meta", "spans"} of an accepted example with entity spans, else None.
+    Each span gets entity_type from its Prodigy label.
+    """
+    if eg.get("answer") != "accept" or not eg.get("spans"):
+        return None
+    spans = [{**span, "entity_type": span.get("entity_type") or span.get("label")} for span in eg["spans"]]
+    return {"text": eg["text"], "meta": eg.get("meta", {}), "spans": spans}
+
+
+class DatasetExamples:
+    """
+    Examples of one Prodigy dataset after a position, from the database's link table:
+    a link id orders examples by when they were added to the dataset, and only examples
+    linked to the dataset are read (the same task hash may be in other datasets too).
+    """
+
+    def __init__(self, db=None):
+        if db is None:
+            from prodigy.components.db import connect
+            db = connect()  # Connect to the Prodigy database
+        self.db = db
+
+    def examples_after(self, dataset_name: str, position: int, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Up to limit (link id, example) pairs of dataset_name with link id > position, in link order."""
+        from prodigy.components.db import Dataset, Example, Link
+        query = (Example.select(Example, Link.id.alias("link_id"))
+                 .join(Link, on=(Link.example == Example.id))
+                 .join(Dataset, on=(Link.dataset == Dataset.id))
+                 .where(Dataset.name == dataset_name, Link.id > position)
+                 .order_by(Link.id)
+                 .limit(limit)
+                 .objects())
+        return [(row.link_id, row.load) for row in query]
+
+
+def iter_new_accepted_records(dataset_name: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                              state_path: str = ANNOTATION_STATE_FILE, examples=None) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of accepted records from examples added to dataset_name since the last read."""
+    examples = examples or DatasetExamples()
+    cursor = AnnotationCursor(dataset_name, state_path)
+    print(f"[INFO] Reading {dataset_name} after position {cursor.position}")
+
+    read = 0
+    while True:
+        batch = examples.examples_after(dataset_name, cursor.position, batch_size)
+        if not batch:
+            break
+        read += len(batch)
+        records = [record for record in (accepted_record(eg) for _, eg in batch) if record]
+        if records:
+            yield records
+        cursor.record(batch[-1][0])
+    print(f"[INFO] {read} new examples in {dataset_name}")
@@ -0,0 +1,212 @@
+'''
+Prodigy relationship tasks, streamed to sharded JSONL files
+1. relationship_task() turns an extracted relationship into a Prodigy task with
+   SUBJECT/OBJECT spans, meta fields and stable hashes:
+    -> _input_hash from the text, _task_hash from (subject_kb_id, relationship,
+       object_kb_id, text, content_hash), both 32-bit ints like Prodigy's own
+    -> task_key, the full sha1 of the same fields, used for deduplication. The article
+       version (content_hash) is part of it: annotations of an older version are
+       dropped as retracted on import, so a changed article needs its tasks again
+    -> a fact merged by relationship_aggregator is keyed on the fact (subject_kb_id,
+       relationship, object_kb_id) and the article versions supporting it instead, so
+       better evidence found by a later run does not queue the fact for review again
+2. ShardedTaskWriter appends tasks to <root>.00000<ext>, <root>.00001<ext>, ...
+   (relationships.jsonl -> relationships.00000.jsonl), SHARD_SIZE tasks per shard.
+   Keys of the tasks already in the shards are loaded when it opens, so the same
+   relationship found in several blocks, or again by a later run, is written once.
+   Tasks are written as they arrive, nothing is buffered.
+3. tokenize_tasks adds Prodigy's tokens and span token indices to a stream of tasks,
+   batch_size texts per call of a tokenizer's pipe (relationship_validator passes spaCy's);
+   span_token_indices maps character offsets to tokens with bisect
+'''
+
+import hashlib
+import json
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Callable, Tuple
+
+from pipeline import batched, shard_path, shard_paths
+
+SHARD_SIZE = 50000
+SPAN_LABELS = ("SUBJECT", "OBJECT")
+AGGREGATE_FIELDS = ("mention_count", "article_count", "supporting_evidence", "article_support")
+
+
+def _sha1(*parts: Optional[str]) -> bytes:
+    payload = "\x1f".join(part or "" for part in parts)
+    return hashlib.sha1(payload.encode("utf-8")).digest()
+
+
+def _hash32(digest: bytes) -> int:
+    return int.from_bytes(digest[:4], "big", signed=True)
+
+
+def task_text(rel: Dict[str, Any]) -> str:
+    # We'll pick the 'evidence' if not empty, else the block_text
+    return rel["evidence"] if rel.get("evidence") else rel.get("block_text") or ""
+
+
+def _find_span(lowered: str, needle: Optional[str], label: str) -> Optional[Dict[str, Any]]:
+    if not needle:
+        return None
+    start = lowered.find(needle.lower())
+    if start < 0:
+        return None
+    return {"start": start, "end": start + len(needle), "label": label}
+
+
+def relationship_task(rel: Dict[str, Any]) -> Dict[str, Any]:
+    """Prodigy task for one extracted relationship, subject/object highlighted if they appear in the text."""
+    text = task_text(rel)
+    lowered = text.lower() if len(text.lower()) == len(text) else text  # offsets must stay valid
+    spans = [
+        span for span in (
+            _find_span(lowered, rel.get("subject_text"), SPAN_LABELS[0]),
+            _find_span(lowered, rel.get("object_text"), SPAN_LABELS[1]),
+        ) if span is not None
+    ]
+    if "article_support" in rel:
+        versions = sorted(f"{item.get('article_id') or ''}:{item.get('content_hash') or ''}" for item in rel["article_support"])
+        key = _sha1(rel.get("subject_kb_id"), rel.get("relationship"), rel.get("object_kb_id"), *versions)
+    else:
+        key = _sha1(rel.get("subject_kb_id"), rel.get("relationship"), rel.get("object_kb_id"), text, rel.get("content_hash"))
+    meta = {
+        "article_id": rel.get("article_id"),
+        "headline": rel.get("headline"),
+        "date": rel.get("date"),
+        "subject_kb_id": rel.get("subject_kb_id"),
+        "object_kb_id": rel.get("object_kb_id"),
+        "relationship": rel.get("relationship"),
+        "subject_type": rel.get("subject_type"),
+        "object_type": rel.get("object_type"),
+        "content_hash": rel.get("content_hash"),
+    }
+    # facts merged by relationship_aggregator carry their support along
+    for field in AGGREGATE_FIELDS:
+        if field in rel:
+            meta[field] = rel[field]
+    return {
+        "text": text,
+        "spans": spans,
+        "meta": meta,
+        "_input_hash": _hash32(_sha1(text)),
+        "_task_hash": _hash32(key),
+        "task_key": key.hex(),
+    }
+
+
+def iter_task_files(source: str) -> List[str]:
+    """The shards written for source if there are any, otherwise source itself (a plain task file)."""
+    shards = shard_paths(source)
+    if shards:
+        return shards
+    return [source] if os.path.isfile(source) else []
+
+
+def _read_keys(path: str) -> Iterator[str]:
+    """task_key of each complete line; a torn last line from an interrupted run is cut off."""
+    with open(path, "rb+") as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(offset)
+                break
+            offset += len(line)
+            key = json.loads(line).get("task_key")
+            if key:
+                yield key
+
+
+class ShardedTaskWriter:
+    def __init__(self, output_file: str, shard_size: int = SHARD_SIZE):
+        self.output_file = output_file
+        self.shard_size = shard_size
+        self.seen = set()
+        self.written = 0
+        self.duplicates = 0
+        self._file = None
+        self._shard = 0
+        self._shard_lines = 0
+
+        for index, path in enumerate(shard_paths(output_file)):
+            lines = 0
+            for key in _read_keys(path):
+                self.seen.add(key)
+                lines += 1
+            self._shard, self._shard_lines = index, lines
+
+    def unique(self, tasks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Tasks whose key is not in the shards yet (or earlier in this stream)."""
+        for task in tasks:
+            if task["task_key"] in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(task["task_key"])
+            yield task
+
+    def write(self, task: Dict[str, Any]):
+        if self._shard_lines >= self.shard_size:
+            self.close()
+            self._shard, self._shard_lines = self._shard + 1, 0
+        if self._file is None:
+            path = shard_path(self.output_file, self._shard)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+        self._file.write(json.dumps(task) + "\n")
+        self._shard_lines += 1
+        self.written += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def span_token_indices(token_starts: List[int], token_ends: List[int], start: int, end: int) -> Tuple[Optional[int], Optional[int]]:
+    """
+    (token_start, token_end) of a character span, token_end exclusive.
+    None where the span starts/ends outside a token (e.g. in whitespace).
+    """
+    token_start = bisect_right(token_starts, start) - 1
+    if token_start < 0 or start >= token_ends[token_start]:
+        token_start = None
+    token_end = bisect_left(token_ends, end)
+    if token_end >= len(token_ends) or token_starts[token_end] >= end:
+        token_end = None
+    else:
+        token_end += 1  # exclusive
+    return token_start, token_end
+
+
+def apply_tokens(task: Dict[str, Any], doc) -> Dict[str, Any]:
+    """Store the doc's tokens (anything with .text and .idx) in the task and update its spans with token indices."""
+    tokens = [
+        {"id": i, "text": token.text, "start": token.idx, "end": token.idx + len(token.text)}
+        for i, token in enumerate(doc)
+    ]
+    task["tokens"] = tokens
+    token_starts = [token["start"] for token in tokens]
+    token_ends = [token["end"] for token in tokens]
+    for span in task.get("spans", []):
+        span["token_start"], span["token_end"] = span_token_indices(token_starts, token_ends, span["start"], span["end"])
+    return task
+
+
+def tokenize_tasks(stream: Iterable[Dict[str, Any]], pipe: Callable[[Iterable[str]], Iterable[Any]],
+                   batch_size: int) -> Iterator[Dict[str, Any]]:
+    """
+    apply_tokens for a stream of tasks, tokenizing batch_size texts per pipe call (e.g. nlp.pipe).
+    Tasks that already have tokens (pre-tokenized files) are passed through as they are.
+    """
+    for batch in batched(stream, batch_size):
+        pending = [task for task in batch if "tokens" not in task]
+        for task, doc in zip(pending, pipe(task["text"] for task in pending)):
+            apply_tokens(task, doc)
+        yield from batch
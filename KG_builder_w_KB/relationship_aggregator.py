@@ -0,0 +1,232 @@
+'''
+Cross-article relationship aggregation
+The same fact ("Frey VETOED rent control ordinance") is extracted once per mention,
+from many blocks and articles. RelationshipAggregator merges the extracted
+relationships by (subject_kb_id, relationship, object_kb_id) into one fact each:
+    -> mention_count / article_count: how often and in how many articles it was found
+    -> supporting_evidence: up to MAX_EVIDENCE distinct evidence sentences with their
+       article id, headline and date, best first (sentences naming both entities,
+       then higher confidence, then newer articles)
+    -> the other fields (evidence, article_id, subject_text, ...) are taken from the
+       best evidence, so a fact can be used anywhere a relationship can
+    -> article_support: mentions and content hash per supporting article
+Facts, not mentions, are then sent to Prodigy and written to the graph.
+Memory grows with the number of distinct facts, the input is streamed.
+
+A run only sees its own articles, so the graph writers merge a fact into what its
+edge already holds (merge_support): mentions add up over articles, which are keyed by
+id so writing the same support twice counts it once; evidence is the union, re-ranked
+and capped again.
+When an article changes, retract_support drops that article's mentions and evidence
+from each relationship it supported; a relationship is gone once no article supports it.
+support_properties / support_from_properties flatten support into edge properties.
+
+Run on a run's relationships table (see columnar.write_relationships):
+    python relationship_aggregator.py runs/latest/relationships.cols --output relationships.jsonl
+'''
+
+import argparse
+from typing import Dict, Any, List, Iterable, Iterator, Tuple
+
+from prodigy_tasks import task_text
+
+MAX_EVIDENCE = 5
+EVIDENCE_FIELDS = ("evidence", "article_id", "headline", "date", "content_hash")
+# edge property holding each evidence field as a list, best evidence first
+EVIDENCE_LISTS = {
+    "evidence": "evidence_sentences",
+    "article_id": "evidence_article_ids",
+    "headline": "evidence_headlines",
+    "date": "evidence_dates",
+    "content_hash": "evidence_content_hashes",
+}
+
+
+def fact_key(rel: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (rel.get("subject_kb_id"), rel.get("relationship"), rel.get("object_kb_id"))
+
+
+def evidence_rank(rel: Dict[str, Any], text: str) -> Tuple[bool, float, str]:
+    """Higher is better: the sentence names both entities, the extraction's confidence, the article date."""
+    lowered = text.lower()
+    names_both = all((rel.get(field) or "").lower() in lowered for field in ("subject_text", "object_text"))
+    return (names_both, rel.get("confidence") or 0.0, rel.get("date") or "")
+
+
+class RelationshipAggregator:
+    def __init__(self, max_evidence: int = MAX_EVIDENCE):
+        self.max_evidence = max_evidence
+        self.mentions = 0
+        self._facts: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    def add(self, rel: Dict[str, Any]):
+        self.mentions += 1
+        fact = self._facts.setdefault(fact_key(rel), {"mention_count": 0, "articles": {}, "evidence": []})
+        fact["mention_count"] += 1
+        article = fact["articles"].setdefault(rel.get("article_id") or "", {"content_hash": rel.get("content_hash") or "", "mentions": 0})
+        article["mentions"] += 1
+
+        text = task_text(rel)
+        evidence = fact["evidence"]
+        if not text or any(item["evidence"] == text for _, item in evidence):
+            return
+        # block_text is only a fallback for the evidence, don't hold on to it
+        item = {key: value for key, value in rel.items() if key != "block_text"}
+        item["evidence"] = text
+        evidence.append((evidence_rank(rel, text), item))
+        evidence.sort(key=lambda ranked: ranked[0], reverse=True)  # stable, ties keep the earlier mention
+        del evidence[self.max_evidence:]
+
+    def add_all(self, relationships: Iterable[Dict[str, Any]]) -> "RelationshipAggregator":
+        for rel in relationships:
+            self.add(rel)
+        return self
+
+    def facts(self) -> Iterator[Dict[str, Any]]:
+        """Aggregated relationships, most mentioned first."""
+        for fact in sorted(self._facts.values(), key=lambda fact: fact["mention_count"], reverse=True):
+            if not fact["evidence"]:
+                continue  # no text to show or store
+            best = fact["evidence"][0][1]
+            yield {
+                **best,
+                "mention_count": fact["mention_count"],
+                "article_count": len(fact["articles"]),
+                "supporting_evidence": [
+                    {field: item.get(field) for field in EVIDENCE_FIELDS} for _, item in fact["evidence"]
+                ],
+                "article_support": [
+                    {"article_id": article_id, **article} for article_id, article in fact["articles"].items()
+                ],
+            }
+
+
+def support_of(rel: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Support of a relationship row or an aggregated fact:
+        {"articles": {article_id: {"content_hash", "mentions"}}, "evidence": [evidence items, best first]}
+    A plain relationship is its mentions in its own article, with its own evidence.
+    """
+    if rel.get("article_support"):
+        articles = {
+            item.get("article_id") or "": {"content_hash": item.get("content_hash") or "", "mentions": item.get("mentions") or 1}
+            for item in rel["article_support"]
+        }
+    else:
+        # a single mention, or a fact aggregated before article_support: its evidence's articles
+        evidence = rel.get("supporting_evidence") or [rel]
+        articles = {
+            item.get("article_id") or "": {"content_hash": item.get("content_hash") or "", "mentions": 1} for item in evidence
+        }
+        articles.setdefault(rel.get("article_id") or "", {"content_hash": rel.get("content_hash") or "", "mentions": 1})
+        articles[rel.get("article_id") or ""]["mentions"] += max((rel.get("mention_count") or 1) - len(articles), 0)
+    evidence = rel.get("supporting_evidence")
+    if evidence is None:
+        evidence = [{**rel, "evidence": task_text(rel)}]
+    return {
+        "articles": articles,
+        "evidence": [{field: item.get(field) or "" for field in EVIDENCE_FIELDS} for item in evidence if item.get("evidence")],
+    }
+
+
+def merge_support(old: Dict[str, Any], new: Dict[str, Any], subject_text: str = "", object_text: str = "",
+                  max_evidence: int = MAX_EVIDENCE) -> Dict[str, Any]:
+    """
+    Support of an edge after new support is written to it. Articles are keyed by id:
+    a new version of an article replaces the old entry and its evidence, the same version
+    keeps the larger mention count (writing the same support twice counts it once).
+    Evidence is the union, re-ranked (evidence_rank, with the edge's entity names) and capped.
+    """
+    articles = dict(old["articles"])
+    for article_id, article in new["articles"].items():
+        known = articles.get(article_id)
+        if known is not None and known["content_hash"] == article["content_hash"]:
+            article = {**article, "mentions": max(known["mentions"], article["mentions"])}
+        articles[article_id] = article
+    evidence = {}
+    for item in old["evidence"] + new["evidence"]:
+        article = articles.get(item["article_id"])
+        if article is not None and item["content_hash"] != article["content_hash"]:
+            continue
+        evidence[item["evidence"]] = item
+    names = {"subject_text": subject_text, "object_text": object_text}
+    ranked = sorted(evidence.values(), key=lambda item: evidence_rank({**item, **names}, item["evidence"]), reverse=True)
+    return {"articles": articles, "evidence": ranked[:max_evidence]}
+
+
+def retract_support(support: Dict[str, Any], retractions: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Support without the articles retracted since (retractions maps article_id -> current
+    content hash, see incremental.load_retractions) and without their evidence.
+    Support with no articles left means the relationship is gone.
+    """
+    def current(article_id, content_hash):
+        return article_id not in retractions or content_hash == retractions[article_id]
+
+    return {
+        "articles": {article_id: article for article_id, article in support["articles"].items()
+                     if current(article_id, article["content_hash"])},
+        "evidence": [item for item in support["evidence"] if current(item["article_id"], item["content_hash"])],
+    }
+
+
+def support_properties(support: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Edge properties of a support: the best evidence's fields, mention and article counts,
+    and parallel lists for the evidence and the supporting articles (Neo4j has no list of maps).
+    """
+    best = support["evidence"][0] if support["evidence"] else {}
+    articles = support["articles"]
+    properties = {field: best.get(field, "") for field in EVIDENCE_FIELDS}
+    properties.update({
+        "mention_count": sum(article["mentions"] for article in articles.values()),
+        "article_count": len(articles),
+        "support_article_ids": list(articles),
+        "support_content_hashes": [article["content_hash"] for article in articles.values()],
+        "support_mentions": [article["mentions"] for article in articles.values()],
+    })
+    for field, name in EVIDENCE_LISTS.items():
+        properties[name] = [item[field] for item in support["evidence"]]
+    return properties
+
+
+def support_from_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of support_properties, for an edge read back from the graph."""
+    if not properties.get("support_article_ids"):
+        return support_of(properties)  # written before support was tracked
+    articles = {
+        article_id: {"content_hash": content_hash, "mentions": mentions}
+        for article_id, content_hash, mentions in zip(
+            properties["support_article_ids"], properties["support_content_hashes"], properties["support_mentions"])
+    }
+    columns = [properties.get(name) or [] for name in EVIDENCE_LISTS.values()]
+    evidence = [dict(zip(EVIDENCE_LISTS, values)) for values in zip(*columns)]
+    return {"articles": articles, "evidence": evidence}
+
+
+def aggregate_relationships(relationships: Iterable[Dict[str, Any]], max_evidence: int = MAX_EVIDENCE) -> List[Dict[str, Any]]:
+    """Merge relationships into one per (subject_kb_id, relationship, object_kb_id)."""
+    aggregator = RelationshipAggregator(max_evidence).add_all(relationships)
+    facts = list(aggregator.facts())
+    print(f"[INFO] Aggregated {aggregator.mentions} extracted relationships into {len(facts)} facts")
+    return facts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge extracted relationships into facts and write Prodigy tasks.")
+    parser.add_argument("table", help="relationships table written by KGextraction.py (relationships.cols)")
+    parser.add_argument("--output", default="relationships.jsonl")
+    parser.add_argument("--max-evidence", type=int, default=MAX_EVIDENCE)
+    args = parser.parse_args(argv)
+
+    from columnar import read_relationships
+    from relationship_validator import save_relationships_for_prodigy
+    facts = aggregate_relationships(read_relationships(args.table), args.max_evidence)
+    save_relationships_for_prodigy(facts, output_file=args.output)
+
+
+if __name__ == "__main__":
+    main()
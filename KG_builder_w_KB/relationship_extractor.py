@@ -43,10 +43,12 @@ RELATIONSHIP_TYPES = {
 def extract_relationships_for_block(block_text, block_entities, headline, date, model_name):
     """
     Extract relationships from each block of text using OpenAI's API via LangChain.
+    Returns None if the LLM call fails or its answer is not a JSON list, so the
+    caller can tell a failed extraction from a block without relationships ([]).
     """
-    relationships = []
 
     # Filter the entities to exclude the 'embedding' field and keep all other fields
+    # (entities are dict records or mention_records.Mention, both provide .items())
     filtered_entities = [
         {key: value for key, value in entity.items() if key != 'embedding'}
         for entity in block_entities
@@ -102,13 +104,17 @@ def extract_relationships_for_block(block_text, block_entities, headline, date,
             # Remove the first line (e.g., "```json") and the last line ("```")
             content = "\n".join(content.splitlines()[1:-1]).strip()
 
-        rel = json.loads(content)  # Convert JSON string to Python list
-        relationships.extend(rel)
+        relationships = json.loads(content)  # Convert JSON string to Python list
+        if not isinstance(relationships, list):
+            print("[ERROR] LLM returned JSON that is not a list:", content)
+            return None
 
     except json.JSONDecodeError:
         print("[ERROR] LLM returned invalid JSON:", content)
+        return None
     except Exception as e:
         print(f"[ERROR] OpenAI API Error: {e}")
+        return None
 
     print(f"[INFO] Extracted {len(relationships)} relationships.")
     return relationships
@@ -204,8 +210,13 @@ def overlap_coefficient(text_a: str, text_b: str) -> float:
     
 def extract_relationships_block_by_block(
     consolidated_data: List[Dict[str, Any]],
-    model_name
+    model_name,
+    cache=None
 ) -> List[Dict[str, Any]]:
+    """
+    Extract relationships for every block of the consolidated entity records.
+    If a BlockCache is given, raw LLM relationships of blocks seen before are reused.
+    """
     from collections import defaultdict
 
     # Group the consolidated data by block_text
@@ -229,14 +240,19 @@ def extract_relationships_block_by_block(
         article_id = entity_records[0]["article_id"]
         headline = entity_records[0]["headline"]
         date_str = entity_records[0]["date"]
-        # 1) Let the LLM detect relationships from the entire block
-        block_relationships = extract_relationships_for_block(
-            block_text=block_text,
-            block_entities=entity_records,
-            headline=headline,
-            date=date_str,
-            model_name=model_name
-        )
+        # 1) Let the LLM detect relationships from the entire block (or reuse a duplicate block's)
+        block_relationships = cache.get_relationships(block_text, model_name) if cache is not None else None
+        if block_relationships is None:
+            block_relationships = extract_relationships_for_block(
+                block_text=block_text,
+                block_entities=entity_records,
+                headline=headline,
+                date=date_str,
+                model_name=model_name
+            )
+            # an empty list is a valid answer, only failed calls are left to retry
+            if cache is not None and block_relationships is not None:
+                cache.put_relationships(block_text, model_name, block_relationships)
 
         if not block_relationships:
             continue
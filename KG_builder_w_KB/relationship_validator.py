@@ -3,20 +3,28 @@ Takes extracted relationships from the relationship_extractor.py file
 and validates them using prodigy's interface.
 1) Sets up prodigy to work with our relationships data
     -> Creates a custom recipe for validating relationships
-    -> Adds tokens and token indices to each task
+    -> Adds tokens and token indices to each task (tokenizer only, batched with nlp.pipe,
+       span offsets mapped to tokens with bisect, see prodigy_tasks.tokenize_tasks),
+       unless the task is already tokenized
 2) Creates a Prodigy JSONL to verify these relationships
     -> Each record has text = the 'evidence' (or block_text) plus meta fields for subject/object
+    -> Streamed into sharded JSONL files, one task per (subject, relationship, object, text),
+       with stable _input_hash/_task_hash values (see prodigy_tasks.py)
+    -> Tasks can be tokenized while the file is written, so the recipe's stream has no work to do
 
 '''
 
 import prodigy
-from typing import Dict, Any, List, Optional, Set
-import json
+from typing import Dict, Any, List, Optional, Set, Iterable, Iterator
 from prodigy.components.loaders import JSONL
 from config import RELATIONSHIP_TYPES
+from prodigy_tasks import SHARD_SIZE, ShardedTaskWriter, iter_task_files, relationship_task, apply_tokens, tokenize_tasks
 import spacy
 
-nlp = spacy.load("en_core_web_sm")
+# Only tokens are needed: a blank English pipeline has the same tokenizer as
+# en_core_web_sm without running tagger, parser and NER on every task
+nlp = spacy.blank("en")
+TOKENIZE_BATCH_SIZE = 256
 
 
 ''' 
@@ -30,27 +38,13 @@ def add_tokens(task):
     """
     Use spaCy to compute tokens for the task text and update spans with token indices.
     """
-    doc = nlp(task["text"])
-    # Create a list of tokens with an id and their character offsets.
-    tokens = [
-        {"id": i, "text": token.text, "start": token.idx, "end": token.idx + len(token.text)}
-        for i, token in enumerate(doc)
-    ]
-    task["tokens"] = tokens
-
-    # Update each span with token_start and token_end computed from tokens.
-    for span in task.get("spans", []):
-        token_start = None
-        token_end = None
-        # Find the token index where the span starts.
-        for i, token in enumerate(tokens):
-            if token["start"] <= span["start"] < token["end"]:
-                token_start = i
-            if token["start"] < span["end"] <= token["end"]:
-                token_end = i + 1  # token_end is exclusive
-        span["token_start"] = token_start
-        span["token_end"] = token_end
-    return task
+    return apply_tokens(task, nlp(task["text"]))
+
+
+def add_tokens_to_stream(stream: Iterable[Dict[str, Any]], batch_size: int = TOKENIZE_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """add_tokens for a stream of tasks, batched with nlp.pipe (see prodigy_tasks.tokenize_tasks)."""
+    return tokenize_tasks(stream, nlp.pipe, batch_size)
+
 
 @prodigy.recipe("relationship-recipe")
 def my_rel_manual(dataset, source, label: str = ""):
@@ -60,7 +54,8 @@ def my_rel_manual(dataset, source, label: str = ""):
     Run it with:
         prodigy -F relationship_validator.py relationship-recipe my_test_dataset relationships.jsonl
     """
-    stream = JSONL(source)
+    # a single JSONL file, or the shards save_relationships_for_prodigy wrote for it
+    stream = (task for path in iter_task_files(source) for task in JSONL(path))
     
     # if no label string is provided, use the keys of RELATIONSHIP_TYPES
     if not label:
@@ -74,8 +69,8 @@ def my_rel_manual(dataset, source, label: str = ""):
         "labels": labels
     }
 
-    # add tokens and token indices to each task.
-    transformed_stream = (add_tokens(task) for task in stream)
+    # add tokens and token indices to each task (in batches, skipping pre-tokenized tasks).
+    transformed_stream = add_tokens_to_stream(stream)
 
     return {
         "dataset": dataset,
@@ -92,54 +87,24 @@ def my_rel_manual(dataset, source, label: str = ""):
 ------------------------------------------------------------
 '''
 
-def save_relationships_for_prodigy(relationships: List[Dict[str, Any]], output_file="relationships.jsonl"):
+def save_relationships_for_prodigy(relationships: Iterable[Dict[str, Any]], output_file="relationships.jsonl",
+                                   pretokenize: bool = True, shard_size: int = SHARD_SIZE):
     """
     Create a Prodigy JSONL to verify these relationships. 
     Each record has text = the 'evidence' (or block_text) plus meta fields for subject/object.
+    Tasks are streamed into shards of output_file (prodigy_tasks.ShardedTaskWriter), skipping
+    relationships already in them. With pretokenize, tokens and span token indices are
+    written too, so the recipe serves the tasks without tokenizing them.
     """
-    data = []
-    for rel in relationships:
-        # We'll pick the 'evidence' if not empty, else the block_text
-        text = rel["evidence"] if rel["evidence"] else rel["block_text"]
-        # Try to highlight subject/object if they appear in text:
-        spans = []
-        sub_idx = text.lower().find(rel["subject_text"].lower())
-        if sub_idx >= 0:
-            spans.append({
-                "start": sub_idx,
-                "end": sub_idx + len(rel["subject_text"]),
-                "label": "SUBJECT"
-            })
-        obj_idx = text.lower().find(rel["object_text"].lower())
-        if obj_idx >= 0:
-            spans.append({
-                "start": obj_idx,
-                "end": obj_idx + len(rel["object_text"]),
-                "label": "OBJECT"
-            })
-        
-        record = {
-            "text": text,
-            "spans": spans,
-            "meta": {
-                "article_id": rel["article_id"],
-                "headline": rel["headline"],
-                "date": rel["date"],
-                "subject_kb_id": rel["subject_kb_id"],
-                "object_kb_id": rel["object_kb_id"],
-                "relationship": rel["relationship"],
-                "subject_type": rel["subject_type"],
-                "object_type": rel["object_type"]
-            }
-        }
-        data.append(record)
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        for d in data:
-            f.write(json.dumps(d) + "\n")
-
-    print(f"Saved {len(data)} relationships to {output_file}.")
+    with ShardedTaskWriter(output_file, shard_size) as writer:
+        tasks = writer.unique(relationship_task(rel) for rel in relationships)
+        if pretokenize:
+            tasks = add_tokens_to_stream(tasks)
+        for task in tasks:
+            writer.write(task)
+
+    print(f"Saved {writer.written} relationships to {output_file} shards ({writer.duplicates} duplicates skipped).")
     print("You can verify them in Prodigy, e.g.:\n")
     print(f"prodigy -F relationship_validator.py relationship-recipe validated_relationships {output_file}")
     print("You can access the validated relationships in the database:\n")
-    print("prodigy db-out validated_relationships > validated_relationships.jsonl")
\ No newline at end of file
+    print("prodigy db-out validated_relationships > validated_relationships.jsonl")
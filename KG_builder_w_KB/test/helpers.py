@@ -0,0 +1,37 @@
+'''
+Annotations and KB shared by the tests of the graph and KB modules
+'''
+
+import json
+
+TEXT = "Mayor Jacob Frey vetoed the rent control ordinance."
+
+KB = {
+    "kb-frey": {"canonical_name": "jacob frey", "aliases": ["jacob frey", "mayor frey", "frey"], "embeddings": [[0.1, 0.2]]},
+    "kb-council": {"canonical_name": "minneapolis city council", "aliases": ["city council"], "embeddings": [[0.3, 0.4]]},
+    "kb-mpls": {"canonical_name": "minneapolis", "aliases": [], "embeddings": []},
+    "kb-rent": {"canonical_name": "rent control ordinance", "aliases": [], "embeddings": []},
+}
+
+
+def annotation(relationship, article_id="1", content_hash="v1", answer="accept"):
+    """A Prodigy relationship annotation of TEXT: Jacob Frey (kb-frey) -> rent control ordinance (kb-rent)."""
+    return {
+        "text": TEXT,
+        "spans": [{"start": 6, "end": 16, "label": "SUBJECT"}, {"start": 28, "end": 50, "label": "OBJECT"}],
+        "meta": {"article_id": article_id, "headline": "h", "date": "2023-10-17", "subject_kb_id": "kb-frey",
+                 "object_kb_id": "kb-rent", "relationship": relationship, "subject_type": "PERSON",
+                 "object_type": "LAW", "content_hash": content_hash},
+        "answer": answer,
+    }
+
+
+def append(path, annotations):
+    with open(path, "a", encoding="utf-8") as f:
+        for line in annotations:
+            f.write(json.dumps(line) + "\n")
+
+
+def write_kb(path, kb=KB):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(kb, f)
@@ -0,0 +1,41 @@
+import json
+import os
+import pytest
+from archive_index import ArchiveIndex, build_archive_index
+from archive_reader import parse_archive
+from checkpoint import article_content_hash
+
+ARTICLES = [
+    {"_id": str(600000000 + i), "headline": f"Headline {i} – café",
+     "jsonBody": [{"content": f"Block {i} of the Minneapolis story."}]}
+    for i in range(25)
+]
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "archive.json"
+    path.write_text(json.dumps(ARTICLES, indent=4, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+def test_random_access_matches_full_parse(archive_path):
+    """Test that articles read through the index match a full parse of the archive."""
+    parsed = parse_archive(archive_path)
+    with ArchiveIndex(archive_path) as index:
+        assert len(index) == 25
+        assert index.article(21) == parsed[21]
+        assert list(index.iter_range(21, 22)) == parsed[21:22]
+        assert list(index.iter_range(20)) == parsed[20:]
+        assert index.article_by_id("600000003") == parsed[3]
+        assert index.content_hash(7) == article_content_hash(parsed[7])
+        with pytest.raises(KeyError):
+            index.article_by_id("missing")
+
+def test_index_is_rebuilt_when_archive_changes(archive_path):
+    build_archive_index(archive_path)
+    with open(archive_path, "w", encoding="utf-8") as f:
+        json.dump(ARTICLES[:3], f)
+    os.utime(archive_path, ns=(1, 1))
+
+    with ArchiveIndex(archive_path) as index:
+        assert len(index) == 3
+        assert index.article(2)["id"] == "600000002"
@@ -0,0 +1,44 @@
+import json
+import pytest
+from archive_reader import iter_raw_articles, iter_archive, parse_archive
+
+ARTICLES = [
+    {"_id": "1", "headline": "Frey vetoes rent control", "displayDate": {"$date": "2023-10-17"},
+     "jsonBody": [{"content": "Mayor Jacob Frey vetoed the ordinance."}, {"content": ""}]},
+    {"_id": "2", "headline": "Café owners “welcome” the plan", "displayDate": None,
+     "jsonBody": [{"content": 'Ünïcode text, "quotes" and [brackets] {braces}.'}]},
+    {"_id": "3", "headline": "Empty article", "jsonBody": []},
+]
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "archive.json"
+    path.write_text(json.dumps(ARTICLES, indent=4, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_iter_raw_articles_matches_json_load(archive_path, chunk_size):
+    """Test that streaming decodes the same articles with exact byte ranges, whatever the chunk size."""
+    with open(archive_path, "rb") as f:
+        raw = f.read()
+    results = list(iter_raw_articles(archive_path, chunk_size=chunk_size))
+
+    assert [article for _, _, article in results] == ARTICLES
+    for offset, length, article in results:
+        assert json.loads(raw[offset:offset + length]) == article
+
+def test_iter_archive_parses_articles(archive_path):
+    first = next(iter_archive(archive_path))
+    assert first == {"id": "1", "date": "2023-10-17", "headline": "Frey vetoes rent control",
+                     "contentBlocks": ["Mayor Jacob Frey vetoed the ordinance."]}
+    assert [a["id"] for a in parse_archive(archive_path)] == ["1", "2", "3"]
+
+def test_empty_and_invalid_archives(tmp_path):
+    empty = tmp_path / "empty.json"
+    empty.write_text(" [ ] ", encoding="utf-8")
+    assert list(iter_archive(str(empty))) == []
+
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text(json.dumps(ARTICLES)[:-20], encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_archive(str(truncated)))
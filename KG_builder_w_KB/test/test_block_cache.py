@@ -0,0 +1,40 @@
+import pytest
+from block_cache import BlockCache
+
+RECORD = {
+    "article_id": "600312948",
+    "headline": "Minneapolis City Council delays vote",
+    "date": "2023-10-17",
+    "entity_type": "PERSON",
+    "entity_text": "Jacob Frey",
+    "evidence": "Mayor Jacob Frey proposed a new site.",
+    "embedding": [0.1, 0.2],
+    "block_text": "Mayor Jacob Frey proposed a new site.",
+}
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "block_cache.jsonl")
+
+def test_analysis_is_cached_without_article_metadata(cache_path):
+    cache = BlockCache(cache_path)
+    assert cache.get_analysis("<p>Mayor Jacob Frey proposed a new site.</p>", "ner-1") is None
+    cache.put_analysis("<p>Mayor Jacob Frey proposed a new site.</p>", "ner-1", RECORD["block_text"], [RECORD])
+
+    entry = BlockCache(cache_path).get_analysis("<p>Mayor Jacob Frey proposed a new site.</p>", "ner-1")
+    assert entry["text"] == RECORD["block_text"]
+    assert entry["mentions"] == [{"entity_type": "PERSON", "entity_text": "Jacob Frey",
+                                  "evidence": RECORD["evidence"], "embedding": [0.1, 0.2]}]
+    # a different NER model does not reuse the analysis
+    assert BlockCache(cache_path).get_analysis("<p>Mayor Jacob Frey proposed a new site.</p>", "ner-2") is None
+
+def test_relationships_are_shared_between_workers(cache_path):
+    """Test that a second cache instance sees entries appended after it was opened."""
+    reader = BlockCache(cache_path)
+    writer = BlockCache(cache_path)
+    writer.put_relationships(RECORD["block_text"], "o3-mini", [{"relationship": "PROPOSED"}])
+
+    assert not reader.has_relationships(RECORD["block_text"], "o3-mini")
+    reader.refresh()
+    assert reader.get_relationships(RECORD["block_text"], "o3-mini") == [{"relationship": "PROPOSED"}]
+    assert reader.get_relationships(RECORD["block_text"], "gpt-4o") is None
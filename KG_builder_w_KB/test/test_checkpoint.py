@@ -0,0 +1,61 @@
+import json
+import os
+import pytest
+from checkpoint import RunCheckpoint, article_content_hash
+
+ARTICLES = [
+    {"id": "1", "headline": "Council votes on budget", "date": None, "contentBlocks": ["Block one."]},
+    {"id": "2", "headline": "Frey vetoes ordinance", "date": None, "contentBlocks": ["Block two."]},
+    {"id": "3", "headline": "Park board meets", "date": None, "contentBlocks": ["Block three."]},
+]
+
+@pytest.fixture
+def run_dir(tmp_path):
+    return str(tmp_path / "run")
+
+def test_content_hash_changes_with_content():
+    edited = dict(ARTICLES[0], contentBlocks=["Block one, corrected."])
+    assert article_content_hash(ARTICLES[0]) == article_content_hash(dict(ARTICLES[0]))
+    assert article_content_hash(ARTICLES[0]) != article_content_hash(edited)
+
+def test_resume_skips_completed_articles(run_dir):
+    """Test that a resumed run only yields articles that never completed."""
+    checkpoint = RunCheckpoint(run_dir)
+    pending = checkpoint.pending(ARTICLES)
+    checkpoint.record(next(pending), [{"article_id": "1", "relationship": "VETOED"}])
+    next(pending)  # article 2 started, then the run "crashes"
+
+    resumed = RunCheckpoint(run_dir, resume=True)
+    assert set(resumed.in_flight) == {"2"}
+    assert [a["id"] for a in resumed.pending(ARTICLES)] == ["2", "3"]
+    assert list(resumed.relationships()) == [{"article_id": "1", "relationship": "VETOED"}]
+
+def test_resume_reprocesses_changed_articles(run_dir):
+    checkpoint = RunCheckpoint(run_dir)
+    checkpoint.record(ARTICLES[0], [])
+    edited = dict(ARTICLES[0], headline="Council votes on revised budget")
+
+    resumed = RunCheckpoint(run_dir, resume=True)
+    assert [a["id"] for a in resumed.pending([edited])] == ["1"]
+
+def test_resume_truncates_partial_writes(run_dir):
+    """Test that bytes written after the last completed article are discarded."""
+    checkpoint = RunCheckpoint(run_dir)
+    checkpoint.record(ARTICLES[0], [{"article_id": "1"}])
+    with open(checkpoint.output_path, "a", encoding="utf-8") as f:
+        f.write('{"article_id": "2", "trunc')
+    with open(checkpoint.manifest_path, "a", encoding="utf-8") as f:
+        f.write('{"event": "done", "article_id"')
+
+    resumed = RunCheckpoint(run_dir, resume=True)
+    resumed.record(ARTICLES[1], [{"article_id": "2"}])
+
+    assert list(resumed.relationships()) == [{"article_id": "1"}, {"article_id": "2"}]
+    with open(resumed.manifest_path, encoding="utf-8") as f:
+        assert [json.loads(line)["article_id"] for line in f] == ["1", "2"]
+
+def test_fresh_run_clears_previous_outputs(run_dir):
+    RunCheckpoint(run_dir).record(ARTICLES[0], [{"article_id": "1"}])
+    fresh = RunCheckpoint(run_dir)
+    assert list(fresh.relationships()) == []
+    assert not os.path.exists(fresh.output_path)
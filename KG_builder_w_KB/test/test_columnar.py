@@ -0,0 +1,93 @@
+import pytest
+import numpy as np
+from columnar import (ColumnTable, MentionSpool, encode_strings, iter_mention_parts, read_mentions,
+                      read_relationships, write_mentions, write_relationships, write_table)
+from mention_records import MentionStore
+
+BLOCK = "Mayor Jacob Frey vetoed the rent control ordinance. The council may override it."
+
+
+def make_mentions(article_id="600312948"):
+    store = MentionStore(dim=4)
+    article_ref = store.add_article(article_id, "Frey vetoes rent control", "2023-10-17", "v1")
+    block_ref = store.add_block(BLOCK)
+    first = "Mayor Jacob Frey vetoed the rent control ordinance."
+    mentions = [
+        store.add_mention(article_ref, block_ref, "PERSON", "Jacob Frey", first, [1, 0, 0, 0]),
+        store.add_mention(article_ref, block_ref, "LAW", "rent control ordinance", first, [1, 0, 0, 0]),
+        store.add_mention(article_ref, block_ref, "ORG", "council", "The council may override it.", [0, 1, 0, 0]),
+    ]
+    mentions[0]["kb_id"], mentions[0]["canonical_name"] = "kb-frey", "jacob frey"
+    return mentions
+
+
+def test_strings_are_dictionary_encoded():
+    codes, blob, offsets, vocab = encode_strings(["a", "bé", None, "a"])
+    assert codes.tolist() == [0, 1, -1, 0]
+    assert vocab == ["a", "bé"]
+    assert blob.tobytes() == "abé".encode("utf-8")
+    assert offsets.tolist() == [0, 1, 4]
+
+
+def test_table_round_trip_is_memory_mapped(tmp_path):
+    path = write_table(str(tmp_path / "t.cols"), {"name": ["x", "y", None], "start": np.array([0, 5, 9], dtype=np.int32)})
+    table = ColumnTable(path)
+    assert len(table) == 3
+    assert isinstance(table["start"], np.memmap)
+    assert list(table.iter_rows()) == [{"name": "x", "start": 0}, {"name": "y", "start": 5}, {"name": None, "start": 9}]
+
+
+def test_mentions_round_trip(tmp_path):
+    mentions = make_mentions()
+    write_mentions(str(tmp_path / "m.cols"), mentions)
+    loaded = read_mentions(str(tmp_path / "m.cols"))
+
+    assert [m.to_dict() for m in loaded] == [m.to_dict() for m in mentions]
+    # one embedding row per distinct evidence sentence, loaded without copying
+    store = loaded[0].store
+    assert store.embeddings.shape == (2, 4)
+    assert isinstance(store._embeddings, np.memmap)
+    assert loaded[0]["kb_id"] == "kb-frey" and "kb_id" not in loaded[1]
+    assert loaded[0]["content_hash"] == "v1"
+
+
+def test_mentions_need_evidence(tmp_path):
+    mentions = [m.to_dict() for m in make_mentions()]
+    mentions[1]["evidence"] = None
+    with pytest.raises(ValueError, match="no evidence"):
+        write_mentions(str(tmp_path / "m.cols"), mentions)
+
+
+def test_spool_writes_parts(tmp_path):
+    spool = MentionSpool(str(tmp_path / "mentions"), flush_every=1)
+    spool.add(make_mentions())
+    spool.add(make_mentions("600312949")[:1])
+    spool.flush()
+    parts = list(iter_mention_parts(str(tmp_path / "mentions")))
+    assert [len(part) for part in parts] == [3, 1]
+
+
+def test_spool_holds_buffered_articles_and_resume_keeps_the_last_part(tmp_path):
+    spool = MentionSpool(str(tmp_path / "mentions"), flush_every=2)
+    spool.add(make_mentions())
+    assert spool.holds("600312948")
+    spool.add(make_mentions("600312949"))
+    assert not spool.holds("600312948") and not spool.holds("600312949")
+
+    # a resumed run redoes 600312949, which was written but not recorded as done
+    spool = MentionSpool(str(tmp_path / "mentions"), resume=True)
+    spool.add(make_mentions("600312949")[:1])
+    spool.flush()
+    parts = list(iter_mention_parts(str(tmp_path / "mentions")))
+    assert [[m["article_id"] for m in part] for part in parts] == [["600312948"] * 3, ["600312949"]]
+
+
+def test_relationships_round_trip(tmp_path):
+    rel = {"article_id": "600312948", "headline": "h", "date": "2023-10-17", "block_text": BLOCK,
+           "evidence": "Mayor Jacob Frey vetoed the rent control ordinance.", "subject_text": "Jacob Frey",
+           "subject_kb_id": "kb-frey", "subject_type": "PERSON", "object_text": "rent control ordinance",
+           "object_kb_id": "kb-rent", "object_type": "LAW", "relationship": "VETOED", "content_hash": "abc"}
+    write_relationships(str(tmp_path / "r.cols"), [rel, dict(rel, relationship="OPPOSED")])
+    loaded = list(read_relationships(str(tmp_path / "r.cols")))
+    assert loaded[0] == rel
+    assert loaded[1]["relationship"] == "OPPOSED"
@@ -0,0 +1,66 @@
+import json
+import pytest
+from extraction_shards import ExtractionShardWriter, read_manifest
+from pipeline import shard_paths
+
+
+def articles(ids):
+    return [{"id": article_id} for article_id in ids]
+
+
+def extract(output, ids, records_per_article=2, shard_size=3, resume=False, fail_at=None):
+    """Write records_per_article records per article, like extract_entities_from_archive."""
+    with ExtractionShardWriter(output, shard_size, resume=resume) as writer:
+        for article in writer.pending(articles(ids)):
+            for i in range(records_per_article):
+                if article["id"] == fail_at and i == 1:
+                    raise RuntimeError("interrupted")
+                writer.write({"meta": {"article_id": article["id"], "block_index": i}})
+            writer.end_article(article["id"])
+    return writer.stats
+
+
+def written_ids(output):
+    ids = []
+    for path in shard_paths(output):
+        with open(path, encoding="utf-8") as f:
+            ids += [json.loads(line)["meta"]["article_id"] for line in f]
+    return ids
+
+
+def test_shards_hold_whole_articles(tmp_path):
+    output = str(tmp_path / "entities.jsonl")
+    assert extract(output, ["a", "b", "c"]) == {"records": 6, "articles": 3, "shards": 2}
+    assert [(entry["records"], entry["articles"], entry["last_article_id"]) for entry in read_manifest(output)] == [
+        (4, 2, "b"), (2, 1, "c")]
+    assert written_ids(output) == ["a", "a", "b", "b", "c", "c"]
+
+
+def test_resume_continues_after_the_last_complete_shard(tmp_path):
+    output = str(tmp_path / "entities.jsonl")
+    with pytest.raises(RuntimeError):
+        extract(output, ["a", "b", "c", "d"], fail_at="d")
+    # c was complete when d failed, its shard was closed; d's first record was dropped
+    assert [entry["last_article_id"] for entry in read_manifest(output)] == ["b", "c"]
+    assert written_ids(output) == ["a", "a", "b", "b", "c", "c"]
+
+    stats = extract(output, ["a", "b", "c", "d", "e"], resume=True)
+    assert (stats["articles"], stats["records"]) == (2, 4)
+    assert written_ids(output) == ["a", "a", "b", "b", "c", "c", "d", "d", "e", "e"]
+
+
+def test_resume_refuses_a_changed_archive(tmp_path):
+    output = str(tmp_path / "entities.jsonl")
+    extract(output, ["a", "b", "c"])
+    with pytest.raises(ValueError, match="archive changed"):
+        extract(output, ["a", "x", "b", "c"], resume=True)
+    with pytest.raises(ValueError, match="ends before"):
+        extract(output, ["a"], resume=True)
+
+
+def test_without_resume_earlier_shards_are_removed(tmp_path):
+    output = str(tmp_path / "entities.jsonl")
+    extract(output, ["a", "b", "c"])
+    extract(output, ["z"])
+    assert written_ids(output) == ["z", "z"]
+    assert [entry["last_article_id"] for entry in read_manifest(output)] == ["z"]
@@ -0,0 +1,45 @@
+import json
+import pytest
+from filter_data import filter_archive, is_relevant_local_article, scan_article
+
+def make_article(headline, *blocks):
+    return {"_id": headline, "headline": headline, "jsonBody": [{"content": block} for block in blocks]}
+
+POLITICS = make_article("Minneapolis mayor vetoes rent control", "The Minneapolis City Council will vote again.")
+CRIME = make_article("Minneapolis council member arrested", "Minneapolis police said charges are expected.")
+NOT_LOCAL = make_article("St. Paul mayor signs budget", "The city budget passed.")
+NO_POLITICS = make_article("Minneapolis park reopens", "Minneapolis families returned to the lake.")
+WORD_BOUNDARY = make_article("Minneapolis trials of new buses", "Minneapolis riders devoted to transit voted.")
+
+def test_relevance_rules():
+    assert is_relevant_local_article(POLITICS)
+    assert not is_relevant_local_article(CRIME)
+    assert not is_relevant_local_article(NOT_LOCAL)
+    assert not is_relevant_local_article(NO_POLITICS)
+    # "trials" is not the crime keyword "trial", but "devoted" contains "vote"
+    assert is_relevant_local_article(WORD_BOUNDARY)
+
+def test_scan_reports_overlapping_keywords():
+    _, found = scan_article(make_article("Minneapolis", "Minneapolis criminal charges filed"))
+    assert {"criminal charges", "charges", "minneapolis"} <= found
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_filter_archive_streams_same_output_as_json_dump(tmp_path, workers):
+    """Test that the streamed output matches json.dump of the kept articles."""
+    articles = [POLITICS, CRIME, NOT_LOCAL, NO_POLITICS, WORD_BOUNDARY] * 3
+    input_path, output_path = tmp_path / "archive.json", tmp_path / "filtered.json"
+    input_path.write_text(json.dumps(articles), encoding="utf-8")
+
+    hits = filter_archive(str(input_path), str(output_path), workers=workers, batch_size=4)
+
+    expected = json.dumps([POLITICS, WORD_BOUNDARY] * 3, ensure_ascii=False, indent=4)
+    assert output_path.read_text(encoding="utf-8") == expected
+    assert hits["(scanned)"] == 15
+    assert hits["(kept)"] == 6
+    assert hits["mayor"] == 6
+
+def test_filter_archive_with_no_matches(tmp_path):
+    input_path, output_path = tmp_path / "archive.json", tmp_path / "filtered.json"
+    input_path.write_text(json.dumps([CRIME]), encoding="utf-8")
+    filter_archive(str(input_path), str(output_path))
+    assert json.loads(output_path.read_text(encoding="utf-8")) == []
@@ -0,0 +1,50 @@
+import os
+import random
+from gazetteer import Automaton, Gazetteer, longest_non_overlapping
+from helpers import KB, write_kb
+
+
+def test_automaton_finds_all_occurrences():
+    patterns = {"he": 1, "she": 2, "his": 3, "hers": 4}
+    found = sorted(Automaton(patterns).iter_matches("ushers"))
+    assert found == [(1, 4, 2), (2, 4, 1), (2, 6, 4)]
+
+
+def test_automaton_matches_naive_search():
+    rng = random.Random(0)
+    patterns = {"".join(rng.choice("ab") for _ in range(rng.randint(1, 4))): None for _ in range(20)}
+    text = "".join(rng.choice("ab") for _ in range(200))
+    expected = sorted((i, i + len(p), None) for p in patterns for i in range(len(text)) if text.startswith(p, i))
+    assert sorted(Automaton(patterns).iter_matches(text)) == expected
+
+
+def test_longest_non_overlapping():
+    matches = [(0, 11, "a"), (0, 24, "b"), (12, 24, "c"), (25, 30, "d")]
+    assert longest_non_overlapping(matches) == [(0, 24, "b"), (25, 30, "d")]
+
+
+def test_annotate_links_longest_alias_on_word_boundaries(tmp_path):
+    path = str(tmp_path / "KB.json")
+    write_kb(path, KB)
+    text = "The Minneapolis City Council overrode Mayor Frey. Freya was not involved."
+    entities = Gazetteer(path).annotate(text)
+    assert [(e["text"], e["kb_ids"]) for e in entities] == [
+        ("Minneapolis City Council", ["kb-council"]),
+        ("Mayor Frey", ["kb-frey"]),
+    ]
+    assert text[entities[1]["start"]:entities[1]["end"]] == "Mayor Frey"
+
+
+def test_refresh_swaps_in_new_kb(tmp_path):
+    path = str(tmp_path / "KB.json")
+    write_kb(path, KB)
+    gazetteer = Gazetteer(path)
+    assert not gazetteer.refresh()
+    old = gazetteer.automaton
+
+    write_kb(path, {**KB, "kb-koski": {"canonical_name": "emily koski", "aliases": [], "embeddings": []}})
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert gazetteer.refresh()
+    assert gazetteer.automaton is not old
+    assert gazetteer.annotate("Emily Koski voted no.")[0]["kb_ids"] == ["kb-koski"]
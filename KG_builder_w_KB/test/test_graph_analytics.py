@@ -0,0 +1,74 @@
+import json
+import numpy as np
+import pytest
+from graph_analytics import RelationshipGraph
+
+# (subject, relationship, object, date, article)
+EDGES = [
+    ("frey", "VETOED", "budget", "2023-12-06", "1"),
+    ("council", "SUPPORTED", "budget", "2023-12-05", "1"),
+    ("koski", "OPPOSED", "frey", "2024-02-01", "2"),
+    ("koski", "SUPPORTED", "budget", "2024-02-01", "2"),
+    ("frey", "PROPOSED", "precinct", "2023-10-17", "3"),
+    ("frey", "PROPOSED", "precinct", "2023-10-18", "4"),
+]
+NAMES = {"frey": "Jacob Frey", "budget": "2024 Budget", "council": "City Council",
+         "koski": "Emily Koski", "precinct": "Third Precinct", "ward": "Ward 3"}
+
+
+@pytest.fixture
+def graph(tmp_path):
+    kb = {kb_id: {"canonical_name": name.lower(), "aliases": [name.lower()], "embeddings": []} for kb_id, name in NAMES.items()}
+    kb["frey"]["aliases"].append("mayor frey")
+    (tmp_path / "KB.json").write_text(json.dumps(kb))
+    with open(tmp_path / "validated.jsonl", "w") as f:
+        for subject, relationship, obj, date, article in EDGES:
+            text = f"{NAMES[subject]} {relationship.lower()} {NAMES[obj]}."
+            f.write(json.dumps({
+                "text": text,
+                "spans": [{"start": 0, "end": len(NAMES[subject]), "label": "SUBJECT"}],
+                "meta": {"article_id": article, "date": date + "T12:00:00Z", "subject_kb_id": subject, "object_kb_id": obj,
+                         "relationship": relationship, "subject_type": "PERSON", "object_type": "ORG"},
+                "answer": "accept",
+            }) + "\n")
+    return RelationshipGraph.from_jsonl(str(tmp_path / "validated.jsonl"), kb_path=str(tmp_path / "KB.json"),
+                                        retractions_path=str(tmp_path / "none.jsonl"))
+
+
+def test_csr_layout(graph):
+    assert len(graph) == 6 and graph.edge_count == 6
+    # span text for subjects, KB canonical names for the rest
+    assert graph.names[graph.node("frey")] == "Jacob Frey"
+    assert graph.names[graph.node("budget")] == "2024 budget"
+    frey = graph.node("mayor frey")
+    out = graph.out_indices[graph.out_indptr[frey]:graph.out_indptr[frey + 1]]
+    assert sorted(graph.ids[i] for i in out) == ["budget", "precinct", "precinct"]
+    assert graph.degree()[graph.node("ward")] == 0
+
+
+def test_k_hop(graph):
+    assert graph.k_hop("Jacob Frey", k=1) == {"frey": 0, "budget": 1, "precinct": 1, "koski": 1}
+    assert graph.k_hop("Jacob Frey", k=2)["council"] == 2
+    assert graph.k_hop("Jacob Frey", k=3, direction="out") == {"frey": 0, "budget": 1, "precinct": 1}
+
+
+def test_shortest_path(graph):
+    path = graph.shortest_path("Third Precinct", "City Council")
+    assert [(e["subject_id"], e["relationship"], e["object_id"]) for e in path] == [
+        ("frey", "PROPOSED", "precinct"), ("frey", "VETOED", "budget"), ("council", "SUPPORTED", "budget")
+    ]
+    assert path[0]["date"] == "2023-10-17"
+    assert graph.shortest_path("frey", "ward") == []
+
+
+def test_co_actors_and_time_window(graph):
+    assert graph.co_actors("frey", top=2) == [("third precinct", 2), ("2024 budget", 1)]
+    window = graph.time_window("2024-01-01", "2024-12-31")
+    assert window.edge_count == 2
+    assert window.k_hop("koski", k=1) == {"koski": 0, "frey": 1, "budget": 1}
+
+
+def test_pagerank(graph):
+    rank = graph.pagerank()
+    assert np.isclose(rank.sum(), 1.0)
+    assert graph.ranking(rank, top=1)[0][0] == "2024 budget"
@@ -0,0 +1,118 @@
+import pytest
+from graph_rows import ImportCheckpoint, read_relationship_rows, read_supported_edges, entity_label, relationship_type
+from relationship_aggregator import support_of, support_properties
+from kb_names import KBNames
+from helpers import TEXT, annotation, append, write_kb
+
+
+@pytest.fixture
+def kb_names(tmp_path):
+    write_kb(str(tmp_path / "KB.json"))
+    return KBNames(str(tmp_path / "KB.json"))
+
+
+def read(path, kb_names, tmp_path, start_offset=0):
+    return list(read_relationship_rows(str(path), kb_names, str(tmp_path / "none.jsonl"), start_offset=start_offset))
+
+
+def test_sanitizing():
+    assert entity_label("work of art") == "WORK_OF_ART"
+    assert entity_label(None) == "UNKNOWN"
+    assert relationship_type("works for!") == "WORKS_FOR"
+    assert relationship_type("??") == "RELATED_TO"
+
+
+def test_rows_skip_rejected_and_fall_back_to_kb_names(tmp_path, kb_names):
+    path = tmp_path / "validated.jsonl"
+    vetoed = annotation("VETOED")
+    vetoed["spans"] = vetoed["spans"][:1]  # no OBJECT span, its name comes from the KB
+    append(path, [vetoed, annotation("OPPOSED", answer="reject")])
+    rows = read(path, kb_names, tmp_path)
+    assert [row["relationship"] for row in rows] == ["VETOED"]
+    assert rows[0]["subject_text"] == "Jacob Frey"
+    assert rows[0]["object_text"] == "rent control ordinance"
+
+
+def test_support_of_single_and_aggregated_annotations(tmp_path, kb_names):
+    aggregated = annotation("VETOED")
+    aggregated["meta"].update({"mention_count": 3, "article_count": 2, "supporting_evidence": [
+        {"evidence": TEXT, "article_id": "1", "date": "2024-01-02"},
+        {"evidence": "Frey vetoed it.", "article_id": "2", "date": "2024-01-01"},
+    ]})
+    path = tmp_path / "validated.jsonl"
+    append(path, [annotation("OPPOSED"), aggregated])
+    single, fact = [support_properties(support_of(row)) for row in read(path, kb_names, tmp_path)]
+    assert (single["mention_count"], single["article_count"]) == (1, 1)
+    assert (single["evidence_sentences"], single["evidence_article_ids"]) == ([TEXT], ["1"])
+    assert (fact["mention_count"], fact["article_count"]) == (3, 2)
+    assert fact["evidence_article_ids"] == ["1", "2"]
+
+
+def test_import_checkpoint_resumes_after_appended_exports(tmp_path, kb_names):
+    path = tmp_path / "validated.jsonl"
+    state = str(tmp_path / "import_state.jsonl")
+    append(path, [annotation("VETOED"), annotation("OPPOSED")])
+    ImportCheckpoint(state).record(str(path), read(path, kb_names, tmp_path))
+
+    # a second db-out appended to the file repeats the old annotations and adds one
+    append(path, [annotation("VETOED"), annotation("OPPOSED"), annotation("SUPPORTED")])
+    checkpoint = ImportCheckpoint(state)
+    offset = checkpoint.resume_offset(str(path))
+    rows = read(path, kb_names, tmp_path, start_offset=offset)
+    assert len(rows) == 3
+    assert [row["relationship"] for row in rows if not checkpoint.is_applied(row)] == ["SUPPORTED"]
+
+
+def test_import_checkpoint_rereads_rewritten_files(tmp_path, kb_names):
+    path = tmp_path / "validated.jsonl"
+    state = str(tmp_path / "import_state.jsonl")
+    append(path, [annotation("VETOED"), annotation("OPPOSED")])
+    ImportCheckpoint(state).record(str(path), read(path, kb_names, tmp_path))
+
+    path.write_text("")
+    append(path, [annotation("SUPPORTED"), annotation("PROPOSED"), annotation("VETOED")])
+    checkpoint = ImportCheckpoint(state)
+    assert checkpoint.resume_offset(str(path)) == 0
+    rows = read(path, kb_names, tmp_path)
+    assert [row["relationship"] for row in rows if not checkpoint.is_applied(row)] == ["SUPPORTED", "PROPOSED"]
+
+
+def test_import_checkpoint_retries_unwritten_rows(tmp_path, kb_names):
+    path = tmp_path / "validated.jsonl"
+    state = str(tmp_path / "import_state.jsonl")
+    append(path, [annotation("VETOED"), annotation("OPPOSED"), annotation("SUPPORTED")])
+    checkpoint = ImportCheckpoint(state)
+    vetoed, opposed, supported = read(path, kb_names, tmp_path)
+    # OPPOSED's endpoints were missing; a later batch of the same run does not move past it either
+    checkpoint.record(str(path), [vetoed, opposed], unwritten=[opposed])
+    checkpoint.record(str(path), [supported])
+
+    checkpoint = ImportCheckpoint(state)
+    assert checkpoint.resume_offset(str(path)) == vetoed["line_end"]
+    rows = read(path, kb_names, tmp_path, start_offset=checkpoint.resume_offset(str(path)))
+    assert [row["relationship"] for row in rows if not checkpoint.is_applied(row)] == ["OPPOSED"]
+
+    # written now, the offset moves to the end
+    checkpoint.record(str(path), rows)
+    assert ImportCheckpoint(state).resume_offset(str(path)) == supported["line_end"]
+
+
+def test_import_checkpoint_applies_each_retraction_once(tmp_path):
+    state = str(tmp_path / "import_state.jsonl")
+    checkpoint = ImportCheckpoint(state)
+    assert checkpoint.pending_retractions({"1": "v2"}) == {"1": "v2"}
+    checkpoint.record_retractions({"1": "v2"})
+
+    checkpoint = ImportCheckpoint(state)
+    assert checkpoint.pending_retractions({"1": "v2", "2": "v5"}) == {"2": "v5"}
+    # the article changed again
+    assert checkpoint.pending_retractions({"1": "v3"}) == {"1": "v3"}
+
+
+def test_supported_edges_of_retracted_articles(tmp_path):
+    path = tmp_path / "validated.jsonl"
+    fact = annotation("OPPOSED")
+    fact["meta"].update({"article_id": "3", "article_support": [{"article_id": "3"}, {"article_id": "2"}]})
+    append(path, [annotation("VETOED"), fact, annotation("SUPPORTED", answer="reject")])
+    assert read_supported_edges(str(path), ["2"]) == {("PERSON", "kb-frey", "OPPOSED", "LAW", "kb-rent")}
+    assert len(read_supported_edges(str(path), ["1"])) == 1
@@ -0,0 +1,90 @@
+import pytest
+from graph_snapshot import update_snapshot, load_snapshot
+from helpers import TEXT, annotation, append, write_kb
+
+
+@pytest.fixture
+def paths(tmp_path):
+    write_kb(str(tmp_path / "KB.json"))
+    return {
+        "relationships_path": str(tmp_path / "validated.jsonl"),
+        "snapshot_path": str(tmp_path / "data" / "graph_snapshot.json"),
+        "kb_path": str(tmp_path / "KB.json"),
+        "retractions_path": str(tmp_path / "retractions.jsonl"),
+    }
+
+
+def test_snapshot_indexes_neighborhoods_by_id_and_alias(paths):
+    append(paths["relationships_path"], [annotation("VETOED")])
+    update_snapshot(**paths)
+    snapshot = load_snapshot(paths["snapshot_path"])
+
+    assert snapshot["aliases"]["mayor frey"] == ["kb-frey"]
+    [edge] = snapshot["entities"]["kb-frey"]["relationships"]
+    assert (edge["direction"], edge["relationship"], edge["target"]) == ("out", "VETOED", "rent control ordinance")
+    [edge] = snapshot["entities"][snapshot["aliases"]["rent control ordinance"][0]]["relationships"]
+    assert (edge["direction"], edge["target"]) == ("in", "Jacob Frey")
+
+
+def test_snapshot_updates_incrementally(paths):
+    append(paths["relationships_path"], [annotation("VETOED")])
+    update_snapshot(**paths)
+    # a re-export repeats the old annotation, only the new one is applied
+    append(paths["relationships_path"], [annotation("VETOED"), annotation("OPPOSED", article_id="2")])
+    assert update_snapshot(**paths)["applied"] == 1
+    edges = load_snapshot(paths["snapshot_path"])["entities"]["kb-frey"]["relationships"]
+    assert sorted(edge["relationship"] for edge in edges) == ["OPPOSED", "VETOED"]
+
+    # article 2 changed: its old relationships are dropped
+    append(paths["retractions_path"], [{"article_id": "2", "content_hash": "v2"}])
+    assert update_snapshot(**paths)["retracted"] == 2
+    edges = load_snapshot(paths["snapshot_path"])["entities"]["kb-frey"]["relationships"]
+    assert [edge["relationship"] for edge in edges] == ["VETOED"]
+
+
+def test_retraction_keeps_support_of_other_articles(paths):
+    # the same fact found in articles 1 and 2, annotated once
+    fact = annotation("VETOED", article_id="2")
+    fact["meta"].update({"mention_count": 3, "article_count": 2, "article_support": [
+        {"article_id": "2", "content_hash": "v1", "mentions": 2}, {"article_id": "1", "content_hash": "v1", "mentions": 1}],
+        "supporting_evidence": [
+            {"evidence": TEXT, "article_id": "2", "content_hash": "v1"},
+            {"evidence": "Frey vetoed it.", "article_id": "1", "content_hash": "v1"}]})
+    append(paths["relationships_path"], [fact])
+    update_snapshot(**paths)
+
+    # article 2 changed: the fact keeps article 1's support
+    append(paths["retractions_path"], [{"article_id": "2", "content_hash": "v2"}])
+    assert update_snapshot(**paths)["retracted"] == 0
+    [edge] = load_snapshot(paths["snapshot_path"])["entities"]["kb-frey"]["relationships"]
+    assert (edge["mention_count"], edge["article_count"], edge["articleID"], edge["evidence"]) == (1, 1, "1", "Frey vetoed it.")
+
+    # and from a rebuild, which reads the annotation without article 2's support
+    update_snapshot(**paths, rebuild=True)
+    [edge] = load_snapshot(paths["snapshot_path"])["entities"]["kb-frey"]["relationships"]
+    assert (edge["mention_count"], edge["article_count"], edge["articleID"]) == (1, 1, "1")
+
+    append(paths["retractions_path"], [{"article_id": "1", "content_hash": "v2"}])
+    assert update_snapshot(**paths)["retracted"] == 2
+
+
+def test_high_degree_entity(paths):
+    # one subject related to thousands of objects, applied over two updates
+    def fact(i, article_id="1"):
+        line = annotation("VETOED", article_id=article_id)
+        line["meta"]["object_kb_id"] = f"kb-law-{i}"
+        return line
+
+    append(paths["relationships_path"], [fact(i) for i in range(3000)])
+    update_snapshot(**paths)
+    append(paths["relationships_path"], [fact(i, article_id="2") for i in range(2000, 4000)])
+    assert update_snapshot(**paths)["applied"] == 2000
+
+    entities = load_snapshot(paths["snapshot_path"])["entities"]
+    edges = entities["kb-frey"]["relationships"]
+    assert len(edges) == 4000
+    assert len({edge["target_id"] for edge in edges}) == 4000
+    counts = {edge["target_id"]: edge["article_count"] for edge in edges}
+    assert (counts["kb-law-0"], counts["kb-law-2500"], counts["kb-law-3500"]) == (1, 2, 1)
+    [edge] = entities["kb-law-2500"]["relationships"]
+    assert (edge["direction"], edge["target_id"], edge["article_count"]) == ("in", "kb-frey", 2)
@@ -0,0 +1,41 @@
+from checkpoint import article_content_hash
+from incremental import ArticleIndex, load_retractions
+
+ARTICLES = [
+    {"id": "1", "headline": "Council votes on budget", "date": None, "contentBlocks": ["Block one."]},
+    {"id": "2", "headline": "Frey vetoes ordinance", "date": None, "contentBlocks": ["Block two."]},
+    {"id": "3", "headline": "Park board meets", "date": None, "contentBlocks": ["Block three."]},
+]
+
+
+def test_article_index_selects_and_retracts_changed_articles(tmp_path):
+    """Test that only new and changed articles are selected and changed ones are retracted once processed."""
+    index_path = str(tmp_path / "processed_index.jsonl")
+    retractions_path = str(tmp_path / "retractions.jsonl")
+    index = ArticleIndex(index_path, retractions_path)
+    for article in ARTICLES[:2]:
+        index.mark_processed(article)
+
+    edited = dict(ARTICLES[1], contentBlocks=["Block two, corrected."])
+    index = ArticleIndex(index_path, retractions_path)
+    pending = list(index.new_or_changed([ARTICLES[0], edited, ARTICLES[2]]))
+    assert [a["id"] for a in pending] == ["2", "3"]
+    assert load_retractions(retractions_path) == {}
+
+    for article in pending:
+        index.mark_processed(article)
+    assert load_retractions(retractions_path) == {"2": article_content_hash(edited)}
+
+
+def test_article_index_retracts_without_incremental(tmp_path):
+    """Test that reprocessing a changed article retracts its old version even when it was not selected by new_or_changed."""
+    index_path = str(tmp_path / "processed_index.jsonl")
+    retractions_path = str(tmp_path / "retractions.jsonl")
+    ArticleIndex(index_path, retractions_path).mark_processed(ARTICLES[0])
+    index = ArticleIndex(index_path, retractions_path)
+    index.mark_processed(ARTICLES[0])
+    assert load_retractions(retractions_path) == {}
+
+    edited = dict(ARTICLES[0], contentBlocks=["Block one, corrected."])
+    index.mark_processed(edited)
+    assert load_retractions(retractions_path) == {"1": article_content_hash(edited)}
@@ -0,0 +1,36 @@
+import json
+import os
+from kb_names import KBNames, names_path_for
+from helpers import KB, write_kb
+
+
+def test_lookup_without_embeddings(tmp_path):
+    path = str(tmp_path / "KB.json")
+    write_kb(path, KB)
+    names = KBNames(path)
+    assert names.canonical_name("kb-frey") == "jacob frey"
+    assert names.get("kb-frey") == {"canonical_name": "jacob frey", "aliases": ["jacob frey", "mayor frey", "frey"], "entity_type": None}
+    assert names.canonical_name("missing") == ""
+    assert os.path.exists(names_path_for(path))
+
+
+def test_sidecar_is_used_until_kb_changes(tmp_path):
+    path = str(tmp_path / "KB.json")
+    write_kb(path, KB)
+    KBNames(path).get("kb-frey")  # builds the sidecar
+
+    # a fresh reader takes the names from the sidecar while the KB is unchanged
+    with open(names_path_for(path), encoding="utf-8") as f:
+        sidecar = json.load(f)
+    sidecar["entries"]["kb-council"]["canonical_name"] = "from sidecar"
+    with open(names_path_for(path), "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+    names = KBNames(path)
+    assert names.canonical_name("kb-council") == "from sidecar"
+    assert not names.refresh()
+
+    # a KB write (new mtime/size) is picked up by refresh
+    write_kb(path, {**KB, "kb-koski": {"canonical_name": "emily koski", "aliases": [], "embeddings": []}})
+    assert names.refresh()
+    assert "kb-koski" in names
+    assert names.canonical_name("kb-council") == "minneapolis city council"
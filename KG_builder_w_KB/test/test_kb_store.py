@@ -0,0 +1,70 @@
+import json
+import multiprocessing
+import pytest
+from kb_store import KBStore
+from consolidate_entities import consolidate_entities_with_kb, kb_id_for
+
+
+def consolidate_in_worker(args):
+    """Consolidate a list of entity names from a separate process."""
+    kb_path, names = args
+    store = KBStore(kb_path)
+    final_data = [{"entity_text": name, "embedding": [float(len(name))]} for name in names]
+    return [record["kb_id"] for record in store.consolidate(final_data)]
+
+@pytest.fixture
+def kb_path(tmp_path):
+    return str(tmp_path / "KB.json")
+
+def test_consolidate_writes_kb(kb_path):
+    """Test that consolidated entities are persisted to the KB file."""
+    store = KBStore(kb_path)
+    updated_data = store.consolidate([{"entity_text": "Jacob Frey", "embedding": [1.0]}])
+
+    with open(kb_path, encoding="utf-8") as f:
+        kb = json.load(f)
+    assert updated_data[0]["kb_id"] == kb_id_for("jacob frey")
+    assert kb[kb_id_for("jacob frey")]["canonical_name"] == "jacob frey"
+
+def test_concurrent_creation_of_same_entity(kb_path):
+    """Test that two stores creating the same entity from the same snapshot agree on one entry."""
+    store_a = KBStore(kb_path)
+    store_b = KBStore(kb_path)
+    snapshot_a, snapshot_b = store_a.snapshot(), store_b.snapshot()
+
+    consolidate_entities_with_kb([{"entity_text": "Jacob Frey", "embedding": [1.0]}], snapshot_a)
+    consolidate_entities_with_kb([{"entity_text": "Mayor Jacob Frey", "embedding": [2.0]}], snapshot_b)
+    store_a.commit(snapshot_a, {})
+    store_b.commit(snapshot_b, {})
+
+    kb = KBStore(kb_path).snapshot()
+    assert list(kb) == [kb_id_for("jacob frey")]
+    assert kb[kb_id_for("jacob frey")]["embeddings"] == [[1.0], [2.0]]
+
+def test_near_duplicate_is_folded_and_remapped(kb_path):
+    """Test that a new entry matching one committed by another worker is re-mapped to it."""
+    store_a = KBStore(kb_path)
+    store_b = KBStore(kb_path)
+    store_b.snapshot()  # b's snapshot is taken before a commits
+
+    store_a.consolidate([{"entity_text": "Jacob Frey", "embedding": [1.0]}])
+    local_kb = {}
+    records = consolidate_entities_with_kb([{"entity_text": "Mayor Frey", "embedding": [2.0]}], local_kb)
+    remap = store_b.commit(local_kb, {})
+
+    assert remap == {records[0]["kb_id"]: kb_id_for("jacob frey")}
+    kb = KBStore(kb_path).snapshot()
+    assert len(kb) == 1
+    assert "frey" in kb[kb_id_for("jacob frey")]["aliases"]
+
+def test_parallel_workers_share_one_kb(kb_path):
+    """Test that workers on several processes end up with one consistent KB."""
+    batches = [["Jacob Frey", "Minneapolis City Council"], ["Jacob Frey", "Andrea Jenkins"],
+               ["Andrea Jenkins", "Minneapolis City Council"], ["Jacob Frey"]]
+    with multiprocessing.Pool(4) as pool:
+        results = pool.map(consolidate_in_worker, [(kb_path, names) for names in batches])
+
+    kb = KBStore(kb_path).snapshot()
+    assert len(kb) == 3
+    assert {kb_id for ids in results for kb_id in ids} == set(kb)
+    assert len(kb[kb_id_for("jacob frey")]["embeddings"]) == 3
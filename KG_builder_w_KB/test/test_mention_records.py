@@ -0,0 +1,59 @@
+import json
+import pickle
+import numpy as np
+import pytest
+from mention_records import MentionStore
+from consolidate_entities import consolidate_entities_with_kb
+
+BLOCK = "Mayor Jacob Frey vetoed the rent control ordinance. The council may override it."
+
+@pytest.fixture
+def mentions():
+    store = MentionStore(dim=4)
+    article_ref = store.add_article("600312948", "Frey vetoes rent control", "2023-10-17")
+    block_ref = store.add_block(BLOCK)
+    sentence = "Mayor Jacob Frey vetoed the rent control ordinance."
+    return [
+        store.add_mention(article_ref, block_ref, "PERSON", "Jacob Frey", sentence, [1, 0, 0, 0]),
+        store.add_mention(article_ref, block_ref, "LAW", "rent control ordinance", sentence, [1, 0, 0, 0]),
+        store.add_mention(article_ref, block_ref, "ORG", "council", "The council may override it.", [0, 1, 0, 0]),
+    ]
+
+@pytest.fixture
+def store(mentions):
+    return mentions[0].store
+
+def test_shared_fields_are_stored_once(store):
+    assert store.blocks == [BLOCK]
+    assert len(store.sentences) == 2
+    assert store.embeddings.dtype == np.float32
+    assert store.embeddings.shape == (2, 4)
+
+def test_dict_style_access(mentions):
+    mention = mentions[0]
+    assert mention["article_id"] == "600312948"
+    assert mention["block_text"] == BLOCK
+    assert mention["evidence"] == "Mayor Jacob Frey vetoed the rent control ordinance."
+    assert "kb_id" not in mention
+    mention["kb_id"] = "kb-1"
+    assert mention.get("kb_id") == "kb-1"
+    assert [key for key, _ in mention.items()][:3] == ["article_id", "headline", "date"]
+    with pytest.raises(KeyError):
+        mention["block_text"] = "other"
+
+def test_embedding_is_a_view_into_the_store(store, mentions):
+    mention = mentions[2]
+    assert np.shares_memory(mention.embedding, store._embeddings)
+    assert mention.to_dict()["embedding"] == [0.0, 1.0, 0.0, 0.0]
+
+def test_consolidate_accepts_mentions(mentions):
+    """Test that consolidation works on Mentions and keeps the KB JSON serializable."""
+    kb = {}
+    updated = consolidate_entities_with_kb(mentions, kb)
+    assert updated[0]["canonical_name"] == "jacob frey"
+    json.dumps(kb)
+
+def test_pickle_keeps_one_store(mentions):
+    restored = pickle.loads(pickle.dumps(mentions))
+    assert restored[0].store is restored[2].store
+    assert restored[2]["evidence"] == "The council may override it."
@@ -0,0 +1,45 @@
+import csv
+import os
+import pytest
+from neo4j_bulk_export import export_for_admin_import, verify_import_files, NODES_FILE, RELATIONSHIPS_FILE
+from helpers import annotation, append, write_kb
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    write_kb(str(tmp_path / "KB.json"))
+    append(tmp_path / "validated.jsonl", [annotation("VETOED"), annotation("VETOED", article_id="2"), annotation("opposed")])
+    return tmp_path
+
+
+def export(tmp_path):
+    return export_for_admin_import(str(tmp_path / "validated.jsonl"), str(tmp_path / "import"),
+                                   kb_path=str(tmp_path / "KB.json"), retractions_path=str(tmp_path / "none.jsonl"))
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_export_dedups_like_merge(inputs):
+    assert export(inputs) == {"nodes": 2, "relationships": 2}
+    nodes = read_rows(inputs / "import" / NODES_FILE)
+    assert ["PERSON:kb-frey", "kb-frey", "Jacob Frey", "jacob frey;mayor frey;frey", "PERSON;Entity"] in nodes
+    relationships = read_rows(inputs / "import" / RELATIONSHIPS_FILE)
+    # the repeated VETOED annotation merges into one relationship supported by both articles
+    vetoed = [row for row in relationships if row[2] == "VETOED"]
+    assert len(vetoed) == 1 and vetoed[0][4] == "2"
+    assert vetoed[0][11:13] == ["2", "2"]  # mention_count, article_count
+    assert {row[2] for row in relationships} == {"VETOED", "OPPOSED"}
+    assert verify_import_files(str(inputs / "import")) == {"nodes": 2, "relationships": 2}
+
+
+def test_verify_rejects_dangling_endpoints(inputs):
+    export(inputs)
+    nodes_path = inputs / "import" / NODES_FILE
+    nodes = [row for row in read_rows(nodes_path) if row[1] != "kb-rent"]
+    with open(nodes_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(nodes)
+    with pytest.raises(ValueError, match="unknown node LAW:kb-rent"):
+        verify_import_files(str(inputs / "import"))
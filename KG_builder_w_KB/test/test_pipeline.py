@@ -0,0 +1,59 @@
+import pytest
+from pipeline import run_pipeline, run_relate, batched
+
+
+def analyze_batch(articles):
+    """Fake analyze stage: one record per content block."""
+    return [(article, [{"block_text": block} for block in article["contentBlocks"]]) for article in articles]
+
+def failing_analyze_batch(articles):
+    raise RuntimeError("NER failed")
+
+def make_articles(n):
+    return [{"id": str(i), "contentBlocks": ["block"] * (i % 3)} for i in range(n)]
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+def test_run_pipeline_processes_every_article():
+    """Test that every article comes out once, with relationships from the relate stage."""
+    consolidated = []
+
+    def consolidate(records):
+        consolidated.append(len(records))
+        return records
+
+    def relate(article, records):
+        return [{"article_id": article["id"]} for _ in records]
+
+    results = list(run_pipeline(make_articles(10), analyze_batch, consolidate, relate,
+                                workers=2, batch_size=3, llm_workers=3, queue_size=2))
+
+    assert sorted(article["id"] for article, _, _ in results) == [str(i) for i in range(10)]
+    for article, relationships, error in results:
+        assert error is None
+        assert len(relationships) == len(article["contentBlocks"])
+    assert sum(consolidated) == sum(len(a["contentBlocks"]) for a in make_articles(10))
+
+def test_run_pipeline_reports_failed_articles():
+    """Test that a failing stage is reported per article instead of stopping the run."""
+    results = list(run_pipeline(make_articles(4), failing_analyze_batch, lambda r: r, lambda a, r: [],
+                                workers=1, batch_size=2, llm_workers=1))
+
+    assert len(results) == 4
+    assert all(relationships is None and isinstance(error, RuntimeError) for _, relationships, error in results)
+
+def test_run_relate_relates_consolidated_records():
+    """Test that run_relate relates saved (article, records) pairs on several threads."""
+    consolidated = [(article, [{"block_text": block} for block in article["contentBlocks"]]) for article in make_articles(6)]
+
+    def relate(article, records):
+        if article["id"] == "4":
+            raise RuntimeError("LLM failed")
+        return [{"article_id": article["id"]} for _ in records]
+
+    results = {article["id"]: (relationships, error) for article, relationships, error in
+               run_relate(consolidated, relate, llm_workers=3, queue_size=2)}
+    assert sorted(results) == [str(i) for i in range(6)]
+    assert [len(results[i][0]) for i in ("0", "1", "2", "3", "5")] == [0, 1, 2, 0, 2]
+    assert results["4"][0] is None and isinstance(results["4"][1], RuntimeError)
@@ -0,0 +1,73 @@
+import json
+from prodigy_reader import accepted_record, iter_new_accepted_records
+
+
+class LinkTable:
+    """DatasetExamples over a list of (dataset, example) links, the link id being the index + 1."""
+
+    def __init__(self, examples, dataset="ner"):
+        self.links = []
+        self.fetched = []
+        self.add(examples, dataset)
+
+    def add(self, examples, dataset="ner"):
+        self.links += [(dataset, eg) for eg in examples]
+
+    def examples_after(self, dataset_name, position, limit):
+        batch = [(link_id, eg) for link_id, (dataset, eg) in enumerate(self.links, 1)
+                 if dataset == dataset_name and link_id > position][:limit]
+        self.fetched += [eg["_task_hash"] for _, eg in batch]
+        return batch
+
+
+def example(i, answer="accept"):
+    return {"_task_hash": i, "text": f"Mayor Frey {i}", "meta": {"article_id": str(i)}, "answer": answer,
+            "spans": [{"start": 6, "end": 10, "label": "PERSON"}]}
+
+
+def test_accepted_record_maps_labels():
+    assert accepted_record(example(1))["spans"][0]["entity_type"] == "PERSON"
+    assert accepted_record(example(1, answer="reject")) is None
+    assert accepted_record({**example(1), "spans": []}) is None
+
+
+def test_reads_only_new_examples_in_batches(tmp_path):
+    state = str(tmp_path / "annotation_state.jsonl")
+    db = LinkTable([example(1), example(2, answer="reject"), example(3)])
+    batches = list(iter_new_accepted_records("ner", batch_size=2, state_path=state, examples=db))
+    assert [[r["meta"]["article_id"] for r in batch] for batch in batches] == [["1"], ["3"]]
+
+    db.add([example(4), example(5)])
+    db.fetched = []
+    batches = list(iter_new_accepted_records("ner", batch_size=2, state_path=state, examples=db))
+    assert [[r["meta"]["article_id"] for r in batch] for batch in batches] == [["4", "5"]]
+    assert db.fetched == [4, 5]
+    # the state holds positions, not the consumed hashes
+    with open(state, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f][-1] == {"dataset": "ner", "position": 5}
+
+    # another dataset has its own position
+    db.add([example(6)], dataset="other")
+    assert len(list(iter_new_accepted_records("other", state_path=state, examples=db))) == 1
+
+
+def test_unfinished_batch_is_read_again(tmp_path):
+    state = str(tmp_path / "annotation_state.jsonl")
+    db = LinkTable([example(1), example(2)])
+    batches = iter_new_accepted_records("ner", batch_size=1, state_path=state, examples=db)
+    next(batches)
+    next(batches)  # the first batch is done once the second is requested
+    batches.close()  # stopped while processing the second
+    again = list(iter_new_accepted_records("ner", batch_size=1, state_path=state, examples=db))
+    assert [[r["meta"]["article_id"] for r in batch] for batch in again] == [["2"]]
+
+
+def test_reads_only_the_datasets_examples(tmp_path):
+    state = str(tmp_path / "annotation_state.jsonl")
+    # the same task hash annotated in two datasets
+    db = LinkTable([example(1)], dataset="review")
+    db.add([{**example(1), "meta": {"article_id": "ner-1"}}, example(2)])
+    batches = list(iter_new_accepted_records("ner", state_path=state, examples=db))
+    assert [[r["meta"]["article_id"] for r in batch] for batch in batches] == [["ner-1", "2"]]
+    batches = list(iter_new_accepted_records("review", state_path=state, examples=db))
+    assert [[r["meta"]["article_id"] for r in batch] for batch in batches] == [["1"]]
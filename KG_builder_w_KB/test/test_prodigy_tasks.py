@@ -0,0 +1,134 @@
+import json
+import re
+from collections import namedtuple
+from pipeline import shard_paths
+from prodigy_tasks import (ShardedTaskWriter, iter_task_files, relationship_task, span_token_indices,
+                           tokenize_tasks)
+
+Token = namedtuple("Token", ["text", "idx"])
+
+
+def rel(evidence, article_id="a1", object_kb_id="kb-council"):
+    return {
+        "subject_text": "Mayor Frey", "object_text": "city council", "relationship": "OPPOSES",
+        "subject_kb_id": "kb-frey", "object_kb_id": object_kb_id, "subject_type": "PERSON", "object_type": "ORG",
+        "evidence": evidence, "block_text": "", "article_id": article_id, "headline": "h", "date": "2024-01-01",
+    }
+
+
+def read_tasks(output_file):
+    tasks = []
+    for path in shard_paths(output_file):
+        with open(path, encoding="utf-8") as f:
+            tasks.extend(json.loads(line) for line in f)
+    return tasks
+
+
+def test_task_spans_and_stable_hashes():
+    task = relationship_task(rel("The City Council rebuked mayor frey."))
+    assert task["spans"] == [
+        {"start": 25, "end": 35, "label": "SUBJECT"},
+        {"start": 4, "end": 16, "label": "OBJECT"},
+    ]
+    same = relationship_task(rel("The City Council rebuked mayor frey.", article_id="a2"))
+    assert (same["_input_hash"], same["_task_hash"], same["task_key"]) == (task["_input_hash"], task["_task_hash"], task["task_key"])
+    other = relationship_task(rel("The City Council rebuked mayor frey.", object_kb_id="kb-other"))
+    assert other["_input_hash"] == task["_input_hash"] and other["_task_hash"] != task["_task_hash"]
+    assert -2 ** 31 <= task["_task_hash"] < 2 ** 31
+    # a new version of the article is reviewed again, its old annotations are retracted on import
+    edited = relationship_task({**rel("The City Council rebuked mayor frey."), "content_hash": "v2"})
+    assert edited["task_key"] != task["task_key"]
+
+
+def test_aggregated_facts_are_keyed_on_their_supporting_article_versions():
+    def fact(evidence, support):
+        return {**rel(evidence), "mention_count": len(support), "article_count": len(support),
+                "article_support": [{"article_id": a, "content_hash": h, "mentions": 1} for a, h in support]}
+
+    task = relationship_task(fact("Frey opposed the council.", [("a1", "v1"), ("a2", "v1")]))
+    # better evidence from a later run, same support: the same task
+    better = relationship_task(fact("Mayor Frey opposed the city council.", [("a2", "v1"), ("a1", "v1")]))
+    assert (better["_task_hash"], better["task_key"]) == (task["_task_hash"], task["task_key"])
+    # a new supporting article or article version is reviewed again
+    assert relationship_task(fact("Frey opposed the council.", [("a1", "v1"), ("a2", "v2")]))["task_key"] != task["task_key"]
+    assert relationship_task(fact("Frey opposed the council.", [("a1", "v1"), ("a2", "v1"), ("a3", "v1")]))["task_key"] != task["task_key"]
+
+
+def test_writer_dedupes_across_runs_and_shards(tmp_path):
+    output_file = str(tmp_path / "relationships.jsonl")
+    first = [relationship_task(rel(f"sentence {i}")) for i in range(5)]
+    with ShardedTaskWriter(output_file, shard_size=2) as writer:
+        for task in writer.unique(first + first[:2]):
+            writer.write(task)
+    assert (writer.written, writer.duplicates) == (5, 2)
+    assert [p.rsplit("/", 1)[-1] for p in shard_paths(output_file)] == [
+        "relationships.00000.jsonl", "relationships.00001.jsonl", "relationships.00002.jsonl"]
+
+    # a torn line from an interrupted run is dropped, the next run fills the last shard first
+    with open(shard_paths(output_file)[-1], "a", encoding="utf-8") as f:
+        f.write('{"text": "torn')
+    second = first[3:] + [relationship_task(rel(f"sentence {i}")) for i in range(5, 8)]
+    with ShardedTaskWriter(output_file, shard_size=2) as writer:
+        for task in writer.unique(second):
+            writer.write(task)
+    assert (writer.written, writer.duplicates) == (3, 2)
+    assert [t["text"] for t in read_tasks(output_file)] == [f"sentence {i}" for i in range(8)]
+    assert len(shard_paths(output_file)) == 4
+
+
+def test_shards_are_served_before_a_plain_file_of_the_same_name(tmp_path):
+    output_file = str(tmp_path / "relationships.jsonl")
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write('{"text": "stale"}\n')
+    assert iter_task_files(output_file) == [output_file]
+    with ShardedTaskWriter(output_file) as writer:
+        writer.write(relationship_task(rel("fresh")))
+    assert iter_task_files(output_file) == shard_paths(output_file)
+
+
+def tokenize(text):
+    """Whitespace tokens with punctuation split off, like the spans a tokenizer leaves between tokens."""
+    return [Token(match.group(), match.start()) for match in re.finditer(r"\w+|[^\w\s]", text)]
+
+
+def linear_scan(tokens, start, end):
+    """The token lookup span_token_indices replaced."""
+    token_start = token_end = None
+    for i, token in enumerate(tokens):
+        if token.idx <= start < token.idx + len(token.text):
+            token_start = i
+        if token.idx < end <= token.idx + len(token.text):
+            token_end = i + 1
+    return token_start, token_end
+
+
+def test_span_token_indices_match_the_linear_scan():
+    text = "  Mayor Frey's  veto, (again)  "
+    tokens = tokenize(text)
+    starts = [token.idx for token in tokens]
+    ends = [token.idx + len(token.text) for token in tokens]
+    # every span, including those starting or ending in whitespace or past the text
+    for start in range(len(text) + 1):
+        for end in range(start + 1, len(text) + 2):
+            assert span_token_indices(starts, ends, start, end) == linear_scan(tokens, start, end), (start, end)
+    assert span_token_indices([], [], 0, 3) == (None, None)
+
+
+def test_tokenize_tasks_batches_texts_and_passes_tokenized_tasks_through():
+    calls = []
+
+    def pipe(texts):
+        texts = list(texts)
+        calls.append(texts)
+        return (tokenize(text) for text in texts)
+
+    tokenized = {"text": "already done", "tokens": [{"id": 0}], "spans": []}
+    tasks = [relationship_task(rel(f"Mayor Frey opposed the city council {i} times.")) for i in range(3)]
+    stream = tokenize_tasks([tasks[0], tokenized, tasks[1], tasks[2]], pipe, batch_size=2)
+    out = list(stream)
+
+    assert out == [tasks[0], tokenized, tasks[1], tasks[2]]
+    assert tokenized["tokens"] == [{"id": 0}]
+    assert [len(texts) for texts in calls] == [1, 2]  # one pipe call per batch, tokenized tasks left out
+    subject = tasks[0]["spans"][0]
+    assert [token["text"] for token in tasks[0]["tokens"][subject["token_start"]:subject["token_end"]]] == ["Mayor", "Frey"]
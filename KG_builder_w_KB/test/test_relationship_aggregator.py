@@ -0,0 +1,68 @@
+from relationship_aggregator import (RelationshipAggregator, aggregate_relationships, support_of, merge_support,
+                                     support_properties, support_from_properties)
+
+
+def rel(evidence, article_id, date, subject_text="Frey", object_kb_id="kb-ordinance"):
+    return {
+        "subject_text": subject_text, "subject_kb_id": "kb-frey", "subject_type": "PERSON",
+        "object_text": "rent control ordinance", "object_kb_id": object_kb_id, "object_type": "LAW",
+        "relationship": "VETOED", "evidence": evidence, "block_text": "the whole block",
+        "article_id": article_id, "headline": f"headline {article_id}", "date": date,
+    }
+
+
+def test_merges_mentions_into_one_fact_per_triple():
+    facts = aggregate_relationships([
+        rel("Frey vetoed it.", "a1", "2024-01-01"),
+        rel("Frey vetoed the rent control ordinance.", "a2", "2024-01-02"),
+        rel("Frey vetoed the rent control ordinance.", "a2", "2024-01-02"),  # same sentence in another block
+        rel("Frey vetoed the rent control ordinance on Friday.", "a3", "2024-01-05"),
+        rel("Frey signed it.", "a4", "2024-01-03", object_kb_id="kb-other"),
+    ])
+    assert [(f["object_kb_id"], f["mention_count"], f["article_count"]) for f in facts] == [
+        ("kb-ordinance", 4, 3), ("kb-other", 1, 1)]
+
+    fact = facts[0]
+    # sentences naming both entities first, newer first, the rest after
+    assert [e["evidence"] for e in fact["supporting_evidence"]] == [
+        "Frey vetoed the rent control ordinance on Friday.",
+        "Frey vetoed the rent control ordinance.",
+        "Frey vetoed it.",
+    ]
+    # the fact itself reads like its best mention
+    assert (fact["evidence"], fact["article_id"], fact["date"]) == (
+        "Frey vetoed the rent control ordinance on Friday.", "a3", "2024-01-05")
+    assert "block_text" not in fact
+
+
+def test_evidence_is_bounded():
+    aggregator = RelationshipAggregator(max_evidence=2)
+    aggregator.add_all(rel(f"Frey vetoed the rent control ordinance, take {i}.", f"a{i}", f"2024-01-0{i}") for i in range(1, 6))
+    (fact,) = aggregator.facts()
+    assert fact["mention_count"] == 5
+    assert [e["article_id"] for e in fact["supporting_evidence"]] == ["a5", "a4"]
+
+
+def test_support_merges_across_runs_instead_of_replacing():
+    first, = aggregate_relationships([rel("Frey vetoed it.", "a1", "2024-01-01"),
+                                      rel("Frey vetoed the rent control ordinance.", "a1", "2024-01-01")])
+    second, = aggregate_relationships([rel("Frey vetoed the rent control ordinance on Friday.", "a2", "2024-01-05")])
+    edge = support_properties(support_of(first))
+    # the edge read back from the graph, then the second run's fact written to it
+    merged = support_properties(merge_support(support_from_properties(edge), support_of(second), "Frey", "rent control ordinance"))
+    assert (merged["mention_count"], merged["article_count"]) == (3, 2)
+    assert merged["evidence_sentences"] == ["Frey vetoed the rent control ordinance on Friday.",
+                                            "Frey vetoed the rent control ordinance.", "Frey vetoed it."]
+    assert merged["evidence"] == merged["evidence_sentences"][0]
+
+    # writing the same fact again changes nothing
+    again = merge_support(support_from_properties(merged), support_of(second), "Frey", "rent control ordinance")
+    assert support_properties(again) == merged
+
+
+def test_new_article_version_replaces_its_support():
+    old = support_of({**rel("Frey vetoed it.", "a1", "2024-01-01"), "content_hash": "v1"})
+    new = support_of({**rel("Frey signed it.", "a1", "2024-01-02"), "content_hash": "v2"})
+    merged = merge_support(old, new)
+    assert merged["articles"] == {"a1": {"content_hash": "v2", "mentions": 1}}
+    assert [item["evidence"] for item in merged["evidence"]] == ["Frey signed it."]
@@ -0,0 +1,30 @@
+import pytest
+from text_cleaning import block_to_text, clean_text, clean_texts, is_valid_entity
+
+def test_clean_text_plain_text_fast_path():
+    assert clean_text("Mayor Jacob Frey\n vetoed it.") == "Mayor Jacob Frey vetoed it."
+
+def test_clean_text_removes_markup_urls_and_paths():
+    text = 'Read the <a href="https://www.startribune.com/x/600367430/">budget story</a> &amp; see www.example.com or 2023/24.'
+    assert clean_text(text) == "Read the budget story & see or"
+
+def test_clean_texts_batch():
+    blocks = ["<b>Council</b> votes", "Council votes", ["Item one", {"content": "Item two", "children": []}]]
+    assert clean_texts(blocks) == ["Council votes", "Council votes", "Item one Item two"]
+
+def test_block_to_text_flattens_nested_lists():
+    block = [{"content": "Police union", "children": [{"content": "21.7% raise", "children": []}]}]
+    assert block_to_text(block) == "Police union 21.7% raise"
+
+@pytest.mark.parametrize("text,valid", [
+    ("Jacob Frey", True),
+    ("Minneapolis City Council", True),
+    ("O'Hara", True),
+    ("css_class", False),
+    ("startribune.com", False),
+    ("12/3", False),
+    ("2023", False),
+    ("[1]", False),
+])
+def test_is_valid_entity(text, valid):
+    assert is_valid_entity(text) == valid
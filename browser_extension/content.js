@@ -1,7 +1,60 @@
-// Define the function to fetch graph data from the API
+const API_URL = "http://localhost:3001";
+// KG_builder_w_KB/gazetteer.py, spots KB entities in the selected text
+const GAZETTEER_URL = "http://localhost:3002";
+
+// Find the KB entities mentioned in the text, null if the gazetteer is not running
+async function annotateEntities(text) {
+  try {
+    const response = await fetch(`${GAZETTEER_URL}/annotate`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ text }),
+    });
+    if (!response.ok) {
+      throw new Error(`Gazetteer responded with status: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.entities;
+  } catch (error) {
+    console.error("Error annotating entities:", error);
+    return null;
+  }
+}
+
+// One entity's neighborhood from the graph snapshot, cached per page.
+// Resolves to null for an unknown entity, rejects when the snapshot is not
+// built (503) or the API is down, so the caller can fall back to /api/graph
+const entityCache = new Map();
+
+async function getEntity(kbId) {
+  if (!entityCache.has(kbId)) {
+    entityCache.set(
+      kbId,
+      fetch(`${API_URL}/api/entity/${encodeURIComponent(kbId)}`)
+        .then((response) => {
+          if (response.status === 404) {
+            return [];
+          }
+          if (!response.ok) {
+            throw new Error(`API responded with status: ${response.status}`);
+          }
+          return response.json();
+        })
+        .then((entities) => entities[0] || null)
+        .catch((error) => {
+          entityCache.delete(kbId); // try again on the next selection
+          throw error;
+        })
+    );
+  }
+  return entityCache.get(kbId);
+}
+
+// Graph keyed by entity name from /api/graph: the snapshot's neighborhoods, or Neo4j
+// when the snapshot is not built (both bounded by the server)
 async function getGraphData() {
   try {
-    const response = await fetch("http://localhost:3001/api/graph");
+    const response = await fetch(`${API_URL}/api/graph`);
     if (!response.ok) {
       throw new Error(`API responded with status: ${response.status}`);
     }
@@ -167,25 +220,23 @@ const fakeGraph = {
 
 // Initialize with fake data, then update with real data when available
 let graphData = fakeGraph;
-
-// Fetch the real graph data when the extension loads
-async function initializeGraphData() {
-  try {
-    const data = await getGraphData();
-    if (data && Object.keys(data).length > 0) {
-      graphData = data;
-      console.log("Graph data loaded successfully");
-    } else {
-      console.log("Using fallback data (empty response from API)");
-    }
-  } catch (error) {
-    console.error("Failed to load graph data, using fallback data", error);
+let graphDataLoaded = null;
+
+// Fetch the real graph data once, on the first selection
+function loadGraphData() {
+  if (!graphDataLoaded) {
+    graphDataLoaded = getGraphData().then((data) => {
+      if (data && Object.keys(data).length > 0) {
+        graphData = data;
+        console.log("Graph data loaded successfully");
+      } else {
+        console.log("Using fallback data (empty response from API)");
+      }
+    });
   }
+  return graphDataLoaded;
 }
 
-// Initialize graph data
-initializeGraphData();
-
 // Track active overlays to prevent duplicates
 let activeOverlay = null;
 
@@ -245,7 +296,7 @@ const ICON_TEXT = {
 };
 
 // Listen for text selection
-document.addEventListener("mouseup", function (event) {
+document.addEventListener("mouseup", async function (event) {
   // Remove any existing overlay if clicking outside
   if (activeOverlay && !activeOverlay.contains(event.target)) {
     activeOverlay.remove();
@@ -256,28 +307,10 @@ document.addEventListener("mouseup", function (event) {
   if (selectedText.length > 0) {
     console.log("Extracting entities from:", selectedText);
 
-    // Step 1: Extract entities from the paragraph
-    const extractedEntities = extractEntities(selectedText);
-
-    // Step 2: Find relationships where entity is either the subject OR target
-    let foundRelationships = [];
-    extractedEntities.forEach((entity) => {
-      // Find relationships where entity is the subject
-      if (graphData[entity]) {
-        graphData[entity].forEach((rel) => {
-          foundRelationships.push({ ...rel, source: entity });
-        });
-      }
-
-      // Find relationships where entity appears as a target
-      Object.keys(graphData).forEach((subject) => {
-        graphData[subject].forEach((rel) => {
-          if (rel.target === entity) {
-            foundRelationships.push({ ...rel, source: subject });
-          }
-        });
-      });
-    });
+    // Step 1 and 2: Find the entities in the paragraph and their relationships,
+    // where the entity is either the subject OR the target
+    const { extractedEntities, foundRelationships } =
+      await findRelationships(selectedText);
 
     // Step 3: Rank relationships by relevance to paragraph
     if (foundRelationships.length > 0 && !activeOverlay) {
@@ -296,6 +329,63 @@ document.addEventListener("mouseup", function (event) {
   }
 });
 
+// Relationships of the entities in the text: the gazetteer finds them, /api/entity
+// has their neighborhoods. Without either, the text is matched against graphData
+async function findRelationships(text) {
+  const annotations = await annotateEntities(text);
+  if (annotations === null) {
+    await loadGraphData();
+    return findRelationshipsInGraph(text);
+  }
+  const kbIds = [...new Set(annotations.flatMap((entity) => entity.kb_ids))];
+  let entities;
+  try {
+    entities = (await Promise.all(kbIds.map(getEntity))).filter(Boolean);
+  } catch (error) {
+    console.error("Error fetching entities, using /api/graph instead:", error);
+    await loadGraphData();
+    return findRelationshipsInGraph(text);
+  }
+
+  const foundRelationships = [];
+  entities.forEach((entity) => {
+    entity.outgoing.forEach((rel) => {
+      foundRelationships.push({ ...rel, source: entity.name });
+    });
+    entity.incoming.forEach((rel) => {
+      foundRelationships.push({ ...rel, source: rel.target, target: entity.name });
+    });
+  });
+  return {
+    extractedEntities: entities.map((entity) => entity.name),
+    foundRelationships,
+  };
+}
+
+// Find the entities of graphData in the text and their relationships
+function findRelationshipsInGraph(text) {
+  const extractedEntities = extractEntities(text);
+  const foundRelationships = [];
+  extractedEntities.forEach((entity) => {
+    // Find relationships where entity is the subject
+    if (graphData[entity]) {
+      graphData[entity].forEach((rel) => {
+        foundRelationships.push({ ...rel, source: entity });
+      });
+    }
+
+    // Find relationships where entity appears as a target
+    Object.keys(graphData).forEach((subject) => {
+      graphData[subject].forEach((rel) => {
+        if (rel.target === entity) {
+          foundRelationships.push({ ...rel, source: subject });
+        }
+      });
+    });
+  });
+  return { extractedEntities, foundRelationships };
+}
+
 // 📌 **Extract Entities with Partial Match Support**
 function extractEntities(text) {
   const knownEntities = Object.keys(graphData);
@@ -1,30 +1,48 @@
-// Function to fetch graph data from the API
-async function fetchGraphData() {
+// Function to fetch one entity's neighborhood (by kb_id or name/alias) from the API
+async function fetchEntity(key) {
   try {
-    const response = await fetch("http://localhost:3001/api/graph");
+    const response = await fetch(
+      `http://localhost:3001/api/entity/${encodeURIComponent(key)}`
+    );
+    if (response.status === 404) {
+      return [];
+    }
     if (!response.ok) {
       throw new Error(`API responded with status: ${response.status}`);
     }
-    const data = await response.json();
-    console.log("Graph Data fetched successfully");
-    return data;
+    return await response.json();
   } catch (error) {
-    console.error("Error fetching graph data:", error);
+    console.error(`Error fetching entity ${key}:`, error);
     return null;
   }
 }
 
-// Export the function to fetch graph data
-export const getGraphData = async () => {
+// Export the function to fetch the graph of the given entities,
+// as {entity name: [outgoing relationships]}
+export const getGraphData = async (entityKeys) => {
   try {
-    const graphData = await fetchGraphData();
-    return graphData || fakeGraph; // Fall back to fake data if API fails
+    const results = await Promise.all(entityKeys.map(fetchEntity));
+    if (results.some((result) => result === null)) {
+      return pickEntities(fakeGraph, entityKeys); // Fall back to fake data if API fails
+    }
+    const graphData = {};
+    results.flat().forEach((entity) => {
+      graphData[entity.name] = entity.outgoing;
+    });
+    return graphData;
   } catch (error) {
     console.error("Error in getGraphData:", error);
-    return fakeGraph;
+    return pickEntities(fakeGraph, entityKeys);
   }
 };
 
+function pickEntities(graph, entityKeys) {
+  const keys = new Set(entityKeys.map((key) => key.toLowerCase()));
+  return Object.fromEntries(
+    Object.entries(graph).filter(([name]) => keys.has(name.toLowerCase()))
+  );
+}
+
 // The goal is to replace this with the real graph shown in Neo4j
 export const fakeGraph = {
   "Kyrees Darius Johnson": [
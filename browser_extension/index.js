@@ -2,6 +2,9 @@ import express from "express";
 import neo4j from "neo4j-driver";
 import cors from "cors";
 import dotenv from "dotenv";
+import fs from "fs";
+import path from "path";
+import { fileURLToPath } from "url";
 
 // Load environment variables
 dotenv.config();
@@ -23,8 +26,72 @@ const driver = neo4j.driver(
   neo4j.auth.basic(neo4j_user, neo4j_password)
 );
 
+// Precomputed per-entity neighborhoods (KG_builder_w_KB/graph_snapshot.py)
+const SNAPSHOT_PATH =
+  process.env.GRAPH_SNAPSHOT ||
+  path.join(path.dirname(fileURLToPath(import.meta.url)), "data", "graph_snapshot.json");
+let snapshot = null;
+let snapshotMtime = 0;
+
+// Load the snapshot once, and again only when the file changes
+function getSnapshot() {
+  try {
+    const mtime = fs.statSync(SNAPSHOT_PATH).mtimeMs;
+    if (!snapshot || mtime !== snapshotMtime) {
+      snapshot = JSON.parse(fs.readFileSync(SNAPSHOT_PATH, "utf-8"));
+      snapshotMtime = mtime;
+      console.log(
+        `Loaded graph snapshot with ${Object.keys(snapshot.entities).length} entities`
+      );
+    }
+  } catch (error) {
+    if (error.code !== "ENOENT") {
+      console.error("Error loading graph snapshot:", error);
+    }
+    snapshot = null;
+  }
+  return snapshot;
+}
+
+// Snapshot entity -> relationships in the format content.js expects
+function toGraphRelationships(entity, direction = "out") {
+  return entity.relationships
+    .filter((rel) => rel.direction === direction)
+    .map((rel) => ({
+      relationship: rel.relationship,
+      target: rel.target,
+      evidence: rel.evidence || "No evidence provided",
+      articleID: rel.articleID || "Unknown",
+      articleName: rel.articleName,
+      date: rel.date,
+    }));
+}
+
+// At most GRAPH_LIMIT relationships from /api/graph, use /api/entity/:key for lookups
+const GRAPH_LIMIT = 100;
+
+// Graph keyed by entity name, built from the snapshot (no graph scan)
+function getGraphDataFromSnapshot(data) {
+  const graphData = {};
+  let remaining = GRAPH_LIMIT;
+  for (const entity of Object.values(data.entities)) {
+    if (remaining <= 0) break;
+    const relationships = toGraphRelationships(entity).slice(0, remaining);
+    if (relationships.length > 0) {
+      graphData[entity.name] = (graphData[entity.name] || []).concat(relationships);
+      remaining -= relationships.length;
+    }
+  }
+  return graphData;
+}
+
 // Function to query Neo4j
 async function getGraphData() {
+  const data = getSnapshot();
+  if (data) {
+    return getGraphDataFromSnapshot(data);
+  }
+
   const session = driver.session();
   try {
     console.log("Querying Neo4j database...");
@@ -36,8 +103,8 @@ async function getGraphData() {
       RETURN source.name AS source, type(r) AS relationship, 
              target.name AS target, r.evidence AS evidence, 
              r.article_id AS articleID
-      LIMIT 100
-    `);
+      LIMIT $limit
+    `, { limit: neo4j.int(GRAPH_LIMIT) });
 
     console.log(`Found ${result.records.length} relationships`);
 
@@ -89,6 +156,32 @@ app.get("/api/graph", async (req, res) => {
   }
 });
 
+// One entity's neighborhood by kb_id or by (case-insensitive) name/alias
+app.get("/api/entity/:key", (req, res) => {
+  const data = getSnapshot();
+  if (!data) {
+    return res.status(503).json({ error: "Graph snapshot not built yet" });
+  }
+  const key = req.params.key;
+  const ids = data.entities[key] ? [key] : data.aliases[key.toLowerCase()] || [];
+  if (ids.length === 0) {
+    return res.status(404).json({ error: `Unknown entity: ${key}` });
+  }
+  res.json(
+    ids.map((id) => {
+      const entity = data.entities[id];
+      return {
+        id,
+        name: entity.name,
+        type: entity.type,
+        aliases: entity.aliases,
+        outgoing: toGraphRelationships(entity, "out"),
+        incoming: toGraphRelationships(entity, "in"),
+      };
+    })
+  );
+});
+
 // Health check endpoint
 app.get("/health", (req, res) => {
   res.json({ status: "ok", timestamp: new Date().toISOString() });